@@ -0,0 +1,296 @@
+"""In-process stand-ins for Moralis, TAAPI, NewsAPI, Binance, OpenAI and MongoDB used by the benchmark suite."""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import httpx
+
+
+@dataclass
+class UpstreamProfile:
+    """Behaviour of one fake upstream: latency (seconds), random jitter, error rate and payload size."""
+    latency: float = 0.05
+    jitter: float = 0.02
+    error_rate: float = 0.0
+    payload_size: int = 10
+
+    def delay(self, rng: random.Random) -> float:
+        return max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self, rng: random.Random) -> bool:
+        return rng.random() < self.error_rate
+
+
+DEFAULT_PROFILES = {
+    "moralis": UpstreamProfile(latency=0.15, payload_size=10),
+    "taapi": UpstreamProfile(latency=0.2, payload_size=3),
+    "news": UpstreamProfile(latency=0.25, payload_size=20),
+    "binance": UpstreamProfile(latency=0.1, payload_size=200),
+    "openai": UpstreamProfile(latency=1.0, jitter=0.4, payload_size=120),
+}
+
+
+def _address(seed: str) -> str:
+    return "0x" + hashlib.sha1(seed.encode()).hexdigest()[:40]
+
+
+class FakeUpstreams:
+    """Builds httpx transports that answer like the real providers, with configurable timing and failures."""
+
+    def __init__(self, profiles: dict = None, seed: int = 42):
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+        self.rng = random.Random(seed)
+        self.calls = {name: 0 for name in self.profiles}
+
+    def _error(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503, json={"error": "fake upstream failure"}, request=request)
+
+    async def _async_handler(self, name: str, request: httpx.Request, respond) -> httpx.Response:
+        profile = self.profiles[name]
+        self.calls[name] += 1
+        await asyncio.sleep(profile.delay(self.rng))
+        if profile.should_fail(self.rng):
+            return self._error(request)
+        return httpx.Response(200, json=respond(request, profile), request=request)
+
+    def transport(self, name: str) -> httpx.MockTransport:
+        respond = getattr(self, f"_respond_{name}")
+        return httpx.MockTransport(lambda request: self._async_handler(name, request, respond))
+
+    def openai_transport(self) -> httpx.MockTransport:
+        """Synchronous transport for the OpenAI client, which runs on the LLM engine's worker threads."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            profile = self.profiles["openai"]
+            self.calls["openai"] += 1
+            time.sleep(profile.delay(self.rng))
+            if profile.should_fail(self.rng):
+                return self._error(request)
+            return httpx.Response(200, json=self._respond_openai(request, profile), request=request)
+
+        return httpx.MockTransport(handler)
+
+    def _respond_moralis(self, request: httpx.Request, profile: UpstreamProfile):
+        path = request.url.path
+        if path.endswith("/tokens/search"):
+            query = request.url.params.get("query", "tok")
+            return {"result": [self._token(query, i) for i in range(profile.payload_size)]}
+        if path.endswith("/erc20/prices"):
+            body = json.loads(request.content or b"{}")
+            return [
+                {"tokenAddress": token["token_address"], "usdPrice": round(self.rng.uniform(0.01, 100), 4)}
+                for token in body.get("tokens", [])
+            ]
+        if path.endswith("/erc20/metadata"):
+            return [{"address": address, "decimals": "18"} for address in request.url.params.get_list("addresses[]")]
+        return {}
+
+    def _token(self, query: str, index: int) -> dict:
+        symbol = f"{query[:4].upper()}{index}"
+        return {
+            "tokenAddress": _address(f"{query}:{index}"),
+            "chainId": "0x1",
+            "name": f"{query.title()} Token {index}",
+            "symbol": symbol,
+            "usdPrice": round(self.rng.uniform(0.01, 100), 4),
+            "marketCap": round(self.rng.uniform(1e5, 1e9), 2),
+            "securityScore": self.rng.randint(20, 95),
+            "usdPricePercentChange": {"oneDay": round(self.rng.uniform(-15, 15), 2)},
+            "volumeUsd": {"oneDay": round(self.rng.uniform(1e3, 1e7), 2)},
+            "logo": "",
+        }
+
+    def _respond_taapi(self, request: httpx.Request, profile: UpstreamProfile):
+        body = json.loads(request.content or b"{}")
+        data = []
+        for construct in body.get("construct", []):
+            for indicator in construct.get("indicators", []):
+                if indicator["indicator"] == "macd":
+                    result = {"valueMACD": self.rng.uniform(-2, 2), "valueMACDSignal": 0.0, "valueMACDHist": 0.0}
+                else:
+                    result = {"value": self.rng.uniform(10, 90)}
+                data.append({"id": indicator.get("id"), "indicator": indicator["indicator"], "result": result, "errors": []})
+        return {"data": data}
+
+    def _respond_news(self, request: httpx.Request, profile: UpstreamProfile):
+        query = request.url.params.get("q", "")
+        return {"articles": [
+            {
+                "url": f"https://news.example/{hashlib.md5(f'{query}{i}'.encode()).hexdigest()}",
+                "title": f"{query} market update #{i}",
+                "description": f"Analysts discuss {query}. " * 5,
+                "publishedAt": datetime.now(timezone.utc).isoformat(),
+            }
+            for i in range(profile.payload_size)
+        ]}
+
+    def _respond_binance(self, request: httpx.Request, profile: UpstreamProfile):
+        limit = int(request.url.params.get("limit", profile.payload_size))
+        now_ms = int(time.time() * 1000)
+        price, klines = 100.0, []
+        for i in range(limit, 0, -1):
+            open_time = now_ms - (i + 1) * 3_600_000
+            close = price * (1 + self.rng.uniform(-0.02, 0.02))
+            klines.append([open_time, price, max(price, close) * 1.01, min(price, close) * 0.99, close, 1000.0,
+                           open_time + 3_599_999])
+            price = close
+        return klines
+
+    def _respond_openai(self, request: httpx.Request, profile: UpstreamProfile):
+        body = json.loads(request.content or b"{}")
+        prompt = body.get("messages", [{}])[-1].get("content") or ""
+        keys = re.findall(r"^Token: .*, key: (\S+)$", prompt, flags=re.MULTILINE)
+        if "JSON" in prompt and keys:
+            content = json.dumps({key: self.rng.choice(["BUY", "HOLD", "AVOID"]) for key in keys})
+        else:
+            content = " ".join(["Insight"] * profile.payload_size)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+
+def _matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(document, clause) for clause in condition):
+                return False
+            continue
+        value = document.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if op == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, documents):
+        self._documents = documents
+
+    async def to_list(self, length=None):
+        return self._documents[:length] if length else list(self._documents)
+
+
+class FakeCollection:
+    """Minimal async collection supporting the operations the app performs."""
+
+    def __init__(self):
+        self.documents = []
+        self._next_id = 0
+
+    def _insert(self, document: dict):
+        if "_id" not in document:
+            self._next_id += 1
+            document["_id"] = self._next_id
+        self.documents.append(document)
+        return document["_id"]
+
+    def _find(self, query=None, sort=None):
+        found = [doc for doc in self.documents if _matches(doc, query or {})]
+        for key, direction in reversed(sort or []):
+            found.sort(key=lambda doc: (doc.get(key) is None, doc.get(key)), reverse=direction < 0)
+        return found
+
+    async def insert_one(self, document):
+        return SimpleNamespace(inserted_id=self._insert(document))
+
+    async def insert_many(self, documents, ordered=True):
+        return SimpleNamespace(inserted_ids=[self._insert(document) for document in documents])
+
+    async def find_one(self, query=None, sort=None, projection=None):
+        found = self._find(query, sort)
+        return dict(found[0]) if found else None
+
+    def find(self, query=None, sort=None, projection=None, limit=0):
+        found = [dict(doc) for doc in self._find(query, sort)]
+        return _Cursor(found[:limit] if limit else found)
+
+    def aggregate(self, pipeline):
+        """Supports the $match / $sort / $group-with-$first stages the app uses."""
+        documents = [dict(doc) for doc in self.documents]
+        for stage in pipeline:
+            if "$match" in stage:
+                documents = [doc for doc in documents if _matches(doc, stage["$match"])]
+            elif "$sort" in stage:
+                for key, direction in reversed(list(stage["$sort"].items())):
+                    documents.sort(key=lambda doc: (doc.get(key) is None, doc.get(key)), reverse=direction < 0)
+            elif "$group" in stage:
+                spec = stage["$group"]
+                groups = {}
+                for doc in documents:
+                    group_id = {name: doc.get(path.lstrip("$")) for name, path in spec["_id"].items()}
+                    groups.setdefault(tuple(group_id.values()), {"_id": group_id, "doc": doc})
+                documents = list(groups.values())
+        return _Cursor(documents)
+
+    async def count_documents(self, query):
+        return len(self._find(query))
+
+    async def update_one(self, query, update, upsert=False):
+        found = self._find(query)
+        if found:
+            found[0].update(update.get("$set", {}))
+        elif upsert:
+            self._insert({**query, **update.get("$set", {})})
+        return SimpleNamespace(modified_count=1 if found else 0)
+
+    async def update_many(self, query, update):
+        found = self._find(query)
+        for document in found:
+            document.update(update.get("$set", {}))
+        return SimpleNamespace(modified_count=len(found))
+
+    async def replace_one(self, query, replacement, upsert=False):
+        found = self._find(query)
+        if found:
+            document_id = found[0]["_id"]
+            found[0].clear()
+            found[0].update({**replacement, "_id": document_id})
+        elif upsert:
+            self._insert({**replacement, **{k: v for k, v in query.items() if not isinstance(v, dict)}})
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None, upsert=False):
+        found = self._find(query, sort)
+        if not found:
+            return None
+        found[0].update(update.get("$set", {}))
+        return dict(found[0])
+
+    async def create_index(self, keys, **kwargs):
+        return kwargs.get("name", str(keys))
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection()
+        return collection
+
+
+class FakeMongoClient(dict):
+    """In-memory stand-in for AsyncIOMotorClient."""
+
+    def __missing__(self, name):
+        database = self[name] = FakeDatabase()
+        return database
+
+    def close(self):
+        pass
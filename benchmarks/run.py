@@ -0,0 +1,218 @@
+"""
+Offline benchmark for /search and run_analysis_pipeline against in-process fake upstreams.
+
+    python -m benchmarks.run --concurrency 1 4 16 --requests 40 --save --compare
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Settings must exist before any src module is imported; no real keys are needed offline
+for key in ("TAAPI_KEY", "NEWS_API_KEY", "MORALIS_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(key, "benchmark")
+os.environ.setdefault("MONGO_URI", "mongodb://benchmark")
+os.environ.setdefault("LLM_CACHE_BACKEND", "memory")
+
+import httpx  # noqa: E402
+
+from benchmarks.fakes import DEFAULT_PROFILES, FakeMongoClient, FakeUpstreams, UpstreamProfile  # noqa: E402
+
+RESULTS_DIR = Path(__file__).parent / "results"
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+RUN_ID_PATTERN = re.compile(r'streamAnalysis\("([0-9a-f]+)"\)')
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "p99": round(percentile(latencies, 99), 4),
+        "mean": round(statistics.fmean(latencies), 4) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_at_concurrency(func, total: int, concurrency: int) -> dict:
+    """Calls `func(i)` `total` times with at most `concurrency` in flight and collects latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i):
+        nonlocal errors
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                await func(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(latencies, errors, time.perf_counter() - start_time)
+
+
+def install_fakes(upstreams: FakeUpstreams):
+    from src.clients.http_clients import http_clients
+    from src.db.mongo_client import set_mongo_client
+    from src.utils.llm_engine import configure_llm_engine
+
+    for name in ("moralis", "taapi", "news", "binance"):
+        http_clients.set_transport(name, upstreams.transport(name))
+    configure_llm_engine(transport=upstreams.openai_transport())
+    set_mongo_client(FakeMongoClient())
+
+
+async def bench_pipeline(upstreams: FakeUpstreams, total: int, concurrency: int, run_tag: str) -> dict:
+    from src.pipeline import run_analysis_pipeline
+
+    moralis_profile = upstreams.profiles["moralis"]
+
+    async def one(i):
+        tokens = [upstreams._token(f"{run_tag}p{i}", j) for j in range(moralis_profile.payload_size)]
+        await run_analysis_pipeline(tokens)
+
+    return await run_at_concurrency(one, total, concurrency)
+
+
+async def bench_search(total: int, concurrency: int, run_tag: str) -> dict:
+    """Measures /search end to end: HTTP response plus completion of the queued analysis job."""
+    from src.api import app, get_job_queue
+
+    job_queue = get_job_queue()
+    await job_queue.start()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def one(i):
+                response = await client.get("/search", params={"query": f"{run_tag}s{i}"})
+                response.raise_for_status()
+                match = RUN_ID_PATTERN.search(response.text)
+                if not match:
+                    raise RuntimeError("Search response did not start an analysis run.")
+                await wait_for_job(client, match.group(1))
+
+            return await run_at_concurrency(one, total, concurrency)
+    finally:
+        await job_queue.stop()
+
+
+async def wait_for_job(client: httpx.AsyncClient, job_id: str, poll: float = 0.05):
+    while True:
+        status = (await client.get(f"/jobs/{job_id}")).json()["status"]
+        if status in ("done", "failed"):
+            return status
+        await asyncio.sleep(poll)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a list of regressions where p95 latency or throughput is worse than the baseline beyond `tolerance`."""
+    regressions = []
+    for scenario, levels in results["scenarios"].items():
+        for level, stats in levels.items():
+            base = baseline.get("scenarios", {}).get(scenario, {}).get(level)
+            if not base:
+                continue
+            if base["p95"] and stats["p95"] > base["p95"] * (1 + tolerance):
+                regressions.append(f"{scenario}@{level}: p95 {stats['p95']}s vs baseline {base['p95']}s")
+            if base["throughput_rps"] and stats["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{scenario}@{level}: throughput {stats['throughput_rps']} rps vs baseline {base['throughput_rps']} rps"
+                )
+    return regressions
+
+
+async def main(args) -> int:
+    profiles = {
+        name: UpstreamProfile(
+            latency=profile.latency * args.latency_scale,
+            jitter=profile.jitter * args.latency_scale,
+            error_rate=args.error_rate,
+            payload_size=profile.payload_size,
+        )
+        for name, profile in DEFAULT_PROFILES.items()
+    }
+    upstreams = FakeUpstreams(profiles, seed=args.seed)
+    install_fakes(upstreams)
+
+    run_tag = datetime.now(timezone.utc).strftime("%H%M%S")
+    results = {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "git_rev": os.popen("git rev-parse --short HEAD 2>/dev/null").read().strip() or None,
+        "config": vars(args),
+        "scenarios": {"pipeline": {}, "search": {}},
+    }
+
+    for concurrency in args.concurrency:
+        results["scenarios"]["pipeline"][str(concurrency)] = await bench_pipeline(
+            upstreams, args.requests, concurrency, f"{run_tag}c{concurrency}"
+        )
+        if not args.skip_search:
+            results["scenarios"]["search"][str(concurrency)] = await bench_search(
+                args.requests, concurrency, f"{run_tag}c{concurrency}"
+            )
+
+    results["upstream_calls"] = upstreams.calls
+    print(json.dumps(results["scenarios"], indent=2))
+    print(f"Upstream calls: {upstreams.calls}")
+
+    if args.save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"bench-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+        path.write_text(json.dumps(results, indent=2))
+        print(f"Saved results to {path}")
+
+    if args.update_baseline:
+        BASELINE_FILE.write_text(json.dumps(results, indent=2))
+        print(f"Updated baseline {BASELINE_FILE}")
+
+    if args.compare and BASELINE_FILE.exists():
+        regressions = compare(results, json.loads(BASELINE_FILE.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput/latency benchmark with fake upstreams.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=20, help="Runs per concurrency level and scenario.")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for all fake upstream latencies.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that a fake upstream call fails.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-search", action="store_true", help="Only benchmark run_analysis_pipeline.")
+    parser.add_argument("--save", action="store_true", help="Write results to benchmarks/results/.")
+    parser.add_argument("--compare", action="store_true", help="Exit non-zero on regressions against baseline.json.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as benchmarks/baseline.json.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
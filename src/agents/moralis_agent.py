@@ -1,45 +1,67 @@
 from textwrap import dedent
 from src.config import config
 import logging
+from src.db.stage_store import get_stage_store
+from src.models.token_record import TokenRecord
+from src.utils.change_detection import moralis_inputs
+from src.utils.pipeline import token_key
+from src.utils.prompt_budget import clip, format_number
+from src.utils.singleflight import SingleFlight
 from src.utils.swarm_handler import SwarmHandler
 
 logger = logging.getLogger(__name__)
 
+# Concurrent analyses of the same token (chain + address) across searches share one LLM call
+_analyses = SingleFlight()
+
 class MoralisAgent:
-    def __init__(self, token_info: dict):
-        """Agent receives token data and processes it using Swarm."""
-        self.token_info = token_info
+    def __init__(self, token_info):
+        """Agent receives token data (a TokenRecord or a raw Moralis dict) and processes it using Swarm."""
+        self.token_info = TokenRecord.coerce(token_info)
         self.swarm = SwarmHandler(
             agent_name="CryptoAnalysisAgent",
             instructions="You are a cryptocurrency analyst. Analyze the given token data and provide a short but accurate summary, highlighting key risks and trends.",
+            cache_ttl=300,
         )
 
     async def analyze(self):
         """Runs token analysis through Swarm asynchronously."""
+        return await _analyses.do(token_key(self.token_info), self._analyze)
+
+    async def _analyze(self):
         try:
+            # Unchanged market data since the stored analysis: reuse it instead of asking the model again
+            key, inputs = token_key(self.token_info), moralis_inputs(self.token_info)
+            stored = await get_stage_store().reuse("moralis", key, inputs)
+            if stored is not None:
+                return stored
+
             prompt = self._generate_prompt()
-            logger.info(f"Sending prompt to agent: {prompt}")
+            logger.debug("Sending prompt to agent: %s", clip(prompt))
             result = await self.swarm.run(prompt)
 
             if not result:
-                logger.warning(f"Empty analysis result for {self.token_info.get('symbol')}")
+                logger.warning(f"Empty analysis result for {self.token_info.symbol}")
                 return "Analysis not available."
 
+            if result != SwarmHandler.ERROR_REPLY:
+                await get_stage_store().record("moralis", key, inputs, result)
             return result
 
         except Exception as e:
-            logger.error(f"Error analyzing token {self.token_info.get('symbol')}: {e}", exc_info=True)
+            logger.error(f"Error analyzing token {self.token_info.symbol}: {e}", exc_info=True)
             return "Analysis error, data unavailable."
 
     def _generate_prompt(self):
         """Generates a well-formatted English-language prompt based on token data."""
+        # Numbers are rounded to a few significant figures: full float precision only costs prompt tokens
         return dedent(f"""
-            Token: {self.token_info.get('name')} ({self.token_info.get('symbol')})
-            Price: {self.token_info.get('usdPrice')} USD
-            Market Cap: {self.token_info.get('marketCap')} USD
-            24h Price Change: {self.token_info.get('usdPricePercentChange', {}).get('oneDay', 'No data')}%
-            24h Trading Volume: {self.token_info.get('volumeUsd', {}).get('oneDay', 'No data')} USD
-            Security Score: {self.token_info.get('securityScore', 'No data')}/100
+            Token: {self.token_info.name} ({self.token_info.symbol})
+            Price: {format_number(self.token_info.usdPrice)} USD
+            Market Cap: {format_number(self.token_info.marketCap)} USD
+            24h Price Change: {format_number(self.token_info.priceChange24h, 3)}%
+            24h Trading Volume: {format_number(self.token_info.volume24h)} USD
+            Security Score: {format_number(self.token_info.securityScore)}/100
 
             Analyze this token and provide a summary of its reliability and future prospects.
             Highlight any risks or trends that should be considered.
@@ -1,27 +1,35 @@
 import os
 import logging
 import time
-import requests
+import httpx
 import asyncio
 
 from src.config import config
+from src.clients.news_client import fetch_crypto_news
+from src.db.stage_store import get_stage_store
+from src.utils.change_detection import news_inputs
+from src.utils.cache import TTLCache
+from src.utils.prompt_budget import fit_articles
+from src.utils.singleflight import SingleFlight
 from src.utils.swarm_handler import SwarmHandler
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
+_news_cache = None
+
+# In-flight NewsAPI requests, so concurrent lookups for the same query share one upstream call
+_news_fetches = SingleFlight()
+
+_BATCH_ERROR = "Error summarizing this batch."
 
-logger = logging.getLogger(__name__)
 
-# Cache for already fetched news
-news_cache = {}
+def get_news_cache() -> TTLCache:
+    """Bounded, time-expiring cache for already fetched news, created on first use."""
+    global _news_cache
+    if _news_cache is None:
+        _news_cache = TTLCache(maxsize=config.NEWS_CACHE_MAX_ENTRIES, ttl=config.NEWS_CACHE_TTL)
+    return _news_cache
+
 
 class NewsAgent:
     def __init__(self, query: str):
@@ -32,44 +40,42 @@ class NewsAgent:
         self.news_api_key = config.NEWS_API_KEY
         self.swarm = SwarmHandler(
             agent_name="CryptoNewsAgent",
-            instructions="You are a financial news analyst. Summarize key news articles relevant to the given cryptocurrency."
+            instructions="You are a financial news analyst. Summarize key news articles relevant to the given cryptocurrency.",
+            cache_ttl=900,
         )
 
         logger.info(f"NewsAgent initialized for query: {self.query}")
 
-    def fetch_news(self):
+    async def fetch_news(self):
         """
         Fetches news articles from NewsAPI related to the cryptocurrency.
-        Uses caching to avoid redundant requests.
+        Uses caching to avoid redundant requests and joins an identical request that is already in flight.
         """
-        if self.query in news_cache:
+        articles = get_news_cache().get(self.query)
+        if articles is not None:
             logger.info(f"Using cached news for: {self.query}")
-            return news_cache[self.query]
+            return articles
 
-        url = "https://newsapi.org/v2/everything"
-        params = {
-            "q": self.query,
-            "language": "en",
-            "sortBy": "publishedAt",
-            "apiKey": self.news_api_key
-        }
+        if _news_fetches.in_flight(self.query):
+            logger.info(f"Joining in-flight news request for: {self.query}")
+        return await _news_fetches.do(self.query, self._fetch_from_api)
 
+    async def _fetch_from_api(self):
         logger.info(f"Fetching news for: {self.query}")
 
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            articles = response.json().get("articles", [])
+            response = await fetch_crypto_news(self.query)
+            articles = response.get("articles", [])
 
             if not articles:
                 logger.warning(f"No news articles found for: {self.query}")
                 return []
 
-            news_cache[self.query] = articles[:5]  # Limit to the latest 5 articles
+            get_news_cache().set(self.query, articles[:5])  # Limit to the latest 5 articles
             logger.info(f"Fetched {len(articles[:5])} news articles for: {self.query}")
             return articles[:5]
 
-        except requests.RequestException as e:
+        except (httpx.HTTPError, ValueError) as e:  # ValueError: the response body was not valid JSON
             logger.error(f"Error fetching news for {self.query}: {e}")
             return []
 
@@ -81,24 +87,30 @@ class NewsAgent:
         start_time = time.time()
         logger.info(f"Starting news summarization for: {self.query}")
 
-        articles = self.fetch_news()
+        articles = await self.fetch_news()
         if not articles:
             return "No relevant news found."
 
+        # No new articles since the stored summary: reuse it instead of summarizing the same stories again
+        inputs = news_inputs(articles)
+        stored = await get_stage_store().reuse("news", self.query, inputs)
+        if stored is not None:
+            return stored
+
+        # Deduplicated, truncated article texts that fit the news prompt token budget
+        entries = fit_articles(articles)
+
         # Group articles into batches to optimize summarization requests
         batch_size = 3  # Number of articles per batch request
-        batches = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
+        batches = [entries[i:i + batch_size] for i in range(0, len(entries), batch_size)]
 
         async def summarize_batch(batch, batch_index):
             """
             Summarizes multiple articles together in a single request to reduce API calls.
             """
-            prompts = "\n\n".join([
-                f"Title: {article.get('title', 'No title')}\n"
-                f"Content: {article.get('description', 'No description')}\n"
-                f"Summarize the key insights."
-                for article in batch
-            ])
+            prompts = "Summarize the key insights of these articles:\n\n" + "\n\n".join(
+                f"- {entry}" for entry in batch
+            )
 
             logger.info(f"Processing batch {batch_index + 1}/{len(batches)} with {len(batch)} articles.")
 
@@ -108,11 +120,13 @@ class NewsAgent:
                 return summary
             except Exception as e:
                 logger.error(f"Error summarizing batch {batch_index + 1}: {e}")
-                return "Error summarizing this batch."
+                return _BATCH_ERROR
 
         summaries = await asyncio.gather(*(summarize_batch(batch, i) for i, batch in enumerate(batches)))
 
         summarized_text = "\n\n".join(summaries)
+        if all(summary and summary not in (SwarmHandler.ERROR_REPLY, _BATCH_ERROR) for summary in summaries):
+            await get_stage_store().record("news", self.query, inputs, summarized_text)
         total_time = round(time.time() - start_time, 2)
         logger.info(f"Completed summarization for {self.query}. Total batches: {len(batches)} | Time Taken: {total_time}s")
 
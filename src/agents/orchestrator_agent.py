@@ -1,27 +1,41 @@
 import logging
-import json
 import asyncio
 import time
 from datetime import datetime, timezone
 from src.utils.swarm_handler import SwarmHandler
 from src.db.mongo_client import MongoDB
+from src.db.stage_store import get_stage_store
+from src.models.token_record import TokenRecord
 from src.agents.news_agent import NewsAgent
+from src.config import config
+from src.utils.change_detection import decision_inputs
+from src.utils.decision_parser import DECISIONS, extract_decisions, normalize_decision
+from src.utils.pipeline import PipelineContext, token_key
+from src.utils.prompt_budget import clip, estimate_tokens
 
-# Configure logging to include timestamps
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 logger = logging.getLogger(__name__)
 
 class OrchestratorAgent:
-    def __init__(self, token_results: list):
-        """OrchestratorAgent aggregates token analyses and news summaries to provide a final investment recommendation."""
-        self.token_results = token_results
+    def __init__(self, token_results: list, context: PipelineContext = None):
+        """
+        OrchestratorAgent aggregates token analyses and news summaries to provide a final investment recommendation.
+        When run inside the analysis pipeline, `context` tells it which artifacts earlier stages already produced.
+        """
+        self.token_results = [TokenRecord.coerce(token) for token in token_results]
+        self.context = context or PipelineContext(token_results)
+        self._recorded_decisions = {}
+        self._reused_decisions = {}
+        self._decisions = {}
         self.swarm = SwarmHandler(
             agent_name="InvestmentOrchestrator",
-            instructions="You are a cryptocurrency investment advisor. Analyze the given token reports and news summaries, assess risks, and provide a clear final decision: 'BUY', 'HOLD', or 'AVOID'. Justify your reasoning with key insights.",
+            instructions="You are a cryptocurrency investment advisor. Analyze the given token reports and news summaries, assess risks, and provide a clear final decision: 'BUY', 'HOLD', or 'AVOID'. Justify your reasoning with key insights. Call record_decision once for every token.",
+            functions=[self.record_decision],
+            cache_ttl=0,  # Decisions are captured through tool calls, which a cached reply would skip
+            hedge=False,  # Uncached, long prompts: a duplicate run would double the most expensive call per shard
+        )
+        self.summarizer = SwarmHandler(
+            agent_name="ReportCompactor",
+            instructions="You condense crypto token research into a few dense sentences. Keep figures, risks, trends and sentiment; drop filler.",
         )
         self.mongo_db = MongoDB()
 
@@ -29,89 +43,225 @@ class OrchestratorAgent:
         """Runs evaluation using Swarm and saves it to MongoDB."""
         try:
             start_time = time.time()
-            logger.info("🔍 Fetching news summaries for all tokens...")
+            await self.decide(self.token_results)
+            decisions = await self.finalize()
+            total_time = round(time.time() - start_time, 2)
+            logger.info(f"✅ Final evaluation completed in {total_time}s")
+            return decisions
 
-            async def fetch_news_summary(token):
-                news_agent = NewsAgent(token["symbol"])
-                token["news_summary"] = await news_agent.summarize_news()
-                if not token["news_summary"]:
-                    logger.warning(f"⚠️ No news summary for {token['symbol']}")
-                return token
+        except Exception as e:
+            logger.error(f"❌ Error in final evaluation: {e}", exc_info=True)
+            return "Final evaluation failed."
 
-            self.token_results = await asyncio.gather(*(fetch_news_summary(token) for token in self.token_results))
+    async def decide(self, tokens: list) -> dict:
+        """
+        Decides on `tokens`, some or all of the agent's tokens, and sets their final_decision. The pipeline runs
+        it per shard as soon as that shard's tokens are analyzed; concurrent calls must cover disjoint tokens.
+        Returns {token_key: decision} for the tokens that got one.
+        """
+        async def fetch_news_summary(token):
+            news_agent = NewsAgent(token.symbol)
+            token.news_summary = await news_agent.summarize_news()
+            if not token.news_summary:
+                logger.warning(f"⚠️ No news summary for {token.symbol}")
+            self.context.mark("news", token, token.news_summary)
+            return token
 
-            logger.info("✅ All news summaries retrieved. Generating final investment decision...")
+        # Only fetch news for tokens that no earlier stage has summarized
+        missing_news = [token for token in tokens if not self.context.has("news", token) and not token.news_summary]
+        if missing_news:
+            logger.info(f"🔍 Fetching news summaries for {len(missing_news)} tokens...")
+            await asyncio.gather(*(fetch_news_summary(token) for token in missing_news))
 
-            prompt = self._generate_prompt()
-            decision_result = await self.swarm.run(prompt)
-            logger.info(f"📊 Final decision received: {decision_result}")
+        logger.info(f"✅ News summaries available. Generating final investment decisions for {len(tokens)} tokens...")
 
-            parsed_decision = self._parse_decision_result(decision_result)
-            if not parsed_decision:
-                raise ValueError("⚠️ Failed to parse decision_result.")
+        # Tokens whose stage outputs are unchanged since their stored decision keep it without an LLM call.
+        # Decisions are keyed by token_key, as the same symbol can exist on several chains
+        reused = await self._reuse_decisions(tokens)
+        self._reused_decisions.update(reused)
+        pending = [token for token in tokens if token_key(token) not in reused]
+        decided = dict(reused)
 
-            await self.mongo_db.save_report(self._prepare_report(parsed_decision))
-            total_time = round(time.time() - start_time, 2)
-            logger.info(f"✅ Final evaluation completed in {total_time}s")
+        if pending:
+            if config.ORCHESTRATOR_COMPACT_INPUTS:
+                await self._compact_inputs(pending)
+            decided.update(await self._decide(pending))
+        else:
+            logger.info("♻️ Stage outputs of every token are unchanged; reusing the stored decisions")
 
-            return parsed_decision
+        # Re-ask only for the tokens the model did not decide on, instead of failing the whole run
+        for attempt in range(config.DECISION_REASK_ATTEMPTS):
+            missing = [token for token in tokens if token_key(token) not in decided]
+            if not missing:
+                break
+            logger.warning(
+                f"⚠️ No decision for {[token.symbol for token in missing]}, re-asking (attempt {attempt + 1})"
+            )
+            decided.update(await self._decide(missing))
 
-        except Exception as e:
-            logger.error(f"❌ Error in final evaluation: {e}", exc_info=True)
-            return "Final evaluation failed."
+        stages = get_stage_store()
+        await asyncio.gather(*(
+            stages.record("decision", token_key(token), decision_inputs(token), decided[token_key(token)])
+            for token in pending if token_key(token) in decided
+        ))
+        self._decisions.update(decided)
+        for token in tokens:
+            self._apply_decision(token)
+        return decided
+
+    async def finalize(self) -> dict:
+        """Saves the run's report with the decisions made so far (HOLD for the rest); returns them by token_key."""
+        await self.context.save_report(self.mongo_db, self._prepare_report())
+        return {
+            token_key(token): self._decisions[token_key(token)]
+            for token in self.token_results if token_key(token) in self._decisions
+        }
+
+    def record_decision(self, symbol: str, decision: str, chain: str = "", address: str = ""):
+        """
+        Record the final investment decision for one token. Pass the token's `chain` and contract `address`
+        as shown in its report. `decision` must be one of BUY, HOLD or AVOID.
+        """
+        normalized = normalize_decision(decision)
+        if normalized is None:
+            return f"Invalid decision '{decision}'. Use one of {', '.join(DECISIONS)}."
+        address = address.strip().lower()
+        key = f"{chain.strip()}:{address}" if chain.strip() and address else symbol.strip().upper()
+        self._recorded_decisions[key] = normalized
+        return f"Recorded {normalized} for {symbol}."
 
-    def _generate_prompt(self):
+    async def _reuse_decisions(self, tokens: list) -> dict:
+        """Stored decisions of the tokens whose analysis, TA and news outputs are all unchanged."""
+        stages = get_stage_store()
+        stored = await asyncio.gather(*(
+            stages.reuse("decision", token_key(token), decision_inputs(token)) for token in tokens
+        ))
+        return {token_key(token): decision for token, decision in zip(tokens, stored) if decision is not None}
+
+    async def _compact_inputs(self, tokens: list):
+        """Summarizes tokens whose stage outputs exceed ORCHESTRATOR_COMPACT_THRESHOLD estimated tokens."""
+        async def compact(token):
+            section = self._format_token(token)
+            summary = await self.summarizer.run(f"Condense this report in at most 4 sentences:\n\n{section}")
+            if summary and summary != SwarmHandler.ERROR_REPLY:
+                token.compact_summary = summary
+
+        verbose = [
+            token for token in tokens
+            if not token.compact_summary
+            and estimate_tokens(self._format_token(token)) > config.ORCHESTRATOR_COMPACT_THRESHOLD
+        ]
+        if verbose:
+            logger.info(f"🗜️ Compacting stage outputs of {len(verbose)} tokens before the final decision")
+            await asyncio.gather(*(compact(token) for token in verbose))
+
+    def _shard(self, tokens: list) -> list:
+        """Packs tokens into consecutive shards that stay under the prompt token budget and shard size limit."""
+        shards, current, current_size = [], [], 0
+        for token in tokens:
+            size = estimate_tokens(self._format_token(token, compact=True))
+            if current and (
+                current_size + size > config.ORCHESTRATOR_SHARD_TOKEN_BUDGET
+                or len(current) >= config.ORCHESTRATOR_MAX_SHARD_SIZE
+            ):
+                shards.append(current)
+                current, current_size = [], 0
+            current.append(token)
+            current_size += size
+        if current:
+            shards.append(current)
+        return shards
+
+    async def _decide(self, tokens: list) -> dict:
+        """Evaluates `tokens` shard by shard, concurrently, and merges the decisions."""
+        shards = self._shard(tokens)
+        if len(shards) > 1:
+            logger.info(f"🧩 Evaluating {len(tokens)} tokens in {len(shards)} shards")
+
+        decisions = {}
+        for result in await asyncio.gather(*(self._request_decisions(shard) for shard in shards)):
+            decisions.update(result)
+        return decisions
+
+    async def _request_decisions(self, tokens: list) -> dict:
+        """
+        Asks the model for decisions on `tokens`, keyed by token_key; tool-call results win over decisions parsed
+        from the text reply.
+        """
+        decision_result = await self.swarm.run(self._generate_prompt(tokens))
+        logger.info("📊 Final decision received: %s", clip(decision_result))
+
+        decisions = self._parse_decision_result(decision_result, tokens)
+        decisions.update(self._match_decisions(self._recorded_decisions, tokens))
+        return decisions
+
+    @staticmethod
+    def _match_decisions(source, tokens: list) -> dict:
+        """
+        Maps decisions in `source` (a reply or mapping) onto the token_key of each of `tokens`. Answers keyed by
+        symbol are accepted too, but only for symbols that are unique among `tokens`.
+        """
+        symbols = [token.symbol for token in tokens]
+        unique = [symbol for symbol in symbols if symbols.count(symbol) == 1]
+        found = extract_decisions(source, [token_key(token) for token in tokens] + unique)
+        decisions = {}
+        for token in tokens:
+            decision = found.get(token_key(token)) or found.get(token.symbol)
+            if decision:
+                decisions[token_key(token)] = decision
+        return decisions
+
+    @staticmethod
+    def _format_token(token: TokenRecord, compact: bool = False) -> str:
+        header = f"Token: {token.symbol} ({token.chainId}), key: {token_key(token)}\n"
+        if compact and token.compact_summary:
+            return header + f"Summary: {token.compact_summary}"
+        return (
+            header
+            + f"Analysis: {token.analysis or 'No analysis available'}\n"
+            f"TAAPI Analysis: {token.taapi_analysis or 'No TA data available'}\n"
+            f"News Summary: {token.news_summary or 'No news available'}"
+        )
+
+    def _generate_prompt(self, tokens: list = None):
         """Генерирует промпт для финального решения."""
         formatted_results = "\n\n".join(
-            [
-                f"Token: {token['symbol']} ({token['chainId']})\n"
-                f"Analysis: {token.get('analysis', 'No analysis available')}\n"
-                f"TAAPI Analysis: {token.get('taapi_analysis', 'No TA data available')}\n"
-                f"News Summary: {token.get('news_summary', 'No news available')}"
-                for token in self.token_results
-            ]
+            self._format_token(token, compact=True) for token in (self.token_results if tokens is None else tokens)
         )
         return (
             f"Here are multiple cryptocurrency analysis reports with news summaries:\n\n{formatted_results}\n\n"
             "Based on these insights, provide a final decision for each token: "
             "Should an investor 'BUY', 'HOLD', or 'AVOID' these tokens? "
-            "Return your response as a JSON object where each token's symbol is the key "
+            "Return your response as a JSON object where each token's key (as given after 'key:') is the key "
             "and the value is one of ['BUY', 'HOLD', 'AVOID']. No extra formatting, just raw JSON."
         )
 
-    def _parse_decision_result(self, decision_result):
-        """Parses the decision result into a dictionary format."""
-        if isinstance(decision_result, dict):
-            return decision_result
-
-        if isinstance(decision_result, str):
-            try:
-                # Удаляем возможные код-блоки Markdown
-                decision_result_cleaned = decision_result.strip().replace("```json", "").replace("```", "").strip()
-                logger.info(
-                    f"🔍 Parsing decision_result: {decision_result_cleaned[:500]}...")  # Логирование первых 500 символов
-
-                # Пробуем распарсить JSON
-                parsed_result = json.loads(decision_result_cleaned)
-                if isinstance(parsed_result, dict):
-                    return parsed_result
-                else:
-                    logger.error(f"⚠️ Unexpected JSON structure: {parsed_result}")
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Failed to parse decision_result: {e}\nRaw response: {decision_result}")
-
-        return {}  # Возвращаем пустой словарь вместо None
-
-    def _prepare_report(self, decision_result):
+    def _parse_decision_result(self, decision_result, tokens: list = None):
+        """Recovers per-token decisions from the reply, even when it is partial or not valid JSON."""
+        tokens = self.token_results if tokens is None else tokens
+        decisions = self._match_decisions(decision_result, tokens)
+        if len(decisions) < len(tokens):
+            logger.warning("⚠️ Parsed %d/%d decisions from: %s", len(decisions), len(tokens), clip(decision_result))
+        return decisions
+
+    def _apply_decision(self, token: TokenRecord):
+        token_decision = self._decisions.get(token_key(token))
+        token.final_decision = token_decision or "HOLD"  # Default to HOLD if still missing
+        if token_key(token) in self._reused_decisions:
+            token.decision_source = "stored"
+        else:
+            token.decision_source = "model" if token_decision else "default"
+
+    def _prepare_report(self):
         """Prepares the final report before saving to MongoDB."""
         report = {
-            "date": datetime.now(timezone.utc).isoformat(),
+            "date": datetime.now(timezone.utc),
+            "run_id": self.context.run_id,
             "tokens": []
         }
 
         for token in self.token_results:
-            token_decision = decision_result.get(token["symbol"], "HOLD")  # Default to HOLD if missing
-            token["final_decision"] = token_decision
+            self._apply_decision(token)
             report["tokens"].append(token)
 
         return report
@@ -1,63 +1,94 @@
-import requests
 import logging
 from src.config import config
+from src.clients.binance_client import fetch_candles
+from src.clients.taapi_client import fetch_technical_indicators
+from src.db.stage_store import get_stage_store
+from src.utils.change_detection import taapi_inputs
+from src.utils.cache import TTLCache
+from src.utils.prompt_budget import clip, format_value
+from src.utils.singleflight import SingleFlight
 from src.utils.swarm_handler import SwarmHandler
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 logger = logging.getLogger(__name__)
 
+# Seeded local indicator engines per symbol, so later runs only fold in new candles
+_engines = TTLCache(maxsize=512, ttl=6 * 3600)
+
+# Concurrent analyses of the same symbol across searches share one fetch and LLM call
+_analyses = SingleFlight()
+
 class TAAPIAgent:
     def __init__(self, token_symbol: str):
         """Агент получает символ токена и запрашивает технические индикаторы с TAAPI.io."""
         self.token_symbol = token_symbol
-        self.taapi_api_key = config.TAAPI_KEY
-        self.taapi_base_url = "https://api.taapi.io"
 
         self.swarm = SwarmHandler(
             agent_name="TAAPIAgent",
-            instructions="You are a technical analysis expert. Analyze the given cryptocurrency indicators (SMA, RSI) and provide insights on market trends."
+            instructions="You are a technical analysis expert. Analyze the given cryptocurrency indicators (SMA, RSI, MACD) and provide insights on market trends.",
+            cache_ttl=300,
         )
 
-    def fetch_ta_indicators(self) -> dict:
-        """Запрос технических индикаторов с TAAPI.io."""
+    async def fetch_ta_indicators(self) -> dict:
+        """Запрос технических индикаторов с TAAPI.io через общий /bulk запрос."""
         try:
             logger.info(f"Fetching TA indicators for {self.token_symbol}")
 
-            params = {
-                "secret": self.taapi_api_key,
-                "exchange": "binance",
-                "symbol": self.token_symbol,
-                "interval": "1h",
-                "optInTimePeriod": 14
-            }
-
-            sma_response = requests.get(f"{self.taapi_base_url}/sma", params=params)
-            rsi_response = requests.get(f"{self.taapi_base_url}/rsi", params=params)
+            if config.TA_SOURCE.lower() == "local":
+                indicators = await self._compute_local_indicators()
+            else:
+                indicators = await fetch_technical_indicators(self.token_symbol)
 
-            sma = sma_response.json().get("value")
-            rsi = rsi_response.json().get("value")
+            logger.debug("TA indicators for %s: %s", self.token_symbol, clip(indicators))
 
-            logger.info(f"TA indicators for {self.token_symbol}: SMA={sma}, RSI={rsi}")
-
-            return {"sma": sma, "rsi": rsi}
+            return indicators
         except Exception as e:
             logger.error(f"Error fetching TA indicators: {e}")
             return {"error": str(e)}
 
+    async def _compute_local_indicators(self) -> dict:
+        """Computes indicators locally from Binance candles instead of calling TAAPI for each one."""
+        from src.utils.indicators import IndicatorEngine  # Deferred: numpy is only needed with TA_SOURCE=local
+
+        engine = _engines.get(self.token_symbol)
+        if engine is None:
+            engine = IndicatorEngine.from_candles(await fetch_candles(self.token_symbol, interval="1h"))
+        else:
+            new_candles = await fetch_candles(self.token_symbol, interval="1h", start_time=engine.last_timestamp)
+            for candle in new_candles:
+                if candle.timestamp > engine.last_timestamp:
+                    engine.update(candle)
+
+        _engines.set(self.token_symbol, engine)
+        return engine.indicators().model_dump()
+
     async def analyze(self):
         """Анализирует технические индикаторы с помощью Swarm AI."""
-        ta_data = self.fetch_ta_indicators()
+        return await _analyses.do(self.token_symbol.upper(), self._analyze)
+
+    async def _analyze(self):
+        ta_data = await self.fetch_ta_indicators()
+
+        # Indicators failed to load: nothing to compare, and nothing worth storing as a baseline
+        gated = "error" not in ta_data
+        key, inputs = self.token_symbol.upper(), taapi_inputs(ta_data)
+        if gated:
+            stored = await get_stage_store().reuse("taapi", key, inputs)
+            if stored is not None:
+                return stored
 
         prompt = f"""
             Cryptocurrency: {self.token_symbol}
-            SMA (Simple Moving Average): {ta_data.get('sma', 'No data')}
-            RSI (Relative Strength Index): {ta_data.get('rsi', 'No data')}
+            SMA (Simple Moving Average): {format_value(ta_data.get('sma'))}
+            RSI (Relative Strength Index): {format_value(ta_data.get('rsi'))}
+            MACD: {format_value(ta_data.get('macd'))}
+            EMA (Exponential Moving Average): {format_value(ta_data.get('ema'))}
+            ATR (Average True Range): {format_value(ta_data.get('atr'))}
+            Bollinger Bands (upper, middle, lower): {format_value(ta_data.get('bollinger_bands'))}
 
             Analyze these indicators and provide a short, actionable market insight.
         """
 
-        return await self.swarm.run(prompt)
+        result = await self.swarm.run(prompt)
+        if gated and result and result != SwarmHandler.ERROR_REPLY:
+            await get_stage_store().record("taapi", key, inputs, result)
+        return result
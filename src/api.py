@@ -1,42 +1,68 @@
 import logging
 import asyncio
-from fastapi import FastAPI, Request, Query, BackgroundTasks
+import uuid
+from fastapi import BackgroundTasks, FastAPI, Request, Query, HTTPException, Path
+from pydantic import BaseModel, Field
 from fastapi.templating import Jinja2Templates
-from starlette.responses import FileResponse
+from starlette.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
 import uvicorn
-from datetime import datetime, timezone
 from fastapi.staticfiles import StaticFiles
 
-from src.clients.moralis_client import search_tokens
-from src.agents.moralis_agent import MoralisAgent
-from src.agents.orchestrator_agent import OrchestratorAgent
-from src.db.mongo_client import MongoDB, close_mongo_connection
-from src.agents.news_agent import NewsAgent
-from src.agents.taapi_agent import TAAPIAgent
+from src.config import config
+from src.clients.moralis_client import enrich_tokens, search_tokens
+from src.clients.http_clients import http_clients
+from src.db.decision_store import DecisionStore
+from src.db.mongo_client import MongoDB, close_mongo_connection, get_mongo_client
+from src.pipeline import refresh_token_decisions, run_analysis_pipeline
+from src.jobs.queue import JobQueueFull, create_job_queue
+from src.models.token_record import TokenRecord
+from src.utils.pipeline import token_key
+from src.utils.events import create_stream, format_sse, get_stream
+from src.utils.llm_engine import close_llm_engine
+from src.utils.cache import TTLCache
+from src.utils.singleflight import SingleFlight
+from src.utils.metrics import registry as metrics_registry, setup_tracing, span
+from src.utils.prompt_budget import clip
+from src.utils.rate_limiter import TokenBucket
+from src.utils.serialization import dumps
+from src.utils.startup import setup_logging
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
 logger = logging.getLogger(__name__)
 
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson when available, skipping FastAPI's jsonable_encoder pass."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
 # Application Lifecycle Management
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles startup and shutdown cleanups."""
     try:
+        setup_logging()
         logger.info("Application is starting...")
+        setup_tracing()
+        http_clients.start()
+        get_mongo_client()
+        await db_client.ensure_indexes()
+        if config.JOB_RUN_WORKERS_IN_API:
+            await get_job_queue().start()
         yield
     except asyncio.CancelledError:
         logger.warning("Application received cancellation signal.")
     finally:
         logger.info("Application is shutting down...")
+        if _job_queue is not None:
+            await _job_queue.stop()  # Stop pipeline workers before closing the clients they use
         await close_mongo_connection()  # Properly close MongoDB connection
+        close_llm_engine()  # Release the shared LLM executor and HTTP pool
+        await http_clients.aclose()  # Close pooled upstream connections
         logger.info("Shutdown process completed.")
 
 # Initialize FastAPI application
@@ -44,6 +70,105 @@ app = FastAPI(title="Crypto Token API", description="API for searching crypto to
 templates = Jinja2Templates(directory="templates")
 db_client = MongoDB()
 
+# Built on first use rather than at import, so importing the app does not load the settings
+_job_queue = None
+_decision_store = None
+_search_flights = None
+_recent_runs = None
+_miss_limiter = None
+_refresh_limiter = None
+
+# Moralis chain ids (0x1, 0x38, ...) and EVM contract addresses
+CHAIN_PATTERN = r"^0x[0-9a-fA-F]+$"
+ADDRESS_PATTERN = r"^0x[0-9a-fA-F]{40}$"
+
+
+async def refresh_decisions(tokens: list, run_id=None):
+    """
+    Re-analysis job for a batch of stale or unknown decisions; their cached entries are dropped once the new ones
+    are stored. Failed jobs (including unknown tokens) leave the store's refresh cooldown in place until it expires.
+    """
+    result = await refresh_token_decisions(tokens, run_id=run_id)
+    decision_store = get_decision_store()
+    for chain, address in tokens:
+        decision_store.invalidate(chain, address)
+    return result
+
+
+async def schedule_refresh(keys: list):
+    """
+    Queues one re-analysis job for a batch of (chain, address) keys; returns its id, or None when more than
+    DECISION_REFRESH_RATE_LIMIT jobs were queued within DECISION_REFRESH_RATE_PERIOD.
+    """
+    if not get_refresh_limiter().try_acquire():
+        logger.info(f"Decision refresh rate limit reached; {len(keys)} token(s) wait for their cooldown.")
+        return None
+    dedup_key = "decision:{}:{}".format(*keys[0]) if len(keys) == 1 else None  # The cooldown deduplicates batches
+    payload = {"tokens": [list(key) for key in keys]}
+    return await get_job_queue().enqueue("refresh_decisions", payload, dedup_key=dedup_key)
+
+
+def get_job_queue():
+    """Returns the API's job queue with the analysis and decision refresh handlers registered."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = create_job_queue()
+        _job_queue.register("analysis", run_analysis_pipeline)
+        _job_queue.register("refresh_decisions", refresh_decisions)
+    return _job_queue
+
+
+def get_decision_store() -> DecisionStore:
+    """Dashboards read stored decisions from memory; stale ones are re-analyzed in the background."""
+    global _decision_store
+    if _decision_store is None:
+        _decision_store = DecisionStore(
+            db_client,
+            on_stale=schedule_refresh,
+            ttl=config.DECISION_CACHE_TTL,
+            maxsize=config.DECISION_CACHE_MAX_ENTRIES,
+            fresh_seconds=config.DECISION_FRESH_SECONDS,
+            refresh_cooldown=config.DECISION_REFRESH_COOLDOWN,
+            batch_size=config.DECISION_REFRESH_BATCH_SIZE,
+        )
+    return _decision_store
+
+
+def get_search_flights() -> SingleFlight:
+    """Identical concurrent searches share one Moralis lookup, which is reused briefly afterwards."""
+    global _search_flights
+    if _search_flights is None:
+        _search_flights = SingleFlight(memo_ttl=config.SEARCH_MEMO_SECONDS)
+    return _search_flights
+
+
+def get_recent_runs() -> TTLCache:
+    """Analysis run of each recent search query, so repeated searches join it instead of starting another."""
+    global _recent_runs
+    if _recent_runs is None:
+        _recent_runs = TTLCache(maxsize=1000, ttl=config.ANALYSIS_MEMO_SECONDS)
+    return _recent_runs
+
+
+def get_miss_limiter() -> TokenBucket:
+    """Bounds how many analyses of unknown tokens /decision starts, as each one costs upstream and LLM calls."""
+    global _miss_limiter
+    if _miss_limiter is None:
+        _miss_limiter = TokenBucket(rate=config.DECISION_MISS_RATE_LIMIT, period=config.DECISION_MISS_RATE_PERIOD)
+    return _miss_limiter
+
+
+def get_refresh_limiter() -> TokenBucket:
+    """Bounds how many decision refresh jobs (one per batch of stale or unknown tokens) the API queues."""
+    global _refresh_limiter
+    if _refresh_limiter is None:
+        _refresh_limiter = TokenBucket(rate=config.DECISION_REFRESH_RATE_LIMIT, period=config.DECISION_REFRESH_RATE_PERIOD)
+    return _refresh_limiter
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
 # Serve static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -63,48 +188,79 @@ async def home(request: Request):
         "error_message": None,
     })
 
+async def run_search(query: str) -> dict:
+    """
+    Looks up tokens for a query and queues (or joins) their analysis run.
+    Returns the page/response data: query, results (token records), run_id, not_found, error_message and
+    streaming (whether /search/stream/{run_id} carries the run's events; otherwise poll /jobs/{run_id}).
+    """
+    logger.info(f"Received search query: {query}")
+    outcome = {
+        "query": query, "results": [], "run_id": None, "not_found": False, "error_message": None,
+        # Run streams live in the process that runs the pipeline; separate workers can only be polled
+        "streaming": config.JOB_RUN_WORKERS_IN_API,
+    }
+
+    if len(query.strip()) < 2:
+        outcome["error_message"] = "🚨 Query too short. Please enter at least 2 characters."
+        return outcome
+
+    normalized_query = normalize_query(query)
+
+    async def lookup():
+        data = await search_tokens(normalized_query)
+        if config.MORALIS_ENRICH_RESULTS and data and "result" in data:
+            await enrich_tokens(data["result"])
+        return data
+
+    with span("search", target="moralis"):
+        token_data = await get_search_flights().do(normalized_query, lookup)
+    logger.info(f"Retrieved {len((token_data or {}).get('result') or [])} tokens for: {normalized_query}")
+    logger.debug("Token data: %s", clip(token_data))
+
+    if not token_data or "result" not in token_data:
+        outcome["not_found"] = True
+        return outcome
+
+    # Compact per-request records; the shared (memoized) Moralis response itself is never modified
+    results = [TokenRecord.from_moralis(token) for token in token_data.get("result", [])]
+    outcome["results"] = results
+
+    # Display table first, then stream analysis and final decision from the queued (or shared) run
+    recent_runs = get_recent_runs()
+    run_id = recent_runs.get(normalized_query)
+    try:
+        if run_id is None or get_stream(run_id) is None:
+            job_id = uuid.uuid4().hex
+            run_id = await get_job_queue().enqueue(
+                "analysis",
+                {"results": [token.to_dict() for token in results], "run_id": job_id},
+                dedup_key=f"search:{normalized_query}",
+                job_id=job_id,
+            )
+            create_stream(run_id)
+            recent_runs.set(normalized_query, run_id)
+        else:
+            logger.info(f"Attaching search '{normalized_query}' to recent run {run_id}")
+    except JobQueueFull as e:
+        logger.warning(f"Analysis not queued for '{query}': {e}")
+        run_id = None
+        outcome["error_message"] = "Analysis queue is busy, showing search results only. Please try again shortly."
+
+    outcome["run_id"] = run_id
+    return outcome
+
 @app.get("/search")
-async def search(request: Request, query: str = Query(default=""), background_tasks: BackgroundTasks = None):
+async def search(request: Request, query: str = Query(default="")):
     """Token search + analysis via MoralisAgent + final decision via OrchestratorAgent."""
     try:
-        logger.info(f"Received search query: {query}")
-
-        if len(query.strip()) < 2:
-            return templates.TemplateResponse("tokens.html", {
-                "request": request,
-                "query": query,
-                "results": [],
-                "not_found": False,
-                "error_message": "🚨 Query too short. Please enter at least 2 characters.",
-            })
-
-        token_data = await search_tokens(query)
-        logger.info(f"Retrieved token data: {token_data}")
-
-        if not token_data or "result" not in token_data:
-            return templates.TemplateResponse("tokens.html", {
-                "request": request,
-                "query": query,
-                "results": [],
-                "not_found": True,
-                "error_message": None,
-            })
-
-        results = token_data.get("result", [])
-
-        # Display table first, then process analysis and final decision in the background
-        response = templates.TemplateResponse("tokens.html", {
+        outcome = await run_search(query)
+        return templates.TemplateResponse("tokens.html", {
             "request": request,
-            "query": query,
-            "results": results,
-            "not_found": False,
-            "error_message": None,
+            **outcome,
+            "token_keys": [token_key(token) for token in outcome["results"]],
         })
 
-        background_tasks.add_task(run_analysis_pipeline, results)
-
-        return response
-
     except Exception as e:
         logger.error(f"API error: {e}", exc_info=True)
         return templates.TemplateResponse("tokens.html", {
@@ -115,43 +271,110 @@ async def search(request: Request, query: str = Query(default=""), background_ta
             "error_message": f"🚨 API error: {str(e)}",
         })
 
-async def run_analysis_pipeline(results):
+@app.get("/api/search")
+async def search_json(query: str = Query(default="")):
+    """JSON variant of /search for programmatic clients; poll /jobs/{run_id} or stream /search/stream/{run_id}."""
+    try:
+        outcome = await run_search(query)
+    except Exception as e:
+        logger.error(f"API error: {e}", exc_info=True)
+        return FastJSONResponse({"query": query, "error": str(e)}, status_code=502)
+
+    if outcome["error_message"] and not outcome["results"] and not outcome["not_found"]:
+        return FastJSONResponse({"query": query, "error": outcome["error_message"]}, status_code=400)
+    return FastJSONResponse({
+        "query": query,
+        "run_id": outcome["run_id"],
+        "streaming": outcome["streaming"],
+        "not_found": outcome["not_found"],
+        "error": outcome["error_message"],
+        "tokens": [{"key": token_key(token), **token.to_dict()} for token in outcome["results"]],
+    })
+
+@app.get("/search/stream/{run_id}")
+async def search_stream(run_id: str):
     """
-    Запускает анализ MoralisAgent, NewsAgent и TAAPIAgent, а затем передает результаты в OrchestratorAgent.
+    Server-Sent Events stream of per-token analyses and decisions for a pipeline run. Only available when
+    workers run in the API process (JOB_RUN_WORKERS_IN_API); with separate workers poll /jobs/{run_id}.
     """
-    logger.info("Starting background token analysis...")
+    if not config.JOB_RUN_WORKERS_IN_API:
+        raise HTTPException(status_code=404, detail="Live streams need in-API workers; poll /jobs/{run_id} instead.")
+    stream = get_stream(run_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired run ID.")
 
-    # Анализ MoralisAgent
-    moralis_tasks = [MoralisAgent(token).analyze() for token in results]
-    moralis_analyses = await asyncio.gather(*moralis_tasks, return_exceptions=True)
+    async def event_source():
+        async for event in stream.subscribe():
+            yield format_sse(event)
 
-    # Анализ TAAPIAgent
-    taapi_tasks = [TAAPIAgent(token["symbol"]).analyze() for token in results]
-    taapi_analyses = await asyncio.gather(*taapi_tasks, return_exceptions=True)
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # Добавляем результаты в tokens (ПРОВЕРЯЕМ, ЧТО 'analysis' ВСЕГДА ЕСТЬ)
-    for token, moralis_analysis, taapi_analysis in zip(results, moralis_analyses, taapi_analyses):
-        token["analysis"] = moralis_analysis if isinstance(moralis_analysis, str) else "Analysis not available."
-        token["taapi_analysis"] = taapi_analysis if isinstance(taapi_analysis, str) else "Analysis not available."
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status and result of a queued analysis pipeline."""
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job ID.")
 
-    logger.info("Running final investment decision...")
+    return {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "error": job.get("error"),
+        "result": job.get("result"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
 
-    # Запускаем NewsAgent
-    batch_size = 3
-    token_batches = [results[i:i + batch_size] for i in range(0, len(results), batch_size)]
-    news_tasks = [NewsAgent([token["symbol"] for token in batch]).summarize_news() for batch in token_batches]
-    news_summaries = await asyncio.gather(*news_tasks, return_exceptions=True)
+class TokenRef(BaseModel):
+    chain: str = Field(pattern=CHAIN_PATTERN)
+    address: str = Field(pattern=ADDRESS_PATTERN)
 
-    # Записываем новости в результаты
-    for batch, summary in zip(token_batches, news_summaries):
-        for token in batch:
-            token["news_summary"] = summary if isinstance(summary, str) else "No news available."
 
-    logger.info("Running final investment decision...")
+class DecisionsRequest(BaseModel):
+    tokens: list[TokenRef] = Field(max_length=1000)
 
-    # Запускаем OrchestratorAgent
-    orchestrator = OrchestratorAgent(results)
-    final_decisions = await orchestrator.evaluate()
 
-    await db_client.save_report({"date": datetime.now(timezone.utc).isoformat(), "tokens": results})
-    logger.info("Final investment decision stored in MongoDB.")
+@app.get("/decision/{chain}/{address}")
+async def decision(background_tasks: BackgroundTasks, chain: str = Path(pattern=CHAIN_PATTERN),
+                   address: str = Path(pattern=ADDRESS_PATTERN)):
+    """
+    Latest stored decision for a token and its age; never runs the pipeline inline. Unknown tokens are queued
+    for analysis, at most DECISION_MISS_RATE_LIMIT per DECISION_MISS_RATE_PERIOD (429 beyond that, 503 when the
+    job could not be queued).
+    """
+    decision_store = get_decision_store()
+    result = await decision_store.get(chain, address)
+    background_tasks.add_task(decision_store.refresh_stale)
+    if result is None:
+        if not decision_store.is_refreshing(chain, address) and not get_miss_limiter().try_acquire():
+            raise HTTPException(status_code=429, detail="Too many unknown tokens requested, try again shortly.")
+        job_id = await decision_store.schedule_refresh(chain, address)
+        return FastJSONResponse(
+            {"chain": chain, "address": address.lower(), "decision": None, "job_id": job_id},
+            status_code=202 if job_id else 503,
+        )
+    return FastJSONResponse(result)
+
+@app.post("/decisions")
+async def decisions(request: DecisionsRequest, background_tasks: BackgroundTasks):
+    """
+    Bulk variant of /decision: latest stored decisions for many tokens, misses loaded in one query. Stale ones
+    are re-analyzed in batched jobs queued after the response is sent.
+    """
+    decision_store = get_decision_store()
+    results = await decision_store.get_many([(token.chain, token.address) for token in request.tokens])
+    background_tasks.add_task(decision_store.refresh_stale)
+    return FastJSONResponse({
+        "decisions": [result for result in results.values() if result is not None],
+        "missing": [{"chain": chain, "address": address} for (chain, address), result in results.items() if result is None],
+    })
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: per-stage and per-upstream latency histograms, in-flight gauges, errors and LLM usage."""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
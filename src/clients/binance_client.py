@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+from src.clients.http_clients import http_clients
+from src.models.models import OHLCData
+
+BASE_URL = "https://api.binance.com/api/v3"
+
+async def fetch_candles(symbol: str, interval: str = "1h", limit: int = 200, start_time: datetime = None) -> list:
+    """Fetches closed OHLC candles (oldest first) for SYMBOL/USDT from the public klines endpoint."""
+    params = {"symbol": symbol.upper() + "USDT", "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = int(start_time.timestamp() * 1000)
+
+    response = await http_clients.request("binance", "GET", f"{BASE_URL}/klines", params=params)
+
+    now_ms = datetime.now(timezone.utc).timestamp() * 1000
+    return [
+        OHLCData(
+            timestamp=datetime.fromtimestamp(kline[0] / 1000, tz=timezone.utc),
+            open=float(kline[1]),
+            high=float(kline[2]),
+            low=float(kline[3]),
+            close=float(kline[4]),
+            volume=float(kline[5]),
+        )
+        for kline in response.json()
+        if kline[6] < now_ms  # Skip the candle that is still open
+    ]
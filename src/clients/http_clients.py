@@ -0,0 +1,134 @@
+import asyncio
+import importlib.util
+import logging
+import httpx
+from src.config import config
+from src.utils.metrics import span
+from src.utils.resilience import DeadlineExceeded, get_breaker, remaining, timeout_for, within_deadline
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Per-upstream connection settings
+UPSTREAMS = {
+    "moralis": {"timeout": 10.0, "connect_timeout": 5.0, "max_connections": 50, "keepalive": 20, "retries": 2},
+    "news": {"timeout": 10.0, "connect_timeout": 5.0, "max_connections": 20, "keepalive": 10, "retries": 2},
+    "taapi": {"timeout": 15.0, "connect_timeout": 5.0, "max_connections": 10, "keepalive": 5, "retries": 1},
+    "binance": {"timeout": 10.0, "connect_timeout": 5.0, "max_connections": 20, "keepalive": 10, "retries": 2},
+}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """Raised without a network call when an upstream's circuit is open or the run's deadline is spent."""
+
+
+class HttpClientRegistry:
+    """Owns one pooled httpx.AsyncClient per upstream for the lifetime of the application."""
+
+    def __init__(self, upstreams: dict):
+        self.upstreams = upstreams
+        self._clients = {}
+        self._transports = {}
+        self._limiters = {}
+
+    def set_transport(self, name: str, transport: httpx.AsyncBaseTransport):
+        """Routes an upstream through a custom transport (e.g. an in-process fake for benchmarks)."""
+        self._transports[name] = transport
+        self._clients.pop(name, None)
+
+    def set_limiter(self, name: str, acquire):
+        """Makes every request to an upstream, retries included, first await `acquire()` (e.g. a rate limiter)."""
+        self._limiters[name] = acquire
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        settings = self.upstreams[name]
+        return httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+            limits=httpx.Limits(
+                max_connections=settings["max_connections"],
+                max_keepalive_connections=settings["keepalive"],
+                keepalive_expiry=30.0,
+            ),
+            # Transport-level retries cover connection errors only; status retries are in `request`
+            transport=self._transports.get(name)
+            or httpx.AsyncHTTPTransport(http2=HTTP2_AVAILABLE, retries=settings["retries"]),
+        )
+
+    def start(self):
+        """Creates clients for every configured upstream."""
+        for name in self.upstreams:
+            self.get(name)
+        logger.info(f"HTTP clients ready for: {', '.join(self._clients)} (HTTP/2: {HTTP2_AVAILABLE})")
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Returns the shared client for an upstream, creating it lazily (e.g. outside the API lifespan)."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create(name)
+            self._clients[name] = client
+        return client
+
+    async def request(self, name: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request, retrying rate-limited and 5xx responses with exponential backoff (or the upstream's
+        Retry-After, capped at HTTP_MAX_RETRY_AFTER). Timeouts shrink to the run's remaining deadline, and an
+        upstream whose circuit is open fails fast with UpstreamUnavailable (an httpx.TransportError, so callers
+        degrade as on a network error).
+        """
+        settings = self.upstreams[name]
+        retries = settings["retries"]
+        breaker = get_breaker(name)
+        limiter = self._limiters.get(name)
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                raise UpstreamUnavailable(f"{name} is failing, circuit open")
+            try:
+                if limiter is not None:
+                    await within_deadline(limiter())
+                timeout = timeout_for(settings["timeout"])
+            except DeadlineExceeded:
+                raise UpstreamUnavailable(f"No time left for a {name} request") from None
+
+            try:
+                with span("http", target=name):
+                    response = await self.get(name).request(
+                        method, url, timeout=httpx.Timeout(timeout, connect=min(timeout, settings["connect_timeout"])),
+                        **kwargs,
+                    )
+            except httpx.TransportError as e:
+                # A timeout cut short by the run's deadline says nothing about the upstream's health
+                if not (isinstance(e, httpx.TimeoutException) and timeout < settings["timeout"]):
+                    breaker.record_failure()
+                raise
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+            elif response.status_code != 429:  # Rate limiting is backed off from, not a provider failure
+                breaker.record_success()
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                response.raise_for_status()
+                return response
+
+            try:
+                delay = float(response.headers.get("Retry-After", 0.5 * 2 ** attempt))
+            except ValueError:
+                delay = 0.5 * 2 ** attempt
+            delay = min(max(delay, 0.0), config.HTTP_MAX_RETRY_AFTER)
+            left = remaining()
+            if left is not None and left <= delay:
+                response.raise_for_status()  # Backing off would outlast the run's deadline
+            logger.warning(f"{name} returned {response.status_code}, retrying in {delay}s ({attempt + 1}/{retries})")
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        """Closes every client and its connection pool."""
+        clients, self._clients = self._clients, {}
+        await asyncio.gather(*(client.aclose() for client in clients.values()), return_exceptions=True)
+
+
+http_clients = HttpClientRegistry(UPSTREAMS)
@@ -1,49 +1,147 @@
+import asyncio
 import httpx
+import logging
+from collections import defaultdict
 from src.config import config
+from src.clients.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://deep-index.moralis.io/api/v2.2"
 
-HEADERS = {
-    "X-API-Key": config.MORALIS_API_KEY,
-    "accept": "application/json"
-}
+def _headers() -> dict:
+    # Built per call so importing the client does not load the settings
+    return {
+        "X-API-Key": config.MORALIS_API_KEY,
+        "accept": "application/json"
+    }
+
+# Provider limits for the multi-address endpoints
+PRICES_BATCH_SIZE = 25
+METADATA_BATCH_SIZE = 10
 
 
 async def search_tokens(query: str) -> dict:
     url = f"{BASE_URL}/tokens/search"
     params = {"query": query}
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=HEADERS, params=params)
-        response.raise_for_status()
-        return response.json()
+    response = await http_clients.request("moralis", "GET", url, headers=_headers(), params=params)
+    return response.json()
+
+
+def is_address(value: str) -> bool:
+    return value.lower().startswith("0x") and len(value) > 10
+
+
+def pick_token(entry: str, candidates: list):
+    """Chooses the search result that matches an entry: same address (and chain) or same symbol."""
+    chain, _, value = entry.rpartition(":")
+    if is_address(value):
+        for token in candidates:
+            if str(token.get("tokenAddress") or "").lower() == value and (not chain or token.get("chainId") == chain):
+                return token
+        return None
+    return next((token for token in candidates if str(token.get("symbol", "")).upper() == value), None)
+
+
+async def resolve_entry(entry: str):
+    """Looks up the Moralis search result for `symbol`, `address` or `chain:address`, or None if nothing matches."""
+    query = entry.rpartition(":")[2]
+    try:
+        data = await search_tokens(query)
+    except httpx.HTTPError as e:
+        logger.warning(f"⚠️ Lookup failed for {entry}: {e}")
+        return None
+    return pick_token(entry, (data or {}).get("result", []))
 
 
 async def fetch_token_price(token_address: str, chain: str = "eth") -> dict:
     url = f"{BASE_URL}/erc20/{token_address}/price"
     params = {"chain": chain}
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=HEADERS, params=params)
-        response.raise_for_status()
-        return response.json()
+    response = await http_clients.request("moralis", "GET", url, headers=_headers(), params=params)
+    return response.json()
 
 
 async def fetch_wallet_balance(wallet_address: str, chain: str = "eth") -> dict:
     url = f"{BASE_URL}/{wallet_address}/balance"
     params = {"chain": chain}
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=HEADERS, params=params)
-        response.raise_for_status()
-        return response.json()
+    response = await http_clients.request("moralis", "GET", url, headers=_headers(), params=params)
+    return response.json()
 
 
 async def fetch_token_metadata(token_address: str, chain: str = "eth") -> dict:
     url = f"{BASE_URL}/erc20/{token_address}/metadata"
     params = {"chain": chain}
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, headers=HEADERS, params=params)
-        response.raise_for_status()
+    response = await http_clients.request("moralis", "GET", url, headers=_headers(), params=params)
+    return response.json()
+
+
+def _chunks(items: list, size: int) -> list:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def fetch_token_prices(token_addresses: list, chain: str = "eth") -> list:
+    """Fetches prices for many tokens on one chain via POST /erc20/prices, chunked to the provider's batch size."""
+    url = f"{BASE_URL}/erc20/prices"
+    params = {"chain": chain}
+
+    async def fetch_chunk(chunk):
+        body = {"tokens": [{"token_address": address} for address in chunk]}
+        response = await http_clients.request("moralis", "POST", url, headers=_headers(), params=params, json=body)
+        return response.json()
+
+    responses = await asyncio.gather(*(fetch_chunk(chunk) for chunk in _chunks(token_addresses, PRICES_BATCH_SIZE)))
+    return [item for response in responses for item in response]
+
+
+async def fetch_tokens_metadata(token_addresses: list, chain: str = "eth") -> list:
+    """Fetches metadata for many tokens on one chain via GET /erc20/metadata, chunked to the provider's batch size."""
+    url = f"{BASE_URL}/erc20/metadata"
+
+    async def fetch_chunk(chunk):
+        params = [("chain", chain)] + [("addresses[]", address) for address in chunk]
+        response = await http_clients.request("moralis", "GET", url, headers=_headers(), params=params)
         return response.json()
+
+    responses = await asyncio.gather(*(fetch_chunk(chunk) for chunk in _chunks(token_addresses, METADATA_BATCH_SIZE)))
+    return [item for response in responses for item in response]
+
+
+async def enrich_tokens(tokens: list) -> list:
+    """
+    Adds live price and metadata to `search_tokens` results in place, using one batched round trip per chain.
+    Only EVM chains are enriched; a failed batch leaves its tokens unchanged.
+    """
+    by_chain = defaultdict(dict)
+    for token in tokens:
+        chain, address = str(token.get("chainId", "")), token.get("tokenAddress")
+        if address and chain.startswith("0x"):
+            by_chain[chain].setdefault(address.lower(), []).append(token)
+
+    async def enrich_chain(chain, tokens_by_address):
+        addresses = list(tokens_by_address)
+        prices, metadata = await asyncio.gather(
+            fetch_token_prices(addresses, chain), fetch_tokens_metadata(addresses, chain), return_exceptions=True
+        )
+
+        if isinstance(prices, Exception):
+            logger.warning(f"Batch price lookup failed for chain {chain}: {prices}")
+        else:
+            for item in prices:
+                for token in tokens_by_address.get(str(item.get("tokenAddress", "")).lower(), []):
+                    token["priceData"] = item
+                    if item.get("usdPrice") is not None:
+                        token["usdPrice"] = item["usdPrice"]
+
+        if isinstance(metadata, Exception):
+            logger.warning(f"Batch metadata lookup failed for chain {chain}: {metadata}")
+        else:
+            for item in metadata:
+                for token in tokens_by_address.get(str(item.get("address", "")).lower(), []):
+                    token["metadata"] = item
+
+    await asyncio.gather(*(enrich_chain(chain, tokens_by_address) for chain, tokens_by_address in by_chain.items()))
+    return tokens
@@ -1,5 +1,5 @@
-import httpx
 from src.config import config
+from src.clients.http_clients import http_clients
 
 BASE_URL = "https://newsapi.org/v2/everything"
 
@@ -11,7 +11,5 @@ async def fetch_crypto_news(query: str) -> dict:
         "language": "en",
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(BASE_URL, params=params)
-        response.raise_for_status()
-        return response.json()
+    response = await http_clients.request("news", "GET", BASE_URL, params=params)
+    return response.json()
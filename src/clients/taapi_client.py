@@ -1,23 +1,138 @@
-import httpx
+import asyncio
+import contextvars
+import logging
 from src.config import config
+from src.clients.http_clients import http_clients
+from src.utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://api.taapi.io"
 
-async def fetch_technical_indicators(symbol: str) -> dict:
-    url = f"{BASE_URL}/bulk"
-    params = {
-        "secret": config.TAAPI_KEY,
+DEFAULT_INDICATORS = [
+    {"indicator": "rsi", "period": 14},
+    {"indicator": "sma", "period": 14},
+    {"indicator": "macd"},
+]
+
+_rate_limiter = None
+_batcher = None
+
+
+def get_rate_limiter() -> TokenBucket:
+    """TAAPI allows a limited number of requests per window depending on the plan."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = TokenBucket(rate=config.TAAPI_RATE_LIMIT, period=config.TAAPI_RATE_PERIOD)
+    return _rate_limiter
+
+
+# Every TAAPI request, retries included, waits for the rate limiter
+http_clients.set_limiter("taapi", lambda: get_rate_limiter().acquire())
+
+
+def to_pair(symbol: str) -> str:
+    return symbol.upper() + "/USDT"
+
+
+def _build_construct(symbol: str, interval: str, indicators: list) -> dict:
+    return {
         "exchange": "binance",
-        "symbol": symbol.upper() + "/USDT",
-        "interval": "1d",
-        "indicators": [
-            {"indicator": "rsi"},
-            {"indicator": "macd"},
-            {"indicator": "sma"},
-        ],
+        "symbol": to_pair(symbol),
+        "interval": interval,
+        # Custom ids let us map every result in the response back to its symbol and indicator
+        "indicators": [{**indicator, "id": f"{symbol}|{indicator['indicator']}"} for indicator in indicators],
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=params)
-        response.raise_for_status()
-        return response.json()
+
+def _parse_result(indicator: str, result: dict):
+    if not result:
+        return None
+    if indicator == "macd":
+        return result.get("valueMACD")
+    return result.get("value")
+
+
+def _chunks(symbols: list) -> list:
+    """Splits symbols into groups of TAAPI_MAX_CONSTRUCTS, the most one /bulk request may carry."""
+    chunk_size = max(1, config.TAAPI_MAX_CONSTRUCTS)
+    return [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+
+
+async def _fetch_chunk(chunk: list, indicators: list, interval: str) -> dict:
+    """Fetches one /bulk request; returns {symbol: {indicator: value}} for the symbols of `chunk`."""
+    payload = {
+        "secret": config.TAAPI_KEY,
+        "construct": [_build_construct(symbol, interval, indicators) for symbol in chunk],
+    }
+    response = await http_clients.request("taapi", "POST", f"{BASE_URL}/bulk", json=payload)
+
+    results = {symbol: {indicator["indicator"]: None for indicator in indicators} for symbol in chunk}
+    for item in response.json().get("data", []):
+        symbol, _, indicator = str(item.get("id", "")).partition("|")
+        if symbol not in results:
+            continue
+        if item.get("errors"):
+            logger.warning(f"TAAPI errors for {symbol} {indicator}: {item['errors']}")
+        results[symbol][indicator] = _parse_result(indicator, item.get("result"))
+    return results
+
+
+async def fetch_bulk_indicators(symbols: list, indicators: list = None, interval: str = "1h") -> dict:
+    """
+    Fetches indicators for many symbols through /bulk, packing up to TAAPI_MAX_CONSTRUCTS symbols per request.
+    Returns {symbol: {indicator: value}}; indicators TAAPI could not compute are None.
+    """
+    indicators = indicators or DEFAULT_INDICATORS
+    results = {}
+    chunks = _chunks(list(dict.fromkeys(symbols)))
+    for chunk_results in await asyncio.gather(*(_fetch_chunk(chunk, indicators, interval) for chunk in chunks)):
+        results.update(chunk_results)
+    return results
+
+
+class BulkBatcher:
+    """Collects indicator requests issued within a short window and sends them as shared /bulk requests."""
+
+    def __init__(self, window: float = 0.05):
+        self.window = window
+        self._pending = {}
+        self._flush_task = None
+
+    async def fetch(self, symbol: str) -> dict:
+        future = self._pending.get(symbol)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[symbol] = future
+            if self._flush_task is None:
+                # A fresh context: the shared flush must not inherit the first caller's deadline
+                self._flush_task = asyncio.create_task(self._flush_later(), context=contextvars.Context())
+        return await asyncio.shield(future)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        batch, self._pending = self._pending, {}
+
+        # A failed /bulk request only fails the symbols it carried
+        chunks = _chunks(list(batch))
+        outcomes = await asyncio.gather(
+            *(_fetch_chunk(chunk, DEFAULT_INDICATORS, "1h") for chunk in chunks), return_exceptions=True
+        )
+        for chunk, outcome in zip(chunks, outcomes):
+            for symbol in chunk:
+                future = batch[symbol]
+                if future.done():
+                    continue
+                if isinstance(outcome, BaseException):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome.get(symbol, {}))
+
+
+async def fetch_technical_indicators(symbol: str) -> dict:
+    """Fetches indicators for one symbol; concurrent calls are merged into shared /bulk requests."""
+    global _batcher
+    if _batcher is None:
+        _batcher = BulkBatcher(window=config.TAAPI_BATCH_WINDOW)
+    return await _batcher.fetch(symbol)
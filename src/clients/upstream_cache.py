@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+import os
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Hop-by-hop and encoding headers no longer describe the stored (already decoded) body
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class UpstreamCacheTransport:
+    """
+    httpx transport that records upstream responses to disk and can replay them without network access.
+    Works for both sync and async clients. Recording always calls the upstream and overwrites the stored
+    entry; only `replay=True` answers from disk, and then a missing entry raises a connection error.
+    """
+
+    def __init__(self, directory: str, inner=None, replay: bool = False):
+        self.directory = directory
+        self.inner = inner
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _key(request: httpx.Request) -> str:
+        digest = hashlib.sha256(f"{request.method} {request.url}\n".encode())
+        digest.update(request.content or b"")
+        return digest.hexdigest()
+
+    def _path(self, request: httpx.Request) -> str:
+        return os.path.join(self.directory, f"{self._key(request)}.json")
+
+    def _load(self, request: httpx.Request) -> httpx.Response:
+        try:
+            with open(self._path(request), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            raise httpx.ConnectError(f"No cached response for {request.method} {request.url.path}", request=request)
+
+        self.hits += 1
+        return httpx.Response(
+            entry["status"], headers=entry["headers"], content=entry["content"].encode(), request=request
+        )
+
+    def _store(self, request: httpx.Request, response: httpx.Response, content: bytes) -> httpx.Response:
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        if response.status_code < 500:
+            entry = {"status": response.status_code, "headers": headers, "content": content.decode("utf-8", "replace")}
+            try:
+                with open(self._path(request), "w", encoding="utf-8") as f:
+                    json.dump(entry, f)
+            except OSError as e:
+                logger.warning(f"Upstream cache write failed: {e}")
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.replay:
+            return self._load(request)
+        response = self.inner.handle_request(request)
+        content = response.read()
+        response.close()
+        return self._store(request, response, content)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.replay:
+            return self._load(request)
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+        return self._store(request, response, content)
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+    async def aclose(self):
+        if self.inner is not None:
+            await self.inner.aclose()
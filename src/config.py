@@ -1,7 +1,10 @@
-from dotenv import load_dotenv
+import logging
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
 
 class Config(BaseSettings):
     TAAPI_KEY: str
@@ -10,13 +13,120 @@ class Config(BaseSettings):
     OPENAI_API_KEY: str
     MONGO_URI: str
 
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_TIMEOUT: float = 60.0  # Seconds one LLM request may take before it counts as failed
+    LLM_HEDGE_ENABLED: bool = True  # Send a duplicate LLM request when the first one is slower than usual
+    LLM_HEDGE_PERCENTILE: float = 95  # Latency percentile (per agent) after which the duplicate is sent
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Observed calls needed before the percentile is trusted
+    LLM_HEDGE_MIN_DELAY: float = 1.0
+    LLM_HEDGE_MAX_DELAY: float = 20.0  # Also the hedge delay while there are too few samples
+
+    PIPELINE_DEADLINE_SECONDS: float = 120.0  # Time budget of one analysis run (0 disables it)
+    PIPELINE_DATA_STAGE_SHARE: float = 0.6  # Part of the budget for Moralis / TAAPI / news stages; the rest is for the decision
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open an upstream's circuit
+    CIRCUIT_RESET_SECONDS: float = 30.0  # Seconds an open circuit fails fast before a trial request
+    HTTP_MAX_RETRY_AFTER: float = 30.0  # Longest upstream Retry-After honoured before retrying a request
+
+    LLM_CACHE_BACKEND: str = "memory"  # memory | disk | mongo
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL: int = 300
+    LLM_CACHE_DIR: str = ".cache/llm"
+    LLM_CACHE_DISK_MAX_ENTRIES: int = 10000  # Files kept by the disk backend; expired ones are pruned as well
+
+    NEWS_CACHE_TTL: int = 600
+    NEWS_CACHE_MAX_ENTRIES: int = 256
+
+    TAAPI_MAX_CONSTRUCTS: int = 10  # Symbols per /bulk request (depends on the TAAPI plan)
+    TAAPI_RATE_LIMIT: int = 5  # Requests allowed per TAAPI_RATE_PERIOD seconds
+    TAAPI_RATE_PERIOD: float = 15.0
+    TAAPI_BATCH_WINDOW: float = 0.05  # Seconds to collect concurrent symbols into one /bulk request
+
+    TA_SOURCE: str = "taapi"  # taapi | local (indicators computed from Binance candles)
+
+    MORALIS_ENRICH_RESULTS: bool = False  # Add live prices and metadata to /search results
+
+    MONGO_MAX_POOL_SIZE: int = 50
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_WRITE_CONCERN: str = "1"  # Number of acknowledging nodes or "majority"
+    REPORT_RETENTION_DAYS: int = 30  # Raw reports expire after this many days (0 keeps them forever)
+
+    JOB_BROKER: str = "memory"  # memory | mongo
+    JOB_MAX_CONCURRENT_PIPELINES: int = 2  # Worker tasks per process
+    JOB_QUEUE_MAX_SIZE: int = 100
+    JOB_MAX_ATTEMPTS: int = 2
+    JOB_LEASE_SECONDS: int = 60  # A running job whose worker has not sent a heartbeat for this long is re-queued
+    JOB_RESULT_TTL: int = 3600  # Seconds finished jobs (and results) stay in the in-memory broker
+    JOB_RESULT_MAX_ENTRIES: int = 1000
+    JOB_RUN_WORKERS_IN_API: bool = True  # Disable when separate `python -m src.jobs.worker` processes consume a Mongo queue
+
+    SEARCH_MEMO_SECONDS: int = 30  # Reuse Moralis search results for identical queries
+    ANALYSIS_MEMO_SECONDS: int = 120  # Attach identical searches to a recent analysis run
+
+    OTEL_ENABLED: bool = False  # Export spans via OTLP (needs the opentelemetry SDK and OTLP exporter)
+    OTEL_EXPORTER_ENDPOINT: str = "http://localhost:4318/v1/traces"
+
+    BATCH_CONCURRENCY: int = 4  # Pipelines run in parallel by the `python -m src.main` batch CLI
+    BATCH_SIZE: int = 10  # Tokens per pipeline run in batch mode
+    BATCH_CHECKPOINT_FILE: str = ".cache/batch_checkpoint.json"
+    UPSTREAM_CACHE_DIR: str = ".cache/upstream"  # Recorded upstream responses replayed by `--dry-run`
+
+    PROMPT_SIG_FIGS: int = 4  # Significant figures for numbers in agent prompts
+    NEWS_PROMPT_TOKEN_BUDGET: int = 600  # Estimated tokens of article text per news summarization run
+    NEWS_ARTICLE_MAX_TOKENS: int = 120  # Estimated tokens per article (title + description)
+    LOG_PAYLOAD_MAX_CHARS: int = 300  # Cap for prompts, replies and payloads written to logs
+
+    DECISION_CACHE_TTL: int = 60  # Seconds a stored decision is served from memory before re-reading Mongo
+    DECISION_CACHE_MAX_ENTRIES: int = 5000
+    DECISION_FRESH_SECONDS: int = 3600  # Older decisions are still returned, but trigger a background re-analysis
+    DECISION_REFRESH_COOLDOWN: int = 600  # Minimum seconds between re-analysis requests for one token
+    DECISION_MISS_RATE_LIMIT: int = 30  # Analyses of unknown tokens /decision may start per DECISION_MISS_RATE_PERIOD
+    DECISION_MISS_RATE_PERIOD: float = 60.0
+    DECISION_REFRESH_BATCH_SIZE: int = 50  # Stale tokens re-analyzed per refresh job
+    DECISION_REFRESH_RATE_LIMIT: int = 10  # Refresh jobs the API may queue per DECISION_REFRESH_RATE_PERIOD
+    DECISION_REFRESH_RATE_PERIOD: float = 60.0
+
+    CHANGE_GATE_ENABLED: bool = True  # Reuse stored agent outputs while their inputs stay within the thresholds below
+    CHANGE_GATE_MAX_AGE: int = 21600  # Seconds after which a stored output is regenerated even if nothing moved
+    CHANGE_GATE_CACHE_TTL: int = 300  # Seconds stored snapshots are kept in memory before re-reading Mongo
+    CHANGE_PRICE_THRESHOLD: float = 0.01  # Relative move of price and market cap that counts as a change
+    CHANGE_PRICE_CHANGE_POINTS: float = 1.0  # Percentage points the 24h price change may move
+    CHANGE_VOLUME_THRESHOLD: float = 0.10  # Relative move of 24h volume
+    CHANGE_INDICATOR_THRESHOLD: float = 0.02  # Relative move of any technical indicator value
+
+    DECISION_REASK_ATTEMPTS: int = 1  # Follow-up requests for tokens missing from the orchestrator's reply
+    ORCHESTRATOR_SHARD_TOKEN_BUDGET: int = 6000  # Estimated prompt tokens per orchestrator request
+    ORCHESTRATOR_MAX_SHARD_SIZE: int = 10  # Tokens per orchestrator request
+    ORCHESTRATOR_COMPACT_INPUTS: bool = False  # Summarize verbose stage outputs before the final decision
+    ORCHESTRATOR_COMPACT_THRESHOLD: int = 400  # Estimated tokens above which a token's outputs are summarized
+
+    LOG_LEVEL: str = "INFO"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
-config = Config()
 
-if not all([config.TAAPI_KEY, config.NEWS_API_KEY, config.MORALIS_API_KEY, config.OPENAI_API_KEY, config.MONGO_URI]):
-    raise ValueError("❌ Error: Could not load API keys! Check .env file")
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Loads and validates the settings (environment + .env) once, on first use rather than at import."""
+    settings = Config()
+    if not all([settings.TAAPI_KEY, settings.NEWS_API_KEY, settings.MORALIS_API_KEY, settings.OPENAI_API_KEY,
+                settings.MONGO_URI]):
+        raise ValueError("❌ Error: Could not load API keys! Check .env file")
+    logger.debug("✅ Successfully loaded .env Keys")
+    return settings
+
+
+class _LazyConfig:
+    """Module-level `config` handle that defers loading the settings until an attribute is read."""
+
+    def __getattr__(self, name):
+        return getattr(get_config(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_config(), name, value)
+
 
-print("✅ Successfully loaded .env Keys")
+config = _LazyConfig()
@@ -0,0 +1,121 @@
+import logging
+from datetime import datetime, timezone
+
+from src.db.mongo_client import MongoDB
+from src.utils.cache import TTLCache
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_NOT_FOUND = object()
+
+
+class DecisionStore:
+    """
+    Read-through cache of the latest stored decision per token (chain + address), in front of MongoDB.
+    Reads never wait for an analysis: stale decisions are returned as they are and their keys are collected;
+    `refresh_stale()` (run after the response) hands them to `on_stale(keys)` in batches of `batch_size`, which
+    schedules one re-analysis job per batch. Each token is requested at most once per `refresh_cooldown` seconds,
+    whether or not the job could be queued. A defaulted decision (the model gave none, so HOLD was stored) counts
+    as stale regardless of its age.
+    """
+
+    def __init__(self, db: MongoDB, on_stale=None, ttl: float = 60, negative_ttl: float = 10, maxsize: int = 5000,
+                 fresh_seconds: float = 3600, refresh_cooldown: float = 600, batch_size: int = 50):
+        self.db = db
+        self.on_stale = on_stale
+        self.fresh_seconds = fresh_seconds
+        self.negative_ttl = negative_ttl
+        self.batch_size = batch_size
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._refreshing = TTLCache(maxsize=maxsize, ttl=refresh_cooldown)
+        self._stale = {}  # Keys waiting for refresh_stale(), in first-seen order
+        self._loads = SingleFlight()
+
+    @staticmethod
+    def key(chain: str, address: str) -> tuple:
+        return chain, address.lower()
+
+    def invalidate(self, chain: str, address: str):
+        """
+        Drops a cached decision, e.g. after a new report for the token was stored. The refresh cooldown is kept,
+        so a token whose new decision is still stale (or defaulted) is not re-analyzed on the next read.
+        """
+        self._cache.pop(self.key(chain, address))
+
+    async def get(self, chain: str, address: str):
+        """Latest decision for one token with its age, or None if it was never analyzed."""
+        return (await self.get_many([(chain, address)]))[self.key(chain, address)]
+
+    async def get_many(self, tokens: list) -> dict:
+        """Latest decisions for many tokens; cache misses are loaded with a single Mongo query."""
+        keys = list(dict.fromkeys(self.key(chain, address) for chain, address in tokens))
+        found = {key: self._cache.get(key) for key in keys}
+        missing = tuple(key for key, value in found.items() if value is None)
+
+        if missing:
+            loaded = await self._loads.do(missing, lambda: self.db.fetch_latest_decisions(missing))
+            if loaded is not None:  # On a failed query nothing is cached, so the next read retries
+                for key in missing:
+                    document = loaded.get(key)
+                    found[key] = document or _NOT_FOUND
+                    self._cache.set(key, found[key], None if document else self.negative_ttl)
+
+        return {key: self._describe(key, value) for key, value in found.items()}
+
+    def _describe(self, key: tuple, document):
+        if document is None or document is _NOT_FOUND:
+            return None
+
+        decided_at = MongoDB._as_datetime(document.get("date"))
+        age = (datetime.now(timezone.utc) - decided_at).total_seconds()
+        stale = age > self.fresh_seconds or document.get("source") == "default"
+        refreshing = key in self._refreshing
+        if stale and not refreshing and self.on_stale is not None:
+            self._refreshing.set(key, None)  # The cooldown starts now, even if the job cannot be queued later
+            self._stale[key] = None
+            refreshing = True
+
+        return {
+            "chain": document.get("chain"),
+            "address": document.get("address"),
+            "symbol": document.get("symbol"),
+            "decision": document.get("decision"),
+            "source": document.get("source"),
+            "usd_price": document.get("usd_price"),
+            "decided_at": decided_at.isoformat(),
+            "age_seconds": round(age, 1),
+            "stale": stale,
+            "refreshing": refreshing,
+        }
+
+    def is_refreshing(self, chain: str, address: str) -> bool:
+        """Whether a re-analysis of the token was requested within the last `refresh_cooldown` seconds."""
+        return self.key(chain, address) in self._refreshing
+
+    async def schedule_refresh(self, chain: str, address: str):
+        """Asks `on_stale` for a re-analysis of one token unless one was requested recently; returns its job id or None."""
+        key = self.key(chain, address)
+        if key in self._refreshing or self.on_stale is None:
+            return self._refreshing.get(key)
+        self._refreshing.set(key, None)
+        job_id = await self._request_refresh([key])
+        if job_id is not None:
+            self._refreshing.set(key, job_id)
+        return job_id
+
+    async def refresh_stale(self):
+        """Schedules re-analysis of the stale decisions collected by earlier reads, one job per batch."""
+        keys, self._stale = list(self._stale), {}
+        for start in range(0, len(keys), self.batch_size):
+            await self._request_refresh(keys[start:start + self.batch_size])
+
+    async def _request_refresh(self, keys: list):
+        try:
+            return await self.on_stale(keys)
+        except Exception as e:  # Incl. JobQueueFull; the cooldown stays, so the keys are retried once it expires
+            logger.warning(f"Could not schedule re-analysis of {len(keys)} token(s): {e}")
+            return None
+
+    def stats(self) -> dict:
+        return {"cache": self._cache.stats(), "refreshing": len(self._refreshing), "pending_refresh": len(self._stale)}
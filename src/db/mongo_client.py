@@ -1,48 +1,234 @@
-import os
 import logging
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING
+from src.config import config
+from src.utils.metrics import span
+from src.utils.prompt_budget import clip
+from src.utils.serialization import to_document
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
 
 # MongoDB connection
-MONGODB_URI = os.getenv("MONGO_URI")
 DB_NAME = "crypto_analysis"
 COLLECTION_NAME = "investment_reports"
+DECISIONS_COLLECTION_NAME = "token_decisions"
+STAGES_COLLECTION_NAME = "stage_snapshots"
+
+# pymongo's index directions, so defining indexes does not require importing pymongo
+ASCENDING, DESCENDING = 1, -1
+
+# Server error codes of create_index when an index with the same name or keys exists with other options
+INDEX_CONFLICT_CODES = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class MongoDB:
-    """MongoDB client for handling investment reports."""
+# Process-wide Motor client; one connection pool shared by every repository
+_client = None
+
 
-    def __init__(self):
-        """Initialize the MongoDB client."""
-        if not MONGODB_URI:
+def get_mongo_client() -> "AsyncIOMotorClient":
+    """Returns the shared MongoDB client, creating it with the configured pool settings on first use."""
+    global _client
+    if _client is None:
+        from motor.motor_asyncio import AsyncIOMotorClient  # Deferred until a database is actually used
+
+        if not config.MONGO_URI:
             logger.error("MongoDB URI is missing! Please check your .env file.")
             raise ValueError("MONGODB_URI is required in .env file.")
 
-        self.client = AsyncIOMotorClient(MONGODB_URI)
-        self.db = self.client[DB_NAME]
-        self.collection = self.db[COLLECTION_NAME]
+        write_concern = int(config.MONGO_WRITE_CONCERN) if config.MONGO_WRITE_CONCERN.isdigit() else config.MONGO_WRITE_CONCERN
+        _client = AsyncIOMotorClient(
+            config.MONGO_URI,
+            maxPoolSize=config.MONGO_MAX_POOL_SIZE,
+            minPoolSize=config.MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            w=write_concern,
+        )
         logger.info("✅ Connected to MongoDB successfully.")
+    return _client
+
+
+def set_mongo_client(client):
+    """Installs a pre-built client (e.g. an in-memory stand-in for benchmarks) as the shared client."""
+    global _client
+    _client = client
+
+
+class MongoDB:
+    """Repository for investment reports on top of the shared MongoDB client."""
+
+    @property
+    def client(self) -> "AsyncIOMotorClient":
+        return get_mongo_client()
+
+    @property
+    def db(self):
+        return self.client[DB_NAME]
+
+    @property
+    def collection(self):
+        return self.db[COLLECTION_NAME]
+
+    @property
+    def decisions(self):
+        return self.db[DECISIONS_COLLECTION_NAME]
+
+    @property
+    def stages(self):
+        return self.db[STAGES_COLLECTION_NAME]
+
+    async def ensure_indexes(self):
+        """
+        Create the indexes and retention policy used by report and decision queries. Each index is created on
+        its own, so one failure does not leave the rest missing.
+        """
+        if config.REPORT_RETENTION_DAYS > 0:
+            # TTL index: raw reports (with full LLM texts) expire, normalized decisions are kept
+            report_index = ("date_ttl", {"expireAfterSeconds": config.REPORT_RETENTION_DAYS * 86400})
+        else:
+            report_index = ("date_desc", {})
+        indexes = [
+            (self.collection, [("date", DESCENDING)], *report_index),
+            (self.decisions, [("symbol", ASCENDING), ("chain", ASCENDING), ("date", DESCENDING)], "symbol_chain_date", {}),
+            (self.decisions, [("chain", ASCENDING), ("address", ASCENDING), ("date", DESCENDING)], "chain_address_date", {}),
+            (self.decisions, [("date", DESCENDING)], "date_desc", {}),
+            # Stage snapshots are only useful to the change-detection gate while they are recent
+            (self.stages, [("updated_at", ASCENDING)], "updated_at_ttl", {"expireAfterSeconds": config.CHANGE_GATE_MAX_AGE}),
+        ]
+
+        failed = 0
+        for collection, keys, name, options in indexes:
+            try:
+                await self._ensure_index(collection, keys, name, **options)
+            except Exception as e:
+                failed += 1
+                logger.error(f"❌ Error creating MongoDB index {name} on {collection.name}: {e}", exc_info=True)
+        if not failed:
+            logger.info("✅ MongoDB indexes are in place.")
+
+    @staticmethod
+    async def _ensure_index(collection, keys: list, name: str, **options):
+        """
+        Creates one index. An existing index that conflicts with it (a changed TTL, or the same keys under
+        another name, e.g. date_ttl after REPORT_RETENTION_DAYS was set to 0) is updated with collMod or replaced.
+        """
+        from pymongo.errors import OperationFailure  # Deferred like the Motor import
+
+        try:
+            await collection.create_index(keys, name=name, **options)
+            return
+        except OperationFailure as e:
+            if e.code not in INDEX_CONFLICT_CODES:
+                raise
+
+        existing = await collection.index_information()
+        current = existing.get(name)
+        if current is not None and "expireAfterSeconds" in current and "expireAfterSeconds" in options \
+                and [tuple(key) for key in current["key"]] == keys:
+            await collection.database.command(
+                "collMod", collection.name, index={"name": name, "expireAfterSeconds": options["expireAfterSeconds"]}
+            )
+            logger.info(f"Updated the TTL of index {name} on {collection.name} to {options['expireAfterSeconds']}s")
+            return
+
+        for index_name, info in existing.items():
+            if index_name != "_id_" and (index_name == name or [tuple(key) for key in info["key"]] == keys):
+                await collection.drop_index(index_name)
+                logger.warning(f"Dropped conflicting index {index_name} on {collection.name}")
+        await collection.create_index(keys, name=name, **options)
+
+    @staticmethod
+    def _as_datetime(value) -> datetime:
+        """Normalizes ISO strings and naive datetimes to an aware UTC datetime stored as BSON date."""
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if not isinstance(value, datetime):
+            return datetime.now(timezone.utc)
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    @staticmethod
+    def _decision_record(token: dict, report_id, date: datetime) -> dict:
+        return {
+            "report_id": report_id,
+            "date": date,
+            "symbol": token.get("symbol"),
+            "chain": token.get("chainId"),
+            "address": str(token.get("tokenAddress") or "").lower() or None,
+            "decision": token.get("final_decision"),
+            "source": token.get("decision_source"),  # model | stored | default (HOLD when the model gave none)
+            "usd_price": token.get("usdPrice"),
+        }
 
     async def save_report(self, report_data):
-        """Save investment report to MongoDB with a timestamp."""
+        """Save investment report to MongoDB and a normalized decision record per token."""
         try:
-            # ✅ Ensure "date" exists before saving
-            if "date" not in report_data or not report_data["date"]:
-                report_data["date"] = datetime.now(timezone.utc).isoformat()
+            report_data = to_document(report_data)  # Token records become compact documents
+            report_data["date"] = self._as_datetime(report_data.get("date"))
 
-            logger.debug(f"Saving report to MongoDB: {report_data}")
-            result = await self.collection.insert_one(report_data)
+            logger.debug("Saving report to MongoDB: %s", clip(report_data))
+            with span("mongo", target="insert_report"):
+                result = await self.collection.insert_one(report_data)
             logger.info(f"📌 Inserted new report with ID: {result.inserted_id}")
 
         except Exception as e:
             logger.error(f"❌ Error saving report to MongoDB: {e}", exc_info=True)
+            return None
+
+        await self._save_decisions([
+            self._decision_record(token, result.inserted_id, report_data["date"])
+            for token in report_data.get("tokens", [])
+            if token.get("final_decision")
+        ])
+        return result.inserted_id
+
+    async def _save_decisions(self, decisions: list):
+        """Stores decision records; a failure is logged, as the reports they come from are already saved."""
+        if not decisions:
+            return
+        try:
+            with span("mongo", target="insert_decisions"):
+                await self.decisions.insert_many(decisions, ordered=False)
+            logger.info(f"📌 Stored {len(decisions)} token decisions.")
+        except Exception as e:
+            logger.error(f"❌ Error saving {len(decisions)} token decisions to MongoDB: {e}", exc_info=True)
+
+    async def save_reports(self, reports: list) -> list:
+        """
+        Save many reports with one insert_many, plus their decision records with a second one.
+        Returns the IDs of the reports actually inserted, also when some of them failed.
+        """
+        if not reports:
+            return []
+        from pymongo.errors import BulkWriteError  # Deferred like the Motor import
+
+        try:
+            reports = [to_document(report) for report in reports]
+            for report in reports:
+                report["date"] = self._as_datetime(report.get("date"))
+
+            try:
+                with span("mongo", target="insert_reports"):
+                    result = await self.collection.insert_many(reports, ordered=False)
+                saved = list(zip(reports, result.inserted_ids))
+            except BulkWriteError as e:
+                # Unordered inserts go on past failures; the driver has set _id on every document it sent
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                saved = [(report, report["_id"]) for index, report in enumerate(reports) if index not in failed]
+                logger.error(f"❌ {len(failed)} of {len(reports)} reports were not saved: {clip(e.details)}")
+            logger.info(f"📌 Inserted {len(saved)} reports.")
+
+        except Exception as e:
+            logger.error(f"❌ Error saving reports to MongoDB: {e}", exc_info=True)
+            return []
+
+        await self._save_decisions([
+            self._decision_record(token, report_id, report["date"])
+            for report, report_id in saved
+            for token in report.get("tokens", [])
+            if token.get("final_decision")
+        ])
+        return [report_id for _, report_id in saved]
 
     async def fetch_latest_report(self):
         """Fetch the most recent investment report."""
@@ -58,19 +244,95 @@ class MongoDB:
             logger.error(f"❌ Error fetching latest report: {e}", exc_info=True)
             return None
 
-    async def close_connection(self):
-        """Gracefully close the MongoDB connection."""
+    async def fetch_latest_decision(self, symbol: str, chain: str = None):
+        """Fetch the most recent decision for a token symbol, optionally limited to one chain."""
+        query = {"symbol": symbol}
+        if chain:
+            query["chain"] = chain
         try:
-            logger.info("🛑 Closing MongoDB connection...")
-            self.client.close()
+            return await self.decisions.find_one(query, sort=[("date", -1)])
+        except Exception as e:
+            logger.error(f"❌ Error fetching latest decision for {symbol}: {e}", exc_info=True)
+            return None
+
+    async def fetch_latest_decision_by_address(self, chain: str, address: str):
+        """Fetch the most recent decision for a token contract on a chain."""
+        try:
+            return await self.decisions.find_one({"chain": chain, "address": address.lower()}, sort=[("date", -1)])
+        except Exception as e:
+            logger.error(f"❌ Error fetching latest decision for {chain}/{address}: {e}", exc_info=True)
+            return None
+
+    async def fetch_latest_decisions(self, tokens: list) -> dict:
+        """
+        Fetch the most recent decision for many (chain, address) pairs with one aggregation.
+        Returns {(chain, address): decision} for the pairs that have one, or None if the query failed.
+        """
+        pairs = {(chain, address.lower()) for chain, address in tokens}
+        if not pairs:
+            return {}
+        by_chain = {}
+        for chain, address in pairs:
+            by_chain.setdefault(chain, []).append(address)
+        pipeline = [
+            {"$match": {"$or": [{"chain": chain, "address": {"$in": addresses}} for chain, addresses in by_chain.items()]}},
+            {"$sort": {"date": -1}},
+            {"$group": {"_id": {"chain": "$chain", "address": "$address"}, "doc": {"$first": "$$ROOT"}}},
+        ]
+        try:
+            with span("mongo", target="latest_decisions"):
+                rows = await self.decisions.aggregate(pipeline).to_list(length=None)
+            return {(row["doc"]["chain"], row["doc"]["address"]): row["doc"] for row in rows}
+        except Exception as e:
+            logger.error(f"❌ Error fetching latest decisions: {e}", exc_info=True)
+            return None
+
+    async def fetch_stage_snapshots(self, snapshot_ids: list) -> dict:
+        """
+        Fetch stored agent stage snapshots (inputs + output) by id with one query.
+        Returns {snapshot_id: snapshot} for the ids that exist, or None if the query failed.
+        """
+        if not snapshot_ids:
+            return {}
+        try:
+            with span("mongo", target="stage_snapshots"):
+                rows = await self.stages.find({"_id": {"$in": list(snapshot_ids)}}).to_list(length=None)
+            return {row["_id"]: row for row in rows}
+        except Exception as e:
+            logger.error(f"❌ Error fetching stage snapshots: {e}", exc_info=True)
+            return None
+
+    async def save_stage_snapshot(self, snapshot: dict):
+        """Store (or replace) the latest inputs and output of an agent stage for one token."""
+        try:
+            with span("mongo", target="save_stage_snapshot"):
+                await self.stages.replace_one({"_id": snapshot["_id"]}, snapshot, upsert=True)
         except Exception as e:
-            logger.error(f"❌ Error closing MongoDB connection: {e}", exc_info=True)
+            logger.error(f"❌ Error saving stage snapshot {snapshot.get('_id')}: {e}", exc_info=True)
+
+    async def fetch_decisions(self, start: datetime, end: datetime = None, symbol: str = None, chain: str = None,
+                              limit: int = 1000):
+        """Fetch decisions in a time range (newest first), optionally filtered by symbol and chain."""
+        end = end or datetime.now(timezone.utc)
+        query = {"date": {"$gte": self._as_datetime(start), "$lte": self._as_datetime(end)}}
+        if symbol:
+            query["symbol"] = symbol
+        if chain:
+            query["chain"] = chain
+        try:
+            return await self.decisions.find(query, sort=[("date", -1)]).to_list(length=limit)
+        except Exception as e:
+            logger.error(f"❌ Error fetching decisions: {e}", exc_info=True)
+            return []
 
 # Ensure proper cleanup on shutdown
 async def close_mongo_connection():
-    """Shutdown MongoDB connection safely."""
+    """Shutdown the shared MongoDB connection safely."""
+    global _client
     try:
-        db = MongoDB()
-        await db.close_connection()
+        if _client is not None:
+            logger.info("🛑 Closing MongoDB connection...")
+            _client.close()
+            _client = None
     except Exception as e:
         logger.error(f"❌ Error during MongoDB shutdown: {e}", exc_info=True)
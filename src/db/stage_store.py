@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime, timezone
+
+from src.config import config
+from src.db.mongo_client import MongoDB
+from src.utils.cache import TTLCache
+from src.utils.change_detection import changed_fields
+from src.utils.metrics import Counter, registry
+from src.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+STAGE_REUSE = registry.register(Counter(
+    "swarm_stage_reuse_total", "Change-detection gate outcomes per agent stage.", ("stage", "outcome")
+))
+
+_NOT_FOUND = object()
+
+
+class StageStore:
+    """
+    Change-detection gate in front of the agents' LLM calls. Per stage and token it keeps the inputs the last
+    output was generated from (in MongoDB, read through a TTL cache); while new inputs stay within the configured
+    thresholds of those, the stored output is reused instead of asking the model again.
+    Snapshots are only written when the model ran, so small moves add up until they cross a threshold.
+    A `read_only` store (batch `--dry-run`) still reuses stored outputs but never writes.
+    """
+
+    def __init__(self, db: MongoDB, ttl: float = 300, maxsize: int = 10000, read_only: bool = False):
+        self.db = db
+        self.read_only = read_only
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._loads = SingleFlight()
+
+    @staticmethod
+    def snapshot_id(stage: str, key: str) -> str:
+        return f"{stage}:{key}"
+
+    async def prefetch(self, stage_keys: list):
+        """Loads the snapshots of many (stage, key) pairs with one query, e.g. for all tokens of a run."""
+        if not config.CHANGE_GATE_ENABLED:
+            return
+        ids = [self.snapshot_id(stage, key) for stage, key in stage_keys]
+        await self._load(tuple(dict.fromkeys(i for i in ids if self._cache.get(i) is None)))
+
+    async def _load(self, ids: tuple):
+        if not ids:
+            return
+        loaded = await self._loads.do(ids, lambda: self.db.fetch_stage_snapshots(ids))
+        if loaded is not None:  # On a failed query nothing is cached, so the next lookup retries
+            for snapshot_id in ids:
+                self._cache.set(snapshot_id, loaded.get(snapshot_id) or _NOT_FOUND)
+
+    async def reuse(self, stage: str, key: str, inputs: dict):
+        """Returns the stored output of `stage` for `key` if its inputs have not materially changed, else None."""
+        if not config.CHANGE_GATE_ENABLED:
+            return None
+
+        snapshot_id = self.snapshot_id(stage, key)
+        if self._cache.get(snapshot_id) is None:
+            await self._load((snapshot_id,))
+        snapshot = self._cache.get(snapshot_id)
+
+        if snapshot is None or snapshot is _NOT_FOUND:
+            STAGE_REUSE.inc(stage=stage, outcome="new")
+            return None
+        age = (datetime.now(timezone.utc) - MongoDB._as_datetime(snapshot.get("updated_at"))).total_seconds()
+        if age > config.CHANGE_GATE_MAX_AGE:
+            STAGE_REUSE.inc(stage=stage, outcome="expired")
+            return None
+        changed = changed_fields(stage, snapshot.get("inputs") or {}, inputs)
+        if changed:
+            STAGE_REUSE.inc(stage=stage, outcome="changed")
+            logger.info(f"🔁 {stage} inputs of {key} changed ({', '.join(changed[:5])}), re-running the agent")
+            return None
+
+        STAGE_REUSE.inc(stage=stage, outcome="reused")
+        logger.info(f"♻️ Reusing {stage} output of {key}: inputs unchanged since {snapshot.get('updated_at')}")
+        return snapshot.get("output")
+
+    async def record(self, stage: str, key: str, inputs: dict, output):
+        """Stores the inputs a fresh `output` was generated from, as the baseline for later runs."""
+        if not config.CHANGE_GATE_ENABLED or self.read_only:
+            return
+        snapshot = {
+            "_id": self.snapshot_id(stage, key),
+            "stage": stage,
+            "key": key,
+            "inputs": inputs,
+            "output": output,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        self._cache.set(snapshot["_id"], snapshot)
+        await self.db.save_stage_snapshot(snapshot)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+_store = None
+
+
+def get_stage_store() -> StageStore:
+    """Returns the shared stage store, creating it on first use."""
+    global _store
+    if _store is None:
+        _store = StageStore(MongoDB(), ttl=config.CHANGE_GATE_CACHE_TTL)
+    return _store
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from src.config import config
+from src.utils.cache import TTLCache
+from src.utils.events import end_stream
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, RETRYING, DONE, FAILED = "queued", "running", "retrying", "done", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING, RETRYING)
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue is at capacity; callers should shed load instead of piling up work."""
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class InMemoryBroker:
+    """
+    Bounded in-process broker. Jobs are lost on restart. Active jobs are indexed by dedup key; finished
+    jobs (with their results) are kept for `result_ttl` seconds so clients can still poll them.
+    """
+
+    def __init__(self, max_size: int, result_ttl: float = 3600, max_results: int = 1000):
+        self.max_size = max_size
+        self._queue = asyncio.Queue()
+        self._active = {}
+        self._by_dedup_key = {}
+        self._finished = TTLCache(maxsize=max_results, ttl=result_ttl)
+
+    async def setup(self):
+        pass
+
+    async def put(self, job: dict):
+        if self._queue.qsize() >= self.max_size:
+            raise JobQueueFull(f"Job queue is full ({self.max_size} jobs waiting).")
+        self._active[job["_id"]] = job
+        if job.get("dedup_key"):
+            self._by_dedup_key[job["dedup_key"]] = job["_id"]
+        self._queue.put_nowait(job["_id"])
+
+    async def requeue(self, job_id: str):
+        self._active[job_id].update(status=QUEUED, updated_at=_now())
+        self._queue.put_nowait(job_id)
+
+    async def claim(self):
+        job_id = await self._queue.get()
+        job = self._active[job_id]
+        job.update(status=RUNNING, updated_at=_now())
+        return dict(job)
+
+    async def heartbeat(self, job_id: str):
+        pass
+
+    async def update(self, job_id: str, **fields):
+        job = self._active.get(job_id)
+        if job is None:
+            return
+        job.update(fields, updated_at=_now())
+        if job["status"] not in ACTIVE_STATUSES:
+            del self._active[job_id]
+            if self._by_dedup_key.get(job.get("dedup_key")) == job_id:
+                del self._by_dedup_key[job["dedup_key"]]
+            self._finished.set(job_id, job)
+
+    async def get(self, job_id: str):
+        job = self._active.get(job_id) or self._finished.get(job_id)
+        return dict(job) if job else None
+
+    async def find_active(self, dedup_key: str):
+        job = self._active.get(self._by_dedup_key.get(dedup_key))
+        return dict(job) if job else None
+
+    async def recover(self):
+        pass
+
+
+class MongoBroker:
+    """
+    Broker backed by a MongoDB collection; jobs survive restarts and can be processed by separate worker processes.
+    A claimed job carries a lease (`owner`, `heartbeat_at`) that its worker renews while it runs; only jobs whose
+    lease has expired are taken back, so starting a process never steals jobs that live workers are running.
+    """
+
+    def __init__(self, collection, max_size: int, poll_interval: float = 1.0, lease_seconds: float = 60):
+        self.collection = collection
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def setup(self):
+        """Creates the claim, dedup and lease indexes."""
+        await self.collection.create_index([("status", 1), ("created_at", 1)])
+        await self.collection.create_index("dedup_key")
+        await self.collection.create_index([("status", 1), ("heartbeat_at", 1)])
+
+    async def put(self, job: dict):
+        if await self.collection.count_documents({"status": QUEUED}) >= self.max_size:
+            raise JobQueueFull(f"Job queue is full ({self.max_size} jobs waiting).")
+        await self.collection.insert_one(job)
+
+    async def requeue(self, job_id: str):
+        await self.update(job_id, status=QUEUED)
+
+    async def claim(self):
+        from pymongo import ReturnDocument
+
+        while True:
+            job = await self.collection.find_one_and_update(
+                {"status": QUEUED},
+                {"$set": {"status": RUNNING, "owner": self.owner, "heartbeat_at": _now(), "updated_at": _now()}},
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job:
+                return job
+            await asyncio.sleep(self.poll_interval)
+
+    async def heartbeat(self, job_id: str):
+        """Renews this worker's lease on a running job."""
+        await self.collection.update_one({"_id": job_id, "owner": self.owner}, {"$set": {"heartbeat_at": _now()}})
+
+    async def update(self, job_id: str, **fields):
+        # A job waiting for its retry keeps a fresh lease, so it is only recovered if this process dies
+        if fields.get("status") == RETRYING:
+            fields["heartbeat_at"] = _now()
+        await self.collection.update_one({"_id": job_id}, {"$set": {**fields, "updated_at": _now()}})
+
+    async def get(self, job_id: str):
+        return await self.collection.find_one({"_id": job_id})
+
+    async def find_active(self, dedup_key: str):
+        return await self.collection.find_one({"dedup_key": dedup_key, "status": {"$in": list(ACTIVE_STATUSES)}})
+
+    async def recover(self):
+        """Puts jobs whose worker stopped renewing its lease (e.g. it died) back on the queue."""
+        expired = _now() - timedelta(seconds=self.lease_seconds)
+        result = await self.collection.update_many(
+            {
+                "status": {"$in": [RUNNING, RETRYING]},
+                "$or": [{"heartbeat_at": {"$lt": expired}}, {"heartbeat_at": None}],
+            },
+            {"$set": {"status": QUEUED, "owner": None, "updated_at": _now()}},
+        )
+        if result.modified_count:
+            logger.warning(f"Re-queued {result.modified_count} jobs with expired leases.")
+
+
+class JobQueue:
+    """Runs registered job handlers on a bounded pool of worker tasks with dedup and retries."""
+
+    def __init__(self, broker, workers: int = 2, max_attempts: int = 2, retry_delay: float = 5.0,
+                 lease_seconds: float = 60):
+        self.broker = broker
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self._handlers = {}
+        self._tasks = []
+
+    def register(self, name: str, handler):
+        """Registers a coroutine function that receives the job payload as keyword arguments."""
+        self._handlers[name] = handler
+
+    async def enqueue(self, name: str, payload: dict, dedup_key: str = None, job_id: str = None) -> str:
+        """Queues a job and returns its ID; an active job with the same `dedup_key` is reused instead."""
+        if name not in self._handlers:
+            raise ValueError(f"No handler registered for job '{name}'.")
+
+        if dedup_key:
+            existing = await self.broker.find_active(dedup_key)
+            if existing:
+                logger.info(f"Reusing active job {existing['_id']} for {dedup_key}")
+                return existing["_id"]
+
+        job = {
+            "_id": job_id or uuid.uuid4().hex,
+            "name": name,
+            "payload": payload,
+            "dedup_key": dedup_key,
+            "status": QUEUED,
+            "attempts": 0,
+            "error": None,
+            "result": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        await self.broker.put(job)
+        return job["_id"]
+
+    async def get(self, job_id: str):
+        return await self.broker.get(job_id)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.broker.heartbeat(job_id)
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+    async def _recover_periodically(self):
+        # Jobs of workers that died in other processes come back once their lease expires
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                await self.broker.recover()
+            except Exception as e:
+                logger.warning(f"Job recovery failed: {e}")
+
+    async def _work(self, worker_id: int):
+        while True:
+            job = await self.broker.claim()
+            attempts = job.get("attempts", 0) + 1
+            logger.info(f"Worker {worker_id} running job {job['_id']} ({job['name']}, attempt {attempts})")
+            heartbeat = asyncio.create_task(self._heartbeat(job["_id"]))
+            try:
+                result = await self._handlers[job["name"]](**job["payload"])
+                await self.broker.update(job["_id"], status=DONE, attempts=attempts, result=result, error=None)
+            except asyncio.CancelledError:
+                await self.broker.update(job["_id"], status=QUEUED, attempts=attempts - 1)
+                raise
+            except Exception as e:
+                logger.error(f"Job {job['_id']} failed: {e}", exc_info=True)
+                if attempts < self.max_attempts:
+                    await self.broker.update(job["_id"], status=RETRYING, attempts=attempts, error=str(e))
+                    asyncio.get_running_loop().call_later(
+                        self.retry_delay, lambda job_id=job["_id"]: asyncio.ensure_future(self.broker.requeue(job_id))
+                    )
+                else:
+                    await self.broker.update(job["_id"], status=FAILED, attempts=attempts, error=str(e))
+                    # Subscribers of the run's live stream would otherwise wait for a 'done' that never comes
+                    run_id = job["payload"].get("run_id")
+                    if run_id:
+                        end_stream(run_id, "failed", {"run_id": run_id, "error": str(e)})
+            finally:
+                heartbeat.cancel()
+
+    async def start(self):
+        """Recovers jobs with expired leases and starts the worker tasks."""
+        await self.broker.setup()
+        await self.broker.recover()
+        self._tasks = [asyncio.create_task(self._work(i), name=f"job-worker-{i}") for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover_periodically(), name="job-recovery"))
+        logger.info(f"Job queue started with {self.workers} workers ({type(self.broker).__name__}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def create_job_queue() -> JobQueue:
+    """Builds the job queue with the broker and limits from settings."""
+    if config.JOB_BROKER.lower() == "mongo":
+        from src.db.mongo_client import MongoDB
+        broker = MongoBroker(
+            MongoDB().db["pipeline_jobs"], max_size=config.JOB_QUEUE_MAX_SIZE, lease_seconds=config.JOB_LEASE_SECONDS
+        )
+    else:
+        broker = InMemoryBroker(
+            max_size=config.JOB_QUEUE_MAX_SIZE, result_ttl=config.JOB_RESULT_TTL, max_results=config.JOB_RESULT_MAX_ENTRIES
+        )
+
+    return JobQueue(
+        broker, workers=config.JOB_MAX_CONCURRENT_PIPELINES, max_attempts=config.JOB_MAX_ATTEMPTS,
+        lease_seconds=config.JOB_LEASE_SECONDS,
+    )
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+
+from src.clients.http_clients import http_clients
+from src.db.mongo_client import close_mongo_connection
+from src.jobs.queue import create_job_queue
+from src.pipeline import refresh_token_decisions, run_analysis_pipeline
+from src.utils.llm_engine import close_llm_engine
+from src.utils.startup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Standalone worker process: consumes analysis jobs from the configured broker (use JOB_BROKER=mongo)."""
+    setup_logging()
+    job_queue = create_job_queue()
+    job_queue.register("analysis", run_analysis_pipeline)
+    job_queue.register("refresh_decisions", refresh_token_decisions)
+    http_clients.start()
+    await job_queue.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await job_queue.stop()
+        await close_mongo_connection()
+        close_llm_engine()
+        await http_clients.aclose()
+        logger.info("Worker stopped.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,259 @@
+"""
+Batch analysis of a watchlist, e.g. from cron once an hour:
+
+    python -m src.main --watchlist watchlist.txt
+    python -m src.main --collection watchlist --resume
+    python -m src.main --watchlist watchlist.txt --record     # also store upstream responses
+    python -m src.main --watchlist watchlist.txt --dry-run    # replay stored responses, write nothing
+
+A watchlist file has one entry per line: a symbol (`PEPE`), an address (`0x6982...`) or `chain:address`
+(`0x1:0x6982...`); blank lines and `#` comments are ignored. A Mongo watchlist collection holds documents
+with `symbol`, `chain` and/or `address` fields.
+"""
+import argparse
 import asyncio
+import json
+import logging
+import os
+import time
+
+import httpx
+
+from src.clients.http_clients import http_clients
+from src.clients.moralis_client import is_address, resolve_entry
+from src.clients.upstream_cache import UpstreamCacheTransport
+from src.config import config
+from src.db.mongo_client import MongoDB, close_mongo_connection
+from src.db.stage_store import get_stage_store
+from src.pipeline import run_analysis_pipeline
+from src.utils.llm_engine import close_llm_engine, configure_llm_engine
+from src.utils.startup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_entry(entry: str) -> str:
+    entry = entry.strip()
+    return entry.lower() if is_address(entry.rpartition(":")[2]) else entry.upper()
+
+
+def load_watchlist_file(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return list(dict.fromkeys(normalize_entry(line) for line in lines if line))
+
+
+async def load_watchlist_collection(name: str) -> list:
+    documents = await MongoDB().db[name].find({}).to_list(length=None)
+    entries = []
+    for document in documents:
+        address, chain, symbol = document.get("address"), document.get("chain"), document.get("symbol")
+        if address:
+            entries.append(normalize_entry(f"{chain}:{address}" if chain else address))
+        elif symbol:
+            entries.append(normalize_entry(symbol))
+    return list(dict.fromkeys(entries))
+
+
+class Checkpoint:
+    """Watchlist entries whose reports are durably written; lets an interrupted batch resume where it stopped."""
+
+    def __init__(self, path: str, source: str, resume: bool, enabled: bool = True):
+        self.path = path
+        self.source = source
+        self.enabled = enabled
+        self.done = set()
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("source") == source:
+                self.done = set(state.get("done", []))
+            else:
+                logger.warning(f"⚠️ Checkpoint {path} belongs to {state.get('source')}, starting over.")
+
+    def add(self, entries):
+        self.done.update(entries)
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)  # Atomic, so a crash never leaves a truncated checkpoint
+
+    def clear(self):
+        if self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class ReportBuffer:
+    """
+    Collects pipeline reports and writes them with bulk inserts, checkpointing entries once their report is stored.
+    Reports that fail to store stay buffered (with their entries) and are retried by later flushes.
+    """
+
+    def __init__(self, checkpoint: Checkpoint, flush_size: int, dry_run: bool = False, retry_delay: float = 5.0):
+        self.checkpoint = checkpoint
+        self.flush_size = flush_size
+        self.dry_run = dry_run
+        self.retry_delay = retry_delay
+        self.db = MongoDB()
+        self.stored = 0
+        self._reports = []
+        self._entries = {}  # run_id -> watchlist entries analyzed in that run
+        self._lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Reports not stored yet."""
+        return len(self._reports)
+
+    async def save_report(self, report: dict):
+        """Buffers a report; it has no database id until flushed, so its run id stands in for one."""
+        self._reports.append(report)
+        return report["run_id"]
+
+    async def complete(self, run_id: str, entries: list):
+        """Marks a finished run; flushes once enough reports are buffered."""
+        self._entries[run_id] = entries
+        if len(self._reports) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            reports, entries = self._reports, self._entries
+            self._reports, self._entries = [], {}
+            if not reports and not entries:
+                return
+
+            if self.dry_run:
+                for report in reports:
+                    logger.info(
+                        "🧪 Dry run decisions: "
+                        + ", ".join(f"{token.symbol}={token.final_decision}" for token in report["tokens"])
+                    )
+                failed = []
+            else:
+                from bson import ObjectId  # Deferred like the Motor import; ids set here tell which reports were stored
+
+                for report in reports:
+                    report.setdefault("_id", ObjectId())
+                saved = set(await self.db.save_reports(reports))
+                failed = [report for report in reports if report["_id"] not in saved]
+
+            if failed:
+                # Keep them (and their entries, out of the checkpoint) for the next flush or a resumed run
+                failed_runs = {report["run_id"] for report in failed}
+                self._reports.extend(failed)
+                self._entries.update({run_id: entries.pop(run_id) for run_id in failed_runs if run_id in entries})
+                logger.error(f"❌ Failed to store {len(failed)} of {len(reports)} reports; they will be retried.")
+
+            self.stored += len(reports) - len(failed)
+            self.checkpoint.add(entry for run_entries in entries.values() for entry in run_entries)
+
+    async def close(self, attempts: int = 3):
+        """Final flush, retried while reports fail to store; returns how many reports are still unsaved."""
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(self.retry_delay)
+            await self.flush()
+            if not self.pending:
+                break
+        return self.pending
+
+
+def install_upstream_cache(replay: bool):
+    """Routes every upstream and the LLM client through the on-disk response cache."""
+    for name, settings in http_clients.upstreams.items():
+        inner = None if replay else httpx.AsyncHTTPTransport(retries=settings["retries"])
+        http_clients.set_transport(
+            name, UpstreamCacheTransport(os.path.join(config.UPSTREAM_CACHE_DIR, name), inner=inner, replay=replay)
+        )
+    configure_llm_engine(transport=UpstreamCacheTransport(
+        os.path.join(config.UPSTREAM_CACHE_DIR, "openai"), inner=None if replay else httpx.HTTPTransport(), replay=replay
+    ))
+
+
+async def run_batch(args) -> int:
+    if args.dry_run or args.record:
+        install_upstream_cache(replay=args.dry_run)
+    if args.dry_run:
+        get_stage_store().read_only = True  # Dry runs write nothing, stage snapshots included
+
+    source = args.watchlist or f"mongo:{args.collection}"
+    entries = load_watchlist_file(args.watchlist) if args.watchlist else await load_watchlist_collection(args.collection)
+    checkpoint = Checkpoint(args.checkpoint, source, resume=args.resume, enabled=not args.dry_run)
+    pending = [entry for entry in entries if entry not in checkpoint.done]
+    logger.info(f"📋 {len(entries)} watchlist entries, {len(pending)} pending ({source})")
+
+    start_time = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def resolve(entry):
+        async with semaphore:
+            return entry, await resolve_entry(entry)
+
+    resolved = await asyncio.gather(*(resolve(entry) for entry in pending))
+    unresolved = [entry for entry, token in resolved if token is None]
+    if unresolved:
+        logger.warning(f"⚠️ No token found for {len(unresolved)} entries: {unresolved[:20]}")
+    found = [(entry, token) for entry, token in resolved if token is not None]
+
+    buffer = ReportBuffer(checkpoint, flush_size=args.flush_size, dry_run=args.dry_run)
+    batches = [found[i:i + args.batch_size] for i in range(0, len(found), args.batch_size)]
+    failed_batches = 0
+
+    async def analyze(batch_index, batch):
+        nonlocal failed_batches
+        async with semaphore:
+            try:
+                result = await run_analysis_pipeline([token for _, token in batch], report_writer=buffer)
+            except Exception as e:
+                failed_batches += 1
+                logger.error(f"❌ Batch {batch_index} failed: {e}", exc_info=True)
+                return
+        await buffer.complete(result["run_id"], [entry for entry, _ in batch])
+        logger.info(f"✅ Batch {batch_index + 1}/{len(batches)} analyzed")
+
+    await asyncio.gather(*(analyze(index, batch) for index, batch in enumerate(batches)))
+    unsaved = await buffer.close()
+
+    total_time = round(time.perf_counter() - start_time, 2)
+    logger.info(
+        f"🏁 Batch finished in {total_time}s: {buffer.stored} reports, {len(found)} tokens analyzed, "
+        f"{len(unresolved)} unresolved, {failed_batches} failed batches, {unsaved} reports not stored"
+    )
+    if not failed_batches and not unresolved and len(checkpoint.done) >= len(entries):
+        checkpoint.clear()
+    return 1 if failed_batches or unsaved else 0
 
 
-async def main():
-    pass
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the analysis pipeline over a watchlist of tokens.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--watchlist", help="File with one symbol, address or chain:address per line.")
+    source.add_argument("--collection", help="MongoDB collection holding the watchlist.")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY, help="Pipelines run in parallel.")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE, help="Tokens per pipeline run.")
+    parser.add_argument("--flush-size", type=int, default=20, help="Reports buffered per bulk insert.")
+    parser.add_argument("--checkpoint", default=config.BATCH_CHECKPOINT_FILE)
+    parser.add_argument("--resume", action="store_true", help="Skip entries completed by an interrupted run.")
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument("--record", action="store_true", help=f"Store upstream responses in {config.UPSTREAM_CACHE_DIR}.")
+    cache.add_argument("--dry-run", action="store_true", help="Replay stored upstream responses and write nothing.")
+    return parser.parse_args(argv)
 
 
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    setup_logging()
+    try:
+        return await run_batch(args)
+    finally:
+        await close_mongo_connection()
+        close_llm_engine()
+        await http_clients.aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    raise SystemExit(asyncio.run(main()))
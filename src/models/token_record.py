@@ -0,0 +1,69 @@
+from dataclasses import dataclass, fields
+from typing import Optional
+
+
+def _one_day(value) -> Optional[float]:
+    return value.get("oneDay") if isinstance(value, dict) else value
+
+
+@dataclass(slots=True)
+class TokenRecord:
+    """
+    A token as it moves through the analysis pipeline: only the Moralis search fields that are displayed or
+    prompted on, plus the outputs of each stage. Field names follow the Moralis response so templates and
+    stored documents keep their keys.
+    """
+    symbol: str
+    chainId: Optional[str] = None
+    tokenAddress: Optional[str] = None
+    name: Optional[str] = None
+    logo: Optional[str] = None
+    usdPrice: Optional[float] = None
+    marketCap: Optional[float] = None
+    securityScore: Optional[int] = None
+    priceChange24h: Optional[float] = None
+    volume24h: Optional[float] = None
+    liquidityChange24h: Optional[float] = None
+    netBuyers24h: Optional[float] = None
+    decimals: Optional[int] = None
+
+    # Stage outputs
+    analysis: Optional[str] = None
+    taapi_analysis: Optional[str] = None
+    news_summary: Optional[str] = None
+    compact_summary: Optional[str] = None
+    final_decision: Optional[str] = None
+    decision_source: Optional[str] = None
+
+    @classmethod
+    def from_moralis(cls, raw: dict) -> "TokenRecord":
+        """Builds a record from a Moralis `/tokens/search` result (optionally enriched), dropping unused fields."""
+        metadata = raw.get("metadata") or {}
+        return cls(
+            symbol=raw.get("symbol") or "",
+            chainId=raw.get("chainId"),
+            tokenAddress=raw.get("tokenAddress"),
+            name=raw.get("name"),
+            logo=raw.get("logo"),
+            usdPrice=raw.get("usdPrice"),
+            marketCap=raw.get("marketCap"),
+            securityScore=raw.get("securityScore"),
+            priceChange24h=_one_day(raw.get("usdPricePercentChange", raw.get("priceChange24h"))),
+            volume24h=_one_day(raw.get("volumeUsd", raw.get("volume24h"))),
+            liquidityChange24h=_one_day(raw.get("liquidityChangeUSD", raw.get("liquidityChange24h"))),
+            netBuyers24h=_one_day(raw.get("experiencedNetBuyers", raw.get("netBuyers24h"))),
+            decimals=metadata.get("decimals", raw.get("decimals")),
+            **{name: raw.get(name) for name in _STAGE_FIELDS},
+        )
+
+    @classmethod
+    def coerce(cls, token) -> "TokenRecord":
+        return token if isinstance(token, cls) else cls.from_moralis(token)
+
+    def to_dict(self) -> dict:
+        """Plain dict of the fields that are set, for Mongo documents, job payloads and JSON responses."""
+        return {name: value for name in _FIELD_NAMES if (value := getattr(self, name)) is not None}
+
+
+_FIELD_NAMES = tuple(field.name for field in fields(TokenRecord))
+_STAGE_FIELDS = ("analysis", "taapi_analysis", "news_summary", "compact_summary", "final_decision", "decision_source")
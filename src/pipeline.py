@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+
+from src.agents.moralis_agent import MoralisAgent
+from src.agents.news_agent import NewsAgent
+from src.agents.orchestrator_agent import OrchestratorAgent
+from src.agents.taapi_agent import TAAPIAgent
+from src.config import config
+from src.clients.moralis_client import resolve_entry
+from src.db.mongo_client import MongoDB
+from src.db.stage_store import get_stage_store
+from src.models.token_record import TokenRecord
+from src.utils.events import create_stream
+from src.utils.llm_engine import get_llm_engine
+from src.utils.pipeline import PipelineContext, StageGraph, token_key
+from src.utils.resilience import deadline
+
+logger = logging.getLogger(__name__)
+
+db_client = MongoDB()
+
+
+async def run_analysis_pipeline(results, run_id=None, report_writer=None):
+    """
+    Runs MoralisAgent, TAAPIAgent and NewsAgent for every token as one dependency graph and passes the
+    results to OrchestratorAgent shard by shard, each as soon as the stages of its tokens have finished.
+    Reports go to MongoDB unless a `report_writer` (any object with `save_report`) is given.
+    """
+    logger.info("Starting background token analysis...")
+    start_time = time.perf_counter()
+    # Raw Moralis dicts (from the job queue or the batch CLI) become compact records the stages annotate
+    results = [TokenRecord.coerce(token) for token in results]
+    stream = create_stream(run_id) if run_id else None
+    context = PipelineContext(results, run_id=run_id, stream=stream, report_writer=report_writer)
+    graph = StageGraph()
+
+    def moralis_stage(token):
+        async def run():
+            analysis = await MoralisAgent(token).analyze()
+            token.analysis = analysis if isinstance(analysis, str) else "Analysis not available."
+            context.mark("moralis", token, token.analysis)
+        return run
+
+    def taapi_stage(token):
+        async def run():
+            analysis = await TAAPIAgent(token.symbol).analyze()
+            token.taapi_analysis = analysis if isinstance(analysis, str) else "Analysis not available."
+            context.mark("taapi", token, token.taapi_analysis)
+        return run
+
+    def news_stage(batch):
+        async def run():
+            summary = await NewsAgent(news_query(batch)).summarize_news()
+            for token in batch:
+                token.news_summary = summary if isinstance(summary, str) else "No news available."
+                context.mark("news", token, token.news_summary)
+        return run
+
+    def token_ready(token):
+        async def run():
+            # Fill in defaults for stages that failed so the orchestrator always gets a complete record
+            token.analysis = token.analysis or "Analysis not available."
+            token.taapi_analysis = token.taapi_analysis or "Analysis not available."
+            token.news_summary = token.news_summary or "No news available."
+            logger.info(f"Token {token.symbol} is ready for the final decision.")
+        return run
+
+    batch_size = 3
+    token_batches = [results[i:i + batch_size] for i in range(0, len(results), batch_size)]
+
+    def news_query(batch):
+        return " OR ".join(token.symbol for token in batch)
+
+    # One query for the stored stage snapshots the change-detection gate compares this run's inputs against
+    await get_stage_store().prefetch(
+        [(stage, token_key(token)) for token in results for stage in ("moralis", "decision")]
+        + [("taapi", token.symbol.upper()) for token in results]
+        + [("news", news_query(batch)) for batch in token_batches]
+    )
+
+    # Data stages that outlast their share of the run's budget are cut off (their defaults are used),
+    # so the orchestrator always gets the rest of the budget for the decision
+    data_budget = config.PIPELINE_DEADLINE_SECONDS * config.PIPELINE_DATA_STAGE_SHARE or None
+
+    token_nodes = []
+    for batch_index, batch in enumerate(token_batches):
+        news_node = graph.add(f"news:{batch_index}", news_stage(batch), timeout=data_budget)
+        for offset, token in enumerate(batch):
+            index = batch_index * batch_size + offset
+            moralis_node = graph.add(f"moralis:{index}", moralis_stage(token), timeout=data_budget)
+            taapi_node = graph.add(f"taapi:{index}", taapi_stage(token), timeout=data_budget)
+            token_nodes.append(
+                graph.add(f"token:{index}", token_ready(token), deps=(moralis_node, taapi_node, news_node))
+            )
+
+    # Each shard of tokens is decided on as soon as its own tokens are ready, not after the slowest token of the run
+    orchestrator = OrchestratorAgent(results, context=context)
+
+    def decision_stage(shard):
+        async def run():
+            logger.info(f"Running final investment decision for {len(shard)} tokens...")
+            decisions = await orchestrator.decide(shard)
+            for token in shard:
+                context.mark("decision", token, token.final_decision)
+            return decisions
+        return run
+
+    async def report():
+        decisions = await orchestrator.finalize()
+        for token in results:  # Tokens of failed shards get their default HOLD
+            if not context.has("decision", token):
+                context.mark("decision", token, token.final_decision)
+        return decisions
+
+    shard_size = max(1, config.ORCHESTRATOR_MAX_SHARD_SIZE)
+    decision_nodes = [
+        graph.add(
+            f"orchestrator:{start // shard_size}",
+            decision_stage(results[start:start + shard_size]),
+            deps=token_nodes[start:start + shard_size],
+        )
+        for start in range(0, len(results), shard_size)
+    ]
+    graph.add("report", report, deps=decision_nodes)
+    with deadline(config.PIPELINE_DEADLINE_SECONDS):
+        await graph.run()
+
+    # The orchestrator normally stores the report; this only writes one if it failed before doing so
+    await context.save_report(db_client)
+    logger.info(f"Report for run {context.run_id} stored.")
+
+    total_time = round(time.perf_counter() - start_time, 2)
+    if stream is not None:
+        stream.publish("done", {"run_id": context.run_id, "seconds": total_time})
+        stream.close()
+    logger.info(f"Analysis pipeline finished in {total_time}s | Stage timings: {graph.timing_summary()}")
+    logger.info(f"LLM engine metrics: {get_llm_engine().metrics()}")
+
+    return {
+        "run_id": context.run_id,
+        "decisions": {token_key(token): token.final_decision for token in results},
+    }
+
+
+async def refresh_token_decisions(tokens: list, run_id=None):
+    """
+    Re-analyzes a batch of (chain, address) pairs in one pipeline run (job handler for stale decisions):
+    fresh Moralis data, then the full pipeline. Pairs Moralis does not know are skipped.
+    """
+    entries = await asyncio.gather(*(resolve_entry(f"{chain}:{address.lower()}") for chain, address in tokens))
+    found = [token for token in entries if token is not None]
+    if not found:
+        raise LookupError(f"None of {len(tokens)} token(s) found on Moralis.")
+    return await run_analysis_pipeline(found, run_id=run_id)
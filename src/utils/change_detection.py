@@ -0,0 +1,87 @@
+import hashlib
+import numbers
+
+from src.config import config
+from src.utils.prompt_budget import article_id
+
+
+def moralis_inputs(token) -> dict:
+    """The market data the Moralis analysis prompt is built from."""
+    return {
+        "usdPrice": token.usdPrice,
+        "marketCap": token.marketCap,
+        "priceChange24h": token.priceChange24h,
+        "volume24h": token.volume24h,
+        "securityScore": token.securityScore,
+    }
+
+
+def taapi_inputs(indicators: dict) -> dict:
+    """Flattens indicator values, including MACD and Bollinger sub-values, to {'macd.valueMACD': ...}."""
+    flat = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                walk(f"{prefix}.{key}" if prefix else str(key), item)
+        elif isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                walk(f"{prefix}.{index}", item)
+        else:
+            flat[prefix] = value
+
+    walk("", indicators)
+    return flat
+
+
+def news_inputs(articles: list) -> dict:
+    """The set of articles a news summary covers."""
+    return {"articles": sorted({article_id(article) for article in articles} - {""})}
+
+
+def decision_inputs(token) -> dict:
+    """Digest of the stage outputs the orchestrator decides on; any new text means a new decision."""
+    text = "\x1f".join(str(value or "") for value in (token.analysis, token.taapi_analysis, token.news_summary))
+    return {"digest": hashlib.sha1(text.encode()).hexdigest()}
+
+
+def tolerances(stage: str) -> dict:
+    """Per-field (relative, absolute) tolerances of a stage; fields without one must match exactly."""
+    if stage == "moralis":
+        return {
+            "usdPrice": (config.CHANGE_PRICE_THRESHOLD, 0.0),
+            "marketCap": (config.CHANGE_PRICE_THRESHOLD, 0.0),
+            "priceChange24h": (0.0, config.CHANGE_PRICE_CHANGE_POINTS),
+            "volume24h": (config.CHANGE_VOLUME_THRESHOLD, 0.0),
+        }
+    return {}
+
+
+def default_tolerance(stage: str) -> tuple:
+    """Tolerance for fields not listed in `tolerances`, e.g. every indicator value of the TAAPI stage."""
+    return (config.CHANGE_INDICATOR_THRESHOLD, 0.0) if stage == "taapi" else (0.0, 0.0)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def changed_fields(stage: str, previous: dict, current: dict) -> list:
+    """
+    Fields of `current` that moved beyond their tolerance since `previous`; an empty list means the inputs
+    have not materially changed. List values (article ids) count as changed when they contain anything new.
+    """
+    limits, default = tolerances(stage), default_tolerance(stage)
+    changed = []
+    for field in sorted(previous.keys() | current.keys()):
+        old, new = previous.get(field), current.get(field)
+        if isinstance(new, list):
+            moved = not set(new) <= set(old or ())
+        elif _is_number(old) and _is_number(new):
+            relative, absolute = limits.get(field, default)
+            moved = abs(new - old) > max(absolute, relative * abs(old))
+        else:
+            moved = old != new
+        if moved:
+            changed.append(field)
+    return changed
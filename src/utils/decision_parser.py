@@ -0,0 +1,80 @@
+import json
+import re
+
+DECISIONS = ("BUY", "HOLD", "AVOID")
+
+_DECISION_PATTERN = "|".join(DECISIONS)
+
+
+def normalize_decision(value):
+    """Maps a raw value ('buy', {'decision': 'Hold'}, 'AVOID - high risk') to BUY/HOLD/AVOID, or None."""
+    if isinstance(value, dict):
+        value = value.get("decision") or value.get("recommendation") or value.get("action")
+    if not isinstance(value, str):
+        return None
+    match = re.search(rf"\b({_DECISION_PATTERN})\b", value.upper())
+    return match.group(1) if match else None
+
+
+def _from_mapping(data: dict, symbols: list) -> dict:
+    wanted = {symbol.upper(): symbol for symbol in symbols}
+    decisions = {}
+    for key, value in data.items():
+        symbol = wanted.get(str(key).strip().upper())
+        decision = normalize_decision(value)
+        if symbol and decision:
+            decisions[symbol] = decision
+    return decisions
+
+
+def _json_candidates(text: str):
+    """Yields the whole text and every balanced {...} block in it, so JSON wrapped in prose still parses."""
+    yield text
+    depth, start = 0, None
+    for index, char in enumerate(text):
+        if char == "{":
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                yield text[start:index + 1]
+
+
+def extract_decisions(text, symbols: list) -> dict:
+    """
+    Recovers per-symbol decisions from a model reply, tolerating markdown fences, surrounding prose,
+    truncated JSON and plain 'SYMBOL: BUY' lines. Only symbols from `symbols` are returned.
+    """
+    if isinstance(text, dict):
+        return _from_mapping(text, symbols)
+    if not isinstance(text, str) or not text.strip():
+        return {}
+
+    cleaned = text.strip().replace("```json", "").replace("```", "").strip()
+    decisions = {}
+    for candidate in _json_candidates(cleaned):
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(parsed, dict):
+            decisions.update(_from_mapping(parsed, symbols))
+        elif isinstance(parsed, list):
+            for item in parsed:
+                if isinstance(item, dict) and "symbol" in item:
+                    decisions.update(_from_mapping({item["symbol"]: item}, symbols))
+        if len(decisions) == len(symbols):
+            return decisions
+
+    # Fallback for partial or malformed output: look for "SYMBOL": "BUY", SYMBOL - HOLD, **SYMBOL**: AVOID ...
+    for symbol in symbols:
+        if symbol in decisions:
+            continue
+        pattern = rf"""(?<![\w$]){re.escape(symbol)}(?![\w$])[\s"'*`)]*(?:\([^)]*\)\s*)?[:=\-–—>]+\s*["'*`]*({_DECISION_PATTERN})\b"""
+        match = re.search(pattern, cleaned, flags=re.IGNORECASE)
+        if match:
+            decisions[symbol] = match.group(1).upper()
+
+    return decisions
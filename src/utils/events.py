@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class RunStream:
+    """Event log of one pipeline run that any number of subscribers can replay and follow live."""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.history = []
+        self.closed = False
+        self._subscribers = set()
+
+    def publish(self, event_type: str, data: dict):
+        event = {"type": event_type, "data": data}
+        self.history.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def close(self):
+        """Marks the run as finished and ends every open subscription."""
+        if self.closed:
+            return
+        self.closed = True
+        for queue in self._subscribers:
+            queue.put_nowait(None)
+
+    async def subscribe(self):
+        """Yields past events first, then live ones until the run is closed."""
+        queue = asyncio.Queue()
+        backlog = list(self.history)
+        closed = self.closed
+        if not closed:
+            self._subscribers.add(queue)
+
+        try:
+            for event in backlog:
+                yield event
+            if closed:
+                return
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+
+# Finished runs stay available for late subscribers until they expire
+_streams = TTLCache(maxsize=1000, ttl=900)
+
+
+def create_stream(run_id: str) -> RunStream:
+    """Returns the run's stream, creating it if the run does not have one yet."""
+    stream = _streams.get(run_id)
+    if stream is None:
+        stream = RunStream(run_id)
+        _streams.set(run_id, stream)
+    return stream
+
+
+def get_stream(run_id: str):
+    return _streams.get(run_id)
+
+
+def end_stream(run_id: str, event_type: str, data: dict):
+    """Publishes a final event (e.g. 'failed') to a run's stream in this process, if any, and closes it."""
+    stream = _streams.get(run_id)
+    if stream is not None and not stream.closed:
+        stream.publish(event_type, data)
+        stream.close()
+
+
+def format_sse(event: dict) -> str:
+    """Formats an event for a Server-Sent Events response."""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
@@ -0,0 +1,204 @@
+from collections import deque
+from typing import List
+
+import numpy as np
+
+from src.models.models import OHLCData, TechnicalIndicators
+
+# Largest block processed at once by the scaled-cumsum EMA; keeps decay powers well inside float range
+_EMA_BLOCK = 256
+
+
+def ema_series(values: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """
+    Vectorized exponential smoothing: out[i] = alpha * values[i] + (1 - alpha) * out[i - 1], with out[-1] = seed.
+    """
+    values = np.asarray(values, dtype=float)
+    if alpha >= 1.0:
+        return values.copy()
+
+    decay = 1.0 - alpha
+    out = np.empty_like(values)
+    prev = seed
+    for start in range(0, len(values), _EMA_BLOCK):
+        block = values[start:start + _EMA_BLOCK]
+        powers = decay ** np.arange(1, len(block) + 1)
+        out[start:start + len(block)] = powers * (prev + np.cumsum(alpha * block / powers))
+        prev = out[start + len(block) - 1]
+    return out
+
+
+def sma(closes: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average; the first value corresponds to closes[period - 1]."""
+    cumsum = np.cumsum(np.insert(np.asarray(closes, dtype=float), 0, 0.0))
+    return (cumsum[period:] - cumsum[:-period]) / period
+
+
+def ema(closes: np.ndarray, period: int) -> np.ndarray:
+    """EMA seeded with the SMA of the first `period` values; the first value corresponds to closes[period - 1]."""
+    closes = np.asarray(closes, dtype=float)
+    seed = closes[:period].mean()
+    return np.concatenate(([seed], ema_series(closes[period:], 2.0 / (period + 1), seed)))
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder smoothing (RSI/ATR), seeded with the mean of the first `period` values."""
+    values = np.asarray(values, dtype=float)
+    seed = values[:period].mean()
+    return np.concatenate(([seed], ema_series(values[period:], 1.0 / period, seed)))
+
+
+def rsi(closes: np.ndarray, period: int = 14) -> np.ndarray:
+    avg_gain, avg_loss = _rsi_averages(closes, period)
+    return _rsi_from_averages(avg_gain, avg_loss)
+
+
+def _rsi_averages(closes: np.ndarray, period: int):
+    deltas = np.diff(np.asarray(closes, dtype=float))
+    return wilder(np.clip(deltas, 0, None), period), wilder(np.clip(-deltas, 0, None), period)
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = np.divide(avg_gain, avg_loss)
+        return np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+
+
+def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """True range for every candle after the first."""
+    highs, lows, closes = (np.asarray(a, dtype=float) for a in (highs, lows, closes))
+    prev_close = closes[:-1]
+    return np.maximum.reduce([highs[1:] - lows[1:], np.abs(highs[1:] - prev_close), np.abs(lows[1:] - prev_close)])
+
+
+def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> np.ndarray:
+    return wilder(true_range(highs, lows, closes), period)
+
+
+def macd(closes: np.ndarray, fast: int = 12, slow: int = 26) -> np.ndarray:
+    """MACD line aligned to the slow EMA."""
+    return ema(closes, fast)[slow - fast:] - ema(closes, slow)
+
+
+def bollinger_bands(closes: np.ndarray, period: int = 20, num_std: float = 2.0):
+    """Returns (upper, middle, lower) arrays using the population standard deviation."""
+    windows = np.lib.stride_tricks.sliding_window_view(np.asarray(closes, dtype=float), period)
+    middle = windows.mean(axis=1)
+    std = windows.std(axis=1)
+    return middle + num_std * std, middle, middle - num_std * std
+
+
+class IndicatorEngine:
+    """
+    Computes TechnicalIndicators from OHLC candles. Seeding is vectorized over the whole history;
+    after that `update()` folds in each new candle in O(1) per indicator without recomputing the series.
+    """
+
+    def __init__(self, sma_period=14, ema_period=14, rsi_period=14, atr_period=14,
+                 bb_period=20, bb_std=2.0, macd_fast=12, macd_slow=26):
+        self.sma_period = sma_period
+        self.ema_period = ema_period
+        self.rsi_period = rsi_period
+        self.atr_period = atr_period
+        self.bb_period = bb_period
+        self.bb_std = bb_std
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+
+        self.last_timestamp = None
+        self._window = deque(maxlen=max(sma_period, bb_period))
+        self._sma_sum = 0.0
+        self._bb_sum = 0.0
+        self._bb_sumsq = 0.0
+        self._prev_close = None
+        self._ema = self._ema_fast = self._ema_slow = None
+        self._avg_gain = self._avg_loss = None
+        self._atr = None
+
+    @property
+    def min_candles(self) -> int:
+        return max(self.sma_period, self.ema_period, self.rsi_period + 1, self.atr_period + 1,
+                   self.bb_period, self.macd_slow)
+
+    @classmethod
+    def from_candles(cls, candles: List[OHLCData], **kwargs) -> "IndicatorEngine":
+        engine = cls(**kwargs)
+        engine.seed(candles)
+        return engine
+
+    def seed(self, candles: List[OHLCData]):
+        """Initializes all indicator state from a candle history (oldest first)."""
+        if len(candles) < self.min_candles:
+            raise ValueError(f"At least {self.min_candles} candles are required, got {len(candles)}.")
+
+        closes = np.fromiter((c.close for c in candles), dtype=float, count=len(candles))
+        highs = np.fromiter((c.high for c in candles), dtype=float, count=len(candles))
+        lows = np.fromiter((c.low for c in candles), dtype=float, count=len(candles))
+
+        self._window.clear()
+        self._window.extend(closes[-self._window.maxlen:])
+        self._sma_sum = float(closes[-self.sma_period:].sum())
+        self._bb_sum = float(closes[-self.bb_period:].sum())
+        self._bb_sumsq = float(np.square(closes[-self.bb_period:]).sum())
+
+        self._ema = float(ema(closes, self.ema_period)[-1])
+        self._ema_fast = float(ema(closes, self.macd_fast)[-1])
+        self._ema_slow = float(ema(closes, self.macd_slow)[-1])
+
+        avg_gain, avg_loss = _rsi_averages(closes, self.rsi_period)
+        self._avg_gain, self._avg_loss = float(avg_gain[-1]), float(avg_loss[-1])
+        self._atr = float(atr(highs, lows, closes, self.atr_period)[-1])
+
+        self._prev_close = float(closes[-1])
+        self.last_timestamp = candles[-1].timestamp
+
+    def update(self, candle: OHLCData) -> TechnicalIndicators:
+        """Folds one new closed candle into the running state."""
+        if self._prev_close is None:
+            raise ValueError("IndicatorEngine must be seeded before update().")
+
+        close = candle.close
+        if len(self._window) >= self.sma_period:
+            self._sma_sum -= self._window[-self.sma_period]
+        if len(self._window) >= self.bb_period:
+            leaving = self._window[-self.bb_period]
+            self._bb_sum -= leaving
+            self._bb_sumsq -= leaving * leaving
+        self._window.append(close)
+        self._sma_sum += close
+        self._bb_sum += close
+        self._bb_sumsq += close * close
+
+        self._ema += (close - self._ema) * 2.0 / (self.ema_period + 1)
+        self._ema_fast += (close - self._ema_fast) * 2.0 / (self.macd_fast + 1)
+        self._ema_slow += (close - self._ema_slow) * 2.0 / (self.macd_slow + 1)
+
+        delta = close - self._prev_close
+        self._avg_gain += (max(delta, 0.0) - self._avg_gain) / self.rsi_period
+        self._avg_loss += (max(-delta, 0.0) - self._avg_loss) / self.rsi_period
+
+        tr = max(candle.high - candle.low, abs(candle.high - self._prev_close), abs(candle.low - self._prev_close))
+        self._atr += (tr - self._atr) / self.atr_period
+
+        self._prev_close = close
+        self.last_timestamp = candle.timestamp
+        return self.indicators()
+
+    def indicators(self) -> TechnicalIndicators:
+        middle = self._bb_sum / self.bb_period
+        std = max(self._bb_sumsq / self.bb_period - middle * middle, 0.0) ** 0.5
+        rsi_value = 100.0 if self._avg_loss == 0 else 100.0 - 100.0 / (1.0 + self._avg_gain / self._avg_loss)
+
+        return TechnicalIndicators(
+            sma=self._sma_sum / self.sma_period,
+            ema=self._ema,
+            rsi=rsi_value,
+            macd=self._ema_fast - self._ema_slow,
+            atr=self._atr,
+            bollinger_bands=[middle + self.bb_std * std, middle, middle - self.bb_std * std],
+        )
+
+
+def compute_indicators(candles: List[OHLCData], **kwargs) -> TechnicalIndicators:
+    """Computes the latest TechnicalIndicators for a candle history."""
+    return IndicatorEngine.from_candles(candles, **kwargs).indicators()
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.config import config
+from src.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Strips indentation and collapses whitespace so formatting-only differences hit the same cache entry."""
+    lines = (re.sub(r"\s+", " ", line).strip() for line in prompt.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(agent_name: str, instructions: str, model, prompt: str) -> str:
+    """Content-addressed key over everything that determines the model's answer."""
+    payload = json.dumps([agent_name, instructions, model or "", normalize_prompt(prompt)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCacheBackend:
+    """
+    Stores cached responses as small JSON files, one per key. `get` returns (value, seconds left) or None.
+    Each file's mtime is set to its expiry, so expired files can be pruned without reading them; pruning runs on
+    start-up and every `prune_every` writes, and also drops the soonest-expiring files beyond `max_entries`.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 10000, prune_every: int = 100):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+        self.prune()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _read(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        ttl_left = entry.get("expires_at", 0) - time.time()
+        if ttl_left <= 0:
+            self._remove(self._path(key))
+            return None
+        return entry.get("value"), ttl_left
+
+    def _write(self, key: str, value: str, ttl: float):
+        expires_at = time.time() + ttl
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"value": value, "expires_at": expires_at}, f, ensure_ascii=False)
+        os.utime(tmp_path, (expires_at, expires_at))
+        os.replace(tmp_path, self._path(key))
+
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Deletes expired entries, then the soonest-expiring ones above `max_entries`; returns how many."""
+        now = time.time()
+        entries = []
+        with os.scandir(self.directory) as files:
+            for file in files:
+                if file.name.endswith(".json"):
+                    try:
+                        entries.append((file.stat().st_mtime, file.path))
+                    except OSError:
+                        pass
+
+        expired = [path for expires_at, path in entries if expires_at <= now]
+        live = sorted((expires_at, path) for expires_at, path in entries if expires_at > now)
+        overflow = [path for _, path in live[:max(0, len(live) - self.max_entries)]]
+        for path in expired + overflow:
+            self._remove(path)
+        if expired or overflow:
+            logger.info(f"LLM disk cache pruned: {len(expired)} expired, {len(overflow)} over the limit")
+        return len(expired) + len(overflow)
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await asyncio.to_thread(self._write, key, value, ttl)
+
+
+class MongoCacheBackend:
+    """
+    Stores cached responses in a MongoDB collection with a TTL index on `expires_at`.
+    `get` returns (value, seconds left) or None.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._index_ready = False
+
+    async def _ensure_index(self):
+        if not self._index_ready:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._index_ready = True
+
+    async def get(self, key: str):
+        await self._ensure_index()
+        entry = await self.collection.find_one({"_id": key})
+        if not entry:
+            return None
+        ttl_left = (entry["expires_at"].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+        if ttl_left <= 0:
+            return None
+        return entry["value"], ttl_left
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._ensure_index()
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        await self.collection.replace_one({"_id": key}, {"value": value, "expires_at": expires_at}, upsert=True)
+
+
+class LLMResponseCache:
+    """
+    Two-level cache for agent responses: an in-process LRU in front of an optional persistent backend.
+    Backend failures are logged and treated as misses so the cache never breaks an analysis.
+    """
+
+    def __init__(self, maxsize: int = 1024, default_ttl: float = 300, backend=None):
+        self.default_ttl = default_ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=default_ttl)
+        self.backend = backend
+
+    async def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None or self.backend is None:
+            return value
+
+        try:
+            entry = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache backend read failed: {e}")
+            return None
+        if entry is None:
+            return None
+
+        # The memory copy expires with the backend entry, not a full TTL after this read
+        value, ttl_left = entry
+        self.memory.set(key, value, ttl_left)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        self.memory.set(key, value, ttl)
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, value, ttl)
+            except Exception as e:
+                logger.warning(f"LLM cache backend write failed: {e}")
+
+
+_cache = None
+
+
+def _build_backend():
+    backend = config.LLM_CACHE_BACKEND.lower()
+    if backend == "disk":
+        return DiskCacheBackend(config.LLM_CACHE_DIR, max_entries=config.LLM_CACHE_DISK_MAX_ENTRIES)
+    if backend == "mongo":
+        from src.db.mongo_client import MongoDB
+        return MongoCacheBackend(MongoDB().db["llm_cache"])
+    return None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Returns the shared LLM response cache configured from settings."""
+    global _cache
+    if _cache is None:
+        _cache = LLMResponseCache(
+            maxsize=config.LLM_CACHE_MAX_ENTRIES,
+            default_ttl=config.LLM_CACHE_TTL,
+            backend=_build_backend(),
+        )
+        logger.info(f"LLM response cache enabled (backend: {config.LLM_CACHE_BACKEND})")
+    return _cache
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from src.config import config
+from src.utils.metrics import Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+LLM_ENGINE_STATE = registry.register(Gauge(
+    "swarm_llm_engine", "LLM engine concurrency, queue depth and latency statistics.", ("stat",)
+))
+
+
+class LLMEngine:
+    """Process-wide executor for Swarm agent runs with a shared client and a bounded concurrency limit."""
+
+    def __init__(self, max_concurrency: int = 8, max_connections: int = 20, transport: httpx.BaseTransport = None,
+                 timeout: float = 60.0):
+        # Deferred: openai and swarm are the slowest imports in the app and only needed once an agent runs
+        from openai import OpenAI
+        from swarm import Swarm
+
+        http_client = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+            transport=transport,
+        )
+        self.client = Swarm(client=OpenAI(api_key=config.OPENAI_API_KEY, http_client=http_client))
+        self._http_client = http_client
+        self._executor = self._create_executor(max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._condition = None
+        self._releases = set()
+        self._in_flight = 0
+        self._waiting = 0
+        self._stats = {"calls": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0, "max_queue_depth": 0}
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._max_concurrency
+
+    def set_max_concurrency(self, value: int):
+        """Changes the concurrency limit at runtime; waiting calls are released if the limit grows."""
+        if value < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        self._max_concurrency = value
+        old_executor = self._executor
+        self._executor = self._create_executor(value)
+        old_executor.shutdown(wait=False)
+        if self._condition is not None:
+            try:
+                asyncio.get_running_loop().create_task(self._notify_all())
+            except RuntimeError:
+                pass  # No running loop: waiters will re-check the limit on the next release
+
+    @staticmethod
+    def _create_executor(max_concurrency: int) -> ThreadPoolExecutor:
+        # One thread per slot: a slot is only released once its thread has finished the call
+        return ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+    async def _notify_all(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def _acquire(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        async with self._condition:
+            self._waiting += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._waiting)
+            try:
+                await self._condition.wait_for(lambda: self._in_flight < self._max_concurrency)
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+
+    async def _release(self):
+        async with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def _release_when_done(self, loop):
+        """Releases the slot from the executor thread once the call has finished (or was cancelled unstarted)."""
+        def release():
+            task = loop.create_task(self._release())
+            self._releases.add(task)
+            task.add_done_callback(self._releases.discard)
+
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            pass  # The loop is closed; nothing is waiting for the slot any more
+
+    async def run(self, agent, messages, context_variables=None, model_override=None, max_turns=5):
+        """
+        Runs a Swarm agent on the engine's executor once a concurrency slot is free. A caller that stops waiting
+        (the losing attempt of a hedged request, a timeout) does not stop the OpenAI call, so the slot is held
+        until the thread running it finishes.
+        """
+        await self._acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(
+                lambda: self.client.run(
+                    agent=agent,
+                    messages=messages,
+                    context_variables=context_variables or {},
+                    model_override=model_override,
+                    max_turns=max_turns,
+                )
+            )
+        except RuntimeError:  # Executor shut down by set_max_concurrency() or close()
+            await self._release()
+            raise
+        future.add_done_callback(lambda _: self._release_when_done(loop))
+
+        start_time = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            latency = time.perf_counter() - start_time
+            self._stats["calls"] += 1
+            self._stats["total_latency"] += latency
+            self._stats["max_latency"] = max(self._stats["max_latency"], latency)
+
+    def has_capacity(self) -> bool:
+        """Whether a call would start right away instead of queueing for a slot."""
+        return self._in_flight < self._max_concurrency and self._waiting == 0
+
+    def metrics(self) -> dict:
+        """Returns queue depth, in-flight count and latency statistics for the engine."""
+        calls = self._stats["calls"]
+        return {
+            "max_concurrency": self._max_concurrency,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "max_queue_depth": self._stats["max_queue_depth"],
+            "calls": calls,
+            "errors": self._stats["errors"],
+            "avg_latency": round(self._stats["total_latency"] / calls, 3) if calls else 0.0,
+            "max_latency": round(self._stats["max_latency"], 3),
+        }
+
+    def close(self):
+        """Stops the executor and closes pooled HTTP connections."""
+        self._executor.shutdown(wait=False)
+        self._http_client.close()
+
+
+_engine = None
+
+
+def get_llm_engine() -> LLMEngine:
+    """Returns the shared LLM engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = LLMEngine(
+            max_concurrency=config.LLM_MAX_CONCURRENCY,
+            max_connections=config.LLM_MAX_CONNECTIONS,
+            timeout=config.LLM_TIMEOUT,
+        )
+        logger.info(f"LLM engine started with max concurrency {config.LLM_MAX_CONCURRENCY}")
+    return _engine
+
+
+def configure_llm_engine(**kwargs) -> LLMEngine:
+    """Replaces the shared LLM engine, e.g. to change limits or route requests through a fake transport."""
+    global _engine
+    close_llm_engine()
+    kwargs.setdefault("max_concurrency", config.LLM_MAX_CONCURRENCY)
+    kwargs.setdefault("max_connections", config.LLM_MAX_CONNECTIONS)
+    kwargs.setdefault("timeout", config.LLM_TIMEOUT)
+    _engine = LLMEngine(**kwargs)
+    return _engine
+
+
+def _collect_engine_metrics():
+    if _engine is not None:
+        for stat, value in _engine.metrics().items():
+            LLM_ENGINE_STATE.set(value, stat=stat)
+
+
+registry.add_collector(_collect_engine_metrics)
+
+
+def close_llm_engine():
+    """Shuts down the shared LLM engine if it was started."""
+    global _engine
+    if _engine is not None:
+        _engine.close()
+        _engine = None
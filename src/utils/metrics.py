@@ -0,0 +1,199 @@
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+
+from src.config import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(labelnames, values) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(labelnames, values)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> list:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        state["counts"][bisect.bisect_left(self.buckets, value)] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+    def render(self) -> list:
+        lines = self.header()
+        bucket_labels = self.labelnames + ("le",)
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {round(state['sum'], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, func):
+        """Registers a callable that refreshes gauges right before every scrape."""
+        self._collectors.append(func)
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+SPAN_SECONDS = registry.register(Histogram(
+    "swarm_span_duration_seconds", "Duration of pipeline stages and external calls.", ("span", "target")
+))
+SPANS_IN_FLIGHT = registry.register(Gauge(
+    "swarm_span_in_flight", "Pipeline stages and external calls currently running.", ("span", "target")
+))
+SPAN_ERRORS = registry.register(Counter(
+    "swarm_span_errors_total", "Pipeline stages and external calls that raised an error.", ("span", "target")
+))
+LLM_CALLS = registry.register(Counter(
+    "swarm_llm_calls_total", "Agent LLM requests by outcome.", ("agent", "outcome")
+))
+LLM_HEDGES = registry.register(Counter(
+    "swarm_llm_hedged_requests_total", "Duplicate LLM requests sent because the first one was slow.", ("agent",)
+))
+LLM_TOKENS = registry.register(Counter(
+    "swarm_llm_estimated_tokens_total", "Estimated prompt and completion tokens sent to or received from the LLM.",
+    ("agent", "kind")
+))
+
+_tracer = None
+
+
+def setup_tracing():
+    """Enables the optional OpenTelemetry exporter when OTEL_ENABLED is set and the SDK is installed."""
+    global _tracer
+    if not config.OTEL_ENABLED or _tracer is not None:
+        return
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_ENABLED is set but the opentelemetry SDK / OTLP exporter is not installed.")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "swarm-crypto-analysis"}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=config.OTEL_EXPORTER_ENDPOINT)))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+    logger.info(f"OpenTelemetry tracing exports to {config.OTEL_EXPORTER_ENDPOINT}")
+
+
+@contextmanager
+def span(name: str, target: str = ""):
+    """
+    Times a block as a span: records its latency histogram, in-flight gauge and error counter,
+    and mirrors it to OpenTelemetry when tracing is enabled. Works in sync and async code.
+    """
+    SPANS_IN_FLIGHT.inc(span=name, target=target)
+    otel_span = _tracer.start_as_current_span(name, attributes={"target": target}) if _tracer else None
+    if otel_span is not None:
+        otel_span.__enter__()
+
+    start_time = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        SPAN_ERRORS.inc(span=name, target=target)
+        raise
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - start_time, span=name, target=target)
+        SPANS_IN_FLIGHT.dec(span=name, target=target)
+        if otel_span is not None:
+            otel_span.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+
+from src.utils.metrics import span
+from src.utils.resilience import DeadlineExceeded, deadline, within_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """Runs named async stages concurrently, starting each one as soon as its dependencies finish."""
+
+    def __init__(self):
+        self._stages = {}
+        self.results = {}
+        self.timings = {}
+
+    def add(self, name: str, func, deps=(), timeout: float = None):
+        """
+        Registers a stage. `func` is a zero-argument coroutine function; `deps` are names of earlier stages.
+        A stage with a `timeout` is cancelled once it runs that long (or the run's deadline passes) and
+        stores DeadlineExceeded as its result.
+        """
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' is already registered.")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+
+        self._stages[name] = (func, tuple(deps), timeout)
+        return name
+
+    async def run(self) -> dict:
+        """
+        Executes every stage and returns a mapping of stage name to result.
+        A failing stage stores its exception as the result; dependents still run so they can degrade gracefully.
+        """
+        tasks = {}
+
+        async def run_stage(name, func, deps, timeout):
+            if deps:
+                await asyncio.wait([tasks[dep] for dep in deps])
+
+            start_time = time.perf_counter()
+            try:
+                with span("stage", target=name.split(":", 1)[0]):
+                    if timeout is None:
+                        result = await func()
+                    else:
+                        with deadline(timeout):
+                            result = await within_deadline(func())
+            except DeadlineExceeded as e:
+                logger.warning(f"Stage '{name}' ran out of time and was cancelled")
+                result = e
+            except Exception as e:
+                logger.error(f"Stage '{name}' failed: {e}", exc_info=True)
+                result = e
+            finally:
+                self.timings[name] = round(time.perf_counter() - start_time, 3)
+
+            self.results[name] = result
+            return result
+
+        for name, (func, deps, timeout) in self._stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, func, deps, timeout), name=name)
+
+        await asyncio.gather(*tasks.values())
+        return self.results
+
+    def timing_summary(self) -> dict:
+        """Aggregates stage timings by prefix (e.g. all 'moralis:*' stages) as count / max / total seconds."""
+        summary = {}
+        for name, duration in self.timings.items():
+            group = name.split(":", 1)[0]
+            stats = summary.setdefault(group, {"count": 0, "max": 0.0, "total": 0.0})
+            stats["count"] += 1
+            stats["max"] = max(stats["max"], duration)
+            stats["total"] = round(stats["total"] + duration, 3)
+        return summary
+
+
+def token_key(token) -> str:
+    """Stable identifier of a token within a run: chain and contract address, falling back to the symbol."""
+    address = str(token.tokenAddress or "").lower()
+    return f"{token.chainId}:{address or token.symbol}"
+
+
+class PipelineContext:
+    """
+    Shared state of one analysis run. Stages record the artifacts they produced per token so later
+    stages reuse them instead of recomputing, and the run's report is persisted exactly once.
+    """
+
+    def __init__(self, tokens: list, run_id: str = None, stream=None, report_writer=None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.tokens = tokens
+        self.stream = stream
+        self.report_writer = report_writer
+        self.created_at = datetime.now(timezone.utc)
+        self._produced = {}
+        self.report_id = None
+        self._report_saved = False
+        self._save_lock = asyncio.Lock()
+
+    def mark(self, stage: str, token, value=None):
+        """Records that `stage` has produced its artifact for `token` and pushes it to the run's stream, if any."""
+        key = token_key(token)
+        self._produced.setdefault(stage, set()).add(key)
+        if self.stream is not None and value is not None:
+            self.stream.publish(stage, {"token": key, "symbol": token.symbol, "value": value})
+
+    def has(self, stage: str, token) -> bool:
+        return token_key(token) in self._produced.get(stage, ())
+
+    async def save_report(self, db, report: dict = None):
+        """
+        Persists the run's report once; later calls are no-ops and return the stored report id.
+        A failed save (no id returned) is retried by the next call.
+        A `report_writer` given to the context (e.g. a bulk-insert buffer) takes the place of `db`.
+        """
+        async with self._save_lock:
+            if self._report_saved:
+                return self.report_id
+
+            report = report or {"date": self.created_at, "tokens": self.tokens}
+            report.setdefault("run_id", self.run_id)
+            self.report_id = await (self.report_writer or db).save_report(report)
+            self._report_saved = self.report_id is not None
+            return self.report_id
@@ -0,0 +1,142 @@
+import math
+import re
+
+from src.config import config
+
+_SUFFIXES = ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for English prompts (~4 characters per token)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def format_number(value, sig_figs: int = None, default: str = "No data") -> str:
+    """
+    Renders a number with a few significant figures and a K/M/B/T suffix for large magnitudes:
+    1234567890.123 -> '1.235B', 0.000012345678 -> '0.00001235'. Non-numeric values are returned as text.
+    """
+    sig_figs = sig_figs or config.PROMPT_SIG_FIGS
+    if value is None or value == "":
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if not math.isfinite(number):
+        return str(value)
+    if number == 0:
+        return "0"
+
+    suffix = ""
+    for threshold, letter in _SUFFIXES:
+        if abs(number) >= threshold:
+            number, suffix = number / threshold, letter
+            break
+    text = f"{number:.{sig_figs}g}"
+    return (_plain(number, sig_figs) if "e" in text else text) + suffix
+
+
+def _plain(number: float, sig_figs: int) -> str:
+    # Small prices: fixed-point instead of scientific notation, which models read less reliably
+    decimals = max(0, sig_figs - int(math.floor(math.log10(abs(number)))) - 1)
+    text = f"{number:.{decimals}f}"
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def format_value(value, sig_figs: int = None, default: str = "No data") -> str:
+    """Like `format_number`, but also compacts dicts and lists of numbers (e.g. MACD or Bollinger band values)."""
+    if isinstance(value, dict):
+        return ", ".join(f"{key}={format_value(item, sig_figs, default)}" for key, item in value.items()) or default
+    if isinstance(value, (list, tuple)):
+        return ", ".join(format_value(item, sig_figs, default) for item in value) or default
+    return format_number(value, sig_figs, default)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text at a word boundary so that it stays within roughly `max_tokens` tokens."""
+    text = " ".join(str(text or "").split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * 4 - 1)]
+    return (cut.rsplit(" ", 1)[0] if " " in cut else cut) + "…"
+
+
+def _fingerprint(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(text or "").lower()).strip()
+
+
+def _strip_title(description: str, title: str) -> str:
+    """
+    Removes `title` from the start of `description` when it repeats it up to case, spacing and punctuation.
+    The cut is located in the raw description, so a differently punctuated repeat leaves no fragment behind.
+    """
+    wanted = re.sub(r"[^a-z0-9]+", "", title.lower())
+    matched = 0
+    for index, char in enumerate(description):
+        letters = re.sub(r"[^a-z0-9]+", "", char.lower())
+        if wanted[matched:matched + len(letters)] != letters:
+            return description
+        matched += len(letters)
+        if wanted and matched == len(wanted):
+            rest = description[index + 1:]
+            if re.match(r"[a-z0-9]", rest[:1].lower()):  # The title ends mid-word: not a repeat
+                return description
+            return rest.strip(" .:-–—|")
+    return description
+
+
+def article_id(article: dict) -> str:
+    """Identity of an article across fetches: its URL, or its normalized title when it has none."""
+    return article.get("url") or _fingerprint(article.get("title"))
+
+
+def dedupe_articles(articles: list) -> list:
+    """Drops articles that repeat an earlier URL or title (syndicated copies of the same story)."""
+    seen, unique = set(), []
+    for article in articles:
+        keys = {key for key in (article.get("url"), _fingerprint(article.get("title"))) if key}
+        if keys & seen:
+            continue
+        seen |= keys
+        unique.append(article)
+    return unique
+
+
+def fit_articles(articles: list, budget_tokens: int = None, per_article_tokens: int = None) -> list:
+    """
+    Deduplicates articles and renders them as compact 'Title: description' entries, each capped at
+    `per_article_tokens`, until the total `budget_tokens` is used up.
+    """
+    budget_tokens = budget_tokens or config.NEWS_PROMPT_TOKEN_BUDGET
+    per_article_tokens = per_article_tokens or config.NEWS_ARTICLE_MAX_TOKENS
+
+    entries, used = [], 0
+    for article in dedupe_articles(articles):
+        title = " ".join(str(article.get("title") or "No title").split())
+        description = " ".join(str(article.get("description") or "").split())
+        description = _strip_title(description, title)
+        entry = truncate_to_tokens(f"{title}: {description}" if description else title, per_article_tokens)
+
+        size = estimate_tokens(entry)
+        if entries and used + size > budget_tokens:
+            break
+        entries.append(entry)
+        used += size
+    return entries
+
+
+class clip:
+    """
+    Lazily rendered, size-capped log argument: `logger.debug("Prompt: %s", clip(prompt))` does no
+    formatting at all unless the record is emitted, and then at most `limit` characters.
+    """
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit: int = None):
+        self.value = value
+        self.limit = limit or config.LOG_PAYLOAD_MAX_CHARS
+
+    def __str__(self):
+        text = str(self.value)
+        return text if len(text) <= self.limit else f"{text[:self.limit]}… (+{len(text) - self.limit} chars)"
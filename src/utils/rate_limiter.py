@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: allows `rate` acquisitions per `period` seconds with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, period: float = 1.0, capacity: float = None):
+        if rate <= 0 or period <= 0:
+            raise ValueError("rate and period must be positive.")
+        self.fill_rate = rate / period
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.fill_rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Consumes `tokens` if they are available right now; never waits."""
+        self._refill()
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+    async def acquire(self, tokens: float = 1):
+        """Waits until `tokens` are available and consumes them. Waiters are served in FIFO order."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.fill_rate)
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from src.config import config
+from src.utils.metrics import Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_STATE = registry.register(Gauge(
+    "swarm_circuit_state", "Upstream circuit breaker state (0 closed, 1 half-open, 2 open).", ("upstream",)
+))
+
+# Absolute `time.monotonic()` by which the current pipeline run (or stage) has to finish, if any
+_deadline = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The run's (or stage's) time budget is spent."""
+
+
+@contextmanager
+def deadline(seconds: float = None):
+    """
+    Bounds the enclosed block, and every task it starts, to `seconds`. Nested deadlines can only shorten the
+    enclosing one. Upstream and LLM calls size their timeouts from it via `timeout_for` / `within_deadline`.
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    current = _deadline.get()
+    target = time.monotonic() + seconds
+    token = _deadline.set(target if current is None else min(current, target))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left until the current deadline, or None without one."""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def timeout_for(default: float) -> float:
+    """The tighter of `default` and the time left; raises DeadlineExceeded if nothing is left."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the call was made.")
+    return min(default, left)
+
+
+async def within_deadline(awaitable, timeout: float = None):
+    """
+    Awaits with the tighter of `timeout` and the current deadline. Raises DeadlineExceeded when the
+    deadline was the limit and TimeoutError when `timeout` was, so callers can tell a slow upstream apart.
+    """
+    left = remaining()
+    bound_by_deadline = left is not None and (timeout is None or left < timeout)
+    if bound_by_deadline and left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Deadline exceeded before the call was made.")
+    try:
+        return await asyncio.wait_for(awaitable, left if bound_by_deadline else timeout)
+    except TimeoutError:
+        if bound_by_deadline:
+            raise DeadlineExceeded("Deadline exceeded.") from None
+        raise
+
+
+class CircuitBreaker:
+    """
+    Fails calls to an upstream fast after `failure_threshold` consecutive failures. After `reset_timeout`
+    seconds one trial call is let through (half-open): its success closes the circuit, a failure reopens it.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._changed_at = time.monotonic()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; moves an open circuit to half-open once `reset_timeout` has passed."""
+        if self.state == self.CLOSED:
+            return True
+        # Half-open admits one trial per `reset_timeout`, so a trial that never reports back does not wedge it
+        if time.monotonic() - self._changed_at < self.reset_timeout:
+            return False
+        self._set_state(self.HALF_OPEN)
+        logger.info(f"Circuit for {self.name} is half-open, sending a trial request")
+        return True
+
+    def record_success(self):
+        self._failures = 0
+        if self.state != self.CLOSED:
+            logger.info(f"✅ Circuit for {self.name} closed again")
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+            logger.warning(
+                f"⚠️ Circuit for {self.name} opened after {self._failures} failures; failing fast for {self.reset_timeout}s"
+            )
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._changed_at = time.monotonic()
+
+
+_breakers = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Returns the process-wide circuit breaker of an upstream (moralis, taapi, news, binance, openai)."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name, failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD, reset_timeout=config.CIRCUIT_RESET_SECONDS
+        )
+    return breaker
+
+
+def _collect_circuit_states():
+    levels = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+    for name, breaker in _breakers.items():
+        CIRCUIT_STATE.set(levels[breaker.state], upstream=name)
+
+
+registry.add_collector(_collect_circuit_states)
+
+
+class LatencyTracker:
+    """Latencies of the most recent calls, for deriving percentile-based hedge delays."""
+
+    def __init__(self, maxlen: int = 200):
+        self._samples = deque(maxlen=maxlen)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self._samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+async def hedged(call, delay: float = None, should_hedge=None, on_hedge=None):
+    """
+    Runs `call()` and, if it has not finished after `delay` seconds, starts one duplicate (when
+    `should_hedge()` allows). Returns whichever attempt succeeds first and cancels the other;
+    a failed attempt leaves the other one running.
+    """
+    if delay is None:
+        return await call()
+
+    pending = {asyncio.ensure_future(call())}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if not done and (should_hedge is None or should_hedge()):
+            if on_hedge is not None:
+                on_hedge()
+            pending.add(asyncio.ensure_future(call()))
+
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+
+from src.models.token_record import TokenRecord
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used without it
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, TokenRecord):
+        return value.to_dict()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)  # ObjectId and other BSON types
+
+
+def dumps(value) -> bytes:
+    """Serializes API payloads to JSON bytes: orjson when installed, else the stdlib encoder."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def to_document(value):
+    """
+    Converts token records (also inside lists and dicts) to plain dicts for Mongo writes and job payloads.
+    Only containers are rebuilt; scalars and datetimes are passed through for BSON to encode natively.
+    """
+    if isinstance(value, TokenRecord):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: to_document(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_document(item) for item in value]
+    return value
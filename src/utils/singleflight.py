@@ -0,0 +1,45 @@
+import asyncio
+from functools import partial
+
+from src.utils.cache import TTLCache
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution whose result every caller shares.
+    With `memo_ttl` > 0, successful results are also served to repeat calls for that many seconds.
+    """
+
+    def __init__(self, memo_ttl: float = 0, maxsize: int = 1024):
+        self._inflight = {}
+        self._memo = TTLCache(maxsize=maxsize, ttl=memo_ttl) if memo_ttl > 0 else None
+
+    async def do(self, key, func):
+        """Returns the memoized or in-flight result for `key`, or starts `func()` and shares its result."""
+        if self._memo is not None:
+            value = self._memo.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(partial(self._finished, key))
+
+        # Shield so one caller's cancellation does not cancel the shared call for everyone else
+        return await asyncio.shield(future)
+
+    def in_flight(self, key) -> bool:
+        return key in self._inflight
+
+    def forget(self, key):
+        if self._memo is not None:
+            self._memo.pop(key)
+
+    def _finished(self, key, future):
+        self._inflight.pop(key, None)
+        if self._memo is not None and not future.cancelled() and future.exception() is None:
+            self._memo.set(key, future.result())
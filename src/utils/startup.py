@@ -0,0 +1,69 @@
+"""
+Process startup helpers: the single logging setup shared by every entry point, and an import-time profile.
+
+    python -m src.utils.startup                 # profile `import src.api`
+    python -m src.utils.startup src.main --top 30
+"""
+import argparse
+import logging
+import subprocess
+import sys
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_logging_configured = False
+
+
+def setup_logging(level: str = None):
+    """Configures root logging once per process; entry points call this instead of `logging.basicConfig`."""
+    global _logging_configured
+    if _logging_configured:
+        return
+
+    if level is None:
+        from src.config import config
+        level = config.LOG_LEVEL
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+    _logging_configured = True
+
+
+def profile_imports(module: str = "src.api") -> list:
+    """
+    Imports `module` in a fresh interpreter with `-X importtime` and returns
+    (cumulative_seconds, self_seconds, module_name) rows, slowest first.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name[1:].rstrip()))
+    return sorted(rows, reverse=True)
+
+
+def format_profile(rows: list, top: int = 25) -> str:
+    total = sum(cumulative for cumulative, _, name in rows if not name.startswith(" "))
+    lines = [f"{'cumulative':>11} {'self':>9}  module", f"{total:>10.3f}s {'':>9}  (total)"]
+    for cumulative, self_time, name in rows[:top]:
+        lines.append(f"{cumulative:>10.3f}s {self_time:>8.3f}s  {name}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report which imports dominate cold-start time.")
+    parser.add_argument("module", nargs="?", default="src.api")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args(argv)
+    print(format_profile(profile_imports(args.module), args.top))
+
+
+if __name__ == "__main__":
+    main()
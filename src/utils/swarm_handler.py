@@ -1,19 +1,48 @@
-import asyncio
 import logging
-from swarm import Swarm, Agent
+import time
+from src.config import config
+from src.utils.llm_engine import get_llm_engine
+from src.utils.prompt_budget import clip, estimate_tokens
+from src.utils.metrics import LLM_CALLS, LLM_HEDGES, LLM_TOKENS, span
+from src.utils.llm_cache import get_llm_cache, make_cache_key
+from src.utils.resilience import DeadlineExceeded, LatencyTracker, get_breaker, hedged, within_deadline
 
-logging.basicConfig(
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+# Recent LLM latencies per agent; their percentile decides when a slow request is hedged
+_latencies = {}
+
 class SwarmHandler:
-    def __init__(self, agent_name: str, instructions: str, model_override=None):
-        """Initializes SwarmHandler with an optional model override."""
-        self.client = Swarm()
-        self.agent = Agent(name=agent_name, instructions=instructions)
+    ERROR_REPLY = "Analysis error, data unavailable."
+
+    def __init__(self, agent_name: str, instructions: str, model_override=None, cache_ttl=None, functions=None,
+                 hedge: bool = True):
+        """
+        Initializes SwarmHandler with an optional model override. The Swarm client is shared via the LLM engine.
+        Responses are cached for `cache_ttl` seconds (settings default if None, disabled if 0).
+        `functions` are exposed to the model as callable tools; pass `hedge=False` if they must not run twice.
+        """
+        self.name = agent_name
+        self.instructions = instructions
+        self.functions = functions or []
+        self.cache = get_llm_cache()
         self.model_override = model_override
+        self.cache_ttl = cache_ttl
+        self.hedge = hedge
+        self._agent = None
+
+    @property
+    def agent(self):
+        """The Swarm agent, built on the first LLM call: swarm pulls in the whole openai package."""
+        if self._agent is None:
+            from swarm import Agent
+
+            self._agent = Agent(name=self.name, instructions=self.instructions, functions=self.functions)
+        return self._agent
+
+    @property
+    def engine(self):
+        return get_llm_engine()
 
     async def run(self, prompt: str, context_variables=None):
         """Executes the agent with a given prompt, context variables, and model override."""
@@ -21,24 +50,80 @@ class SwarmHandler:
             if context_variables is None:
                 context_variables = {}
 
-            logger.info(f"Executing Swarm agent: {self.agent.name}")
+            cache_key = None
+            if self.cache_ttl != 0 and not context_variables:
+                cache_key = make_cache_key(self.name, self.instructions, self.model_override, prompt)
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Using cached response for Swarm agent: {self.name}")
+                    LLM_CALLS.inc(agent=self.name, outcome="cached")
+                    return cached
 
-            response = await asyncio.to_thread(
-                lambda: self.client.run(
-                    agent=self.agent,
-                    messages=[{"role": "user", "content": prompt}],
-                    context_variables=context_variables,
-                    model_override=self.model_override,
-                    max_turns=5
-                )
-            )
+            breaker = get_breaker("openai")
+            if not breaker.allow():
+                logger.warning(f"OpenAI circuit is open, skipping Swarm agent: {self.name}")
+                LLM_CALLS.inc(agent=self.name, outcome="rejected")
+                return self.ERROR_REPLY
+
+            logger.info(f"Executing Swarm agent: {self.name}")
+
+            hedge_delay = self._hedge_delay()
+            with span("llm", target=self.name):
+                try:
+                    response = await within_deadline(
+                        hedged(
+                            lambda: self._attempt(prompt, context_variables),
+                            hedge_delay,
+                            should_hedge=self.engine.has_capacity,
+                            on_hedge=lambda: LLM_HEDGES.inc(agent=self.name),
+                        ),
+                        config.LLM_TIMEOUT,
+                    )
+                except DeadlineExceeded:
+                    raise  # The run is out of time; that says nothing about the provider
+                except Exception:
+                    breaker.record_failure()
+                    raise
+            breaker.record_success()
 
             last_message = response.messages[-1]["content"]
-            logger.info(f"Swarm agent response: {last_message[:500]}...")  # Ограничение логов
+            LLM_CALLS.inc(agent=self.name, outcome="ok")
+            LLM_TOKENS.inc(estimate_tokens(self.instructions) + estimate_tokens(prompt), agent=self.name, kind="prompt")
+            LLM_TOKENS.inc(estimate_tokens(last_message), agent=self.name, kind="completion")
+            logger.debug("Swarm agent response: %s", clip(last_message))  # Ограничение логов
+
+            if cache_key and last_message:
+                await self.cache.set(cache_key, last_message, self.cache_ttl)
             return last_message
+        except DeadlineExceeded:
+            logger.warning(f"No time left in this run for Swarm agent: {self.name}")
+            LLM_CALLS.inc(agent=self.name, outcome="deadline")
+            return self.ERROR_REPLY
         except Exception as e:
-            logger.error(f"Swarm execution error for {self.agent.name}: {e}", exc_info=True)
-            return "Analysis error, data unavailable."
+            logger.error(f"Swarm execution error for {self.name}: {e}", exc_info=True)
+            LLM_CALLS.inc(agent=self.name, outcome="error")
+            return self.ERROR_REPLY
+
+    async def _attempt(self, prompt: str, context_variables: dict):
+        start_time = time.perf_counter()
+        response = await self.engine.run(
+            agent=self.agent,
+            messages=[{"role": "user", "content": prompt}],
+            context_variables=context_variables,
+            model_override=self.model_override,
+            max_turns=5
+        )
+        _latencies.setdefault(self.name, LatencyTracker()).record(time.perf_counter() - start_time)
+        return response
+
+    def _hedge_delay(self):
+        """Seconds after which a duplicate request is sent: the agent's recent latency percentile, clamped."""
+        if not config.LLM_HEDGE_ENABLED or not self.hedge:
+            return None
+        tracker = _latencies.get(self.name)
+        if tracker is None or len(tracker) < config.LLM_HEDGE_MIN_SAMPLES:
+            return config.LLM_HEDGE_MAX_DELAY
+        return min(config.LLM_HEDGE_MAX_DELAY, max(config.LLM_HEDGE_MIN_DELAY, tracker.percentile(config.LLM_HEDGE_PERCENTILE)))
 
 
 
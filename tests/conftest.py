@@ -0,0 +1,6 @@
+import os
+
+# Settings are validated on first use; the tests never reach the services behind them
+for name in ("TAAPI_KEY", "NEWS_API_KEY", "MORALIS_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
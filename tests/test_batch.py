@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+from benchmarks.fakes import FakeMongoClient
+from src.main import Checkpoint, ReportBuffer
+
+
+def test_checkpoint_resumes_only_for_the_same_source(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    Checkpoint(path, "watchlist.txt", resume=False).add(["BTC", "ETH"])
+
+    assert Checkpoint(path, "watchlist.txt", resume=True).done == {"BTC", "ETH"}
+    assert Checkpoint(path, "other.txt", resume=True).done == set()
+    assert Checkpoint(path, "watchlist.txt", resume=False).done == set()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"source": "watchlist.txt", "done": ["BTC", "ETH"]}
+
+
+def test_report_buffer_retries_unsaved_reports_and_checkpoints_the_rest(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.db.mongo_client._client", FakeMongoClient())
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"), "watchlist.txt", resume=False)
+    buffer = ReportBuffer(checkpoint, flush_size=2, retry_delay=0)
+    attempts = []
+
+    async def save_reports(reports):
+        attempts.append([report["run_id"] for report in reports])
+        if len(attempts) == 1:  # First flush: the run-b report hits a write error
+            return [report["_id"] for report in reports if report["run_id"] != "run-b"]
+        return [report["_id"] for report in reports]
+
+    buffer.db.save_reports = save_reports
+
+    async def scenario():
+        for run_id, entries in (("run-a", ["BTC"]), ("run-b", ["ETH", "SOL"])):
+            await buffer.save_report({"run_id": run_id, "tokens": []})
+            await buffer.complete(run_id, entries)
+        assert checkpoint.done == {"BTC"} and buffer.pending == 1
+        return await buffer.close()
+
+    assert asyncio.run(scenario()) == 0
+    assert attempts == [["run-a", "run-b"], ["run-b"]]
+    assert checkpoint.done == {"BTC", "ETH", "SOL"}
+    assert buffer.stored == 2
@@ -0,0 +1,52 @@
+from src.models.token_record import TokenRecord
+from src.utils.change_detection import changed_fields, decision_inputs, moralis_inputs, taapi_inputs
+
+
+def test_price_moves_within_tolerance_are_not_changes():
+    previous = {"usdPrice": 100.0, "marketCap": 1e9, "priceChange24h": 2.0, "volume24h": 5e6, "securityScore": 80}
+    current = {"usdPrice": 100.5, "marketCap": 1.005e9, "priceChange24h": 2.5, "volume24h": 5.2e6, "securityScore": 80}
+    assert changed_fields("moralis", previous, current) == []
+
+
+def test_price_moves_beyond_tolerance_are_changes():
+    previous = {"usdPrice": 100.0, "volume24h": 5e6, "securityScore": 80}
+    current = {"usdPrice": 102.0, "volume24h": 6e6, "securityScore": 70}
+    assert changed_fields("moralis", previous, current) == ["securityScore", "usdPrice", "volume24h"]
+
+
+def test_new_articles_are_changes_but_dropped_ones_are_not():
+    previous = {"articles": ["a", "b"]}
+    assert changed_fields("news", previous, {"articles": ["a"]}) == []
+    assert changed_fields("news", previous, {"articles": ["a", "c"]}) == ["articles"]
+
+
+def test_indicators_are_flattened_and_compared_with_relative_tolerance():
+    previous = taapi_inputs({"rsi": 50.0, "macd": {"valueMACD": 1.0, "valueMACDSignal": 0.5}})
+    assert previous == {"rsi": 50.0, "macd.valueMACD": 1.0, "macd.valueMACDSignal": 0.5}
+
+    nudged = taapi_inputs({"rsi": 50.5, "macd": {"valueMACD": 1.01, "valueMACDSignal": 0.5}})
+    assert changed_fields("taapi", previous, nudged) == []
+
+    moved = taapi_inputs({"rsi": 60.0, "macd": {"valueMACD": 1.0, "valueMACDSignal": 0.5}})
+    assert changed_fields("taapi", previous, moved) == ["rsi"]
+
+
+def test_missing_and_non_numeric_values_must_match_exactly():
+    assert changed_fields("taapi", {"rsi": None}, {"rsi": 50.0}) == ["rsi"]
+    assert changed_fields("moralis", {"usdPrice": 1.0}, {}) == ["usdPrice"]
+
+
+def test_decision_inputs_change_with_any_stage_output():
+    token = TokenRecord(symbol="BTC", analysis="bullish", taapi_analysis="overbought", news_summary="ETF inflows")
+    before = decision_inputs(token)
+    assert decision_inputs(token) == before
+
+    token.news_summary = "ETF outflows"
+    assert decision_inputs(token) != before
+
+
+def test_moralis_inputs_use_prompted_market_fields():
+    token = TokenRecord(symbol="BTC", usdPrice=1.0, marketCap=2.0, priceChange24h=3.0, volume24h=4.0, securityScore=5)
+    assert moralis_inputs(token) == {
+        "usdPrice": 1.0, "marketCap": 2.0, "priceChange24h": 3.0, "volume24h": 4.0, "securityScore": 5,
+    }
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from src.db.decision_store import DecisionStore
+
+ADDRESS = "0x" + "ab" * 20
+
+
+class FakeDecisions:
+    def __init__(self, documents: dict):
+        self.documents = documents
+        self.queries = 0
+
+    async def fetch_latest_decisions(self, tokens: list) -> dict:
+        self.queries += 1
+        return {key: self.documents[key] for key in tokens if key in self.documents}
+
+
+def decision_document(age_seconds: float, source: str = "model") -> dict:
+    return {
+        "chain": "0x1", "address": ADDRESS, "symbol": "BTC", "decision": "BUY", "source": source,
+        "date": datetime.now(timezone.utc) - timedelta(seconds=age_seconds),
+    }
+
+
+def test_fresh_decision_is_cached_and_not_refreshed():
+    scheduled = []
+
+    async def on_stale(keys):
+        scheduled.append(keys)
+        return "job"
+
+    async def scenario():
+        db = FakeDecisions({("0x1", ADDRESS): decision_document(10)})
+        store = DecisionStore(db, on_stale=on_stale, fresh_seconds=3600)
+        first = await store.get("0x1", ADDRESS.upper().replace("0X", "0x"))
+        second = await store.get("0x1", ADDRESS)
+        await store.refresh_stale()
+        return db, first, second
+
+    db, first, second = asyncio.run(scenario())
+    assert first == second and first["decision"] == "BUY" and not first["stale"]
+    assert db.queries == 1
+    assert scheduled == []
+
+
+def test_stale_reads_are_refreshed_afterwards_in_batches():
+    scheduled = []
+
+    async def on_stale(keys):
+        scheduled.append(keys)
+        return f"job-{len(scheduled)}"
+
+    async def scenario():
+        addresses = [f"0x{index:040x}" for index in range(5)]
+        db = FakeDecisions({("0x1", address): {**decision_document(7200), "address": address} for address in addresses})
+        store = DecisionStore(db, on_stale=on_stale, batch_size=2)
+        results = await store.get_many([("0x1", address) for address in addresses])
+        assert scheduled == []  # Nothing is queued while the read is served
+        await store.refresh_stale()
+        await store.get_many([("0x1", address) for address in addresses])
+        await store.refresh_stale()
+        return addresses, results
+
+    addresses, results = asyncio.run(scenario())
+    assert all(result["stale"] and result["refreshing"] for result in results.values())
+    assert scheduled == [[("0x1", address) for address in addresses[start:start + 2]] for start in (0, 2, 4)]
+
+
+def test_refresh_cooldown_survives_invalidation_and_failures():
+    scheduled = []
+
+    async def on_stale(keys):
+        scheduled.append(keys)
+        raise RuntimeError("queue is full")
+
+    async def scenario():
+        db = FakeDecisions({("0x1", ADDRESS): decision_document(10, source="default")})
+        store = DecisionStore(db, on_stale=on_stale, refresh_cooldown=60)
+        first = await store.get("0x1", ADDRESS)
+        await store.refresh_stale()
+        store.invalidate("0x1", ADDRESS)  # A finished refresh job drops only the cached decision
+        second = await store.get("0x1", ADDRESS)
+        await store.refresh_stale()
+        missing = [await store.schedule_refresh("0x1", "0x" + "cd" * 20) for _ in range(2)]
+        return db, first, second, missing
+
+    db, first, second, missing = asyncio.run(scenario())
+    assert first["stale"] and first["refreshing"]
+    assert second["refreshing"]
+    assert db.queries == 2
+    assert missing == [None, None]
+    assert scheduled == [[("0x1", ADDRESS)], [("0x1", "0x" + "cd" * 20)]]
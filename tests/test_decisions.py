@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pytest
+
+from benchmarks.fakes import FakeMongoClient
+from src.agents.orchestrator_agent import OrchestratorAgent
+from src.config import config
+from src.models.token_record import TokenRecord
+from src.utils.decision_parser import extract_decisions, normalize_decision
+from src.utils.pipeline import token_key
+from src.utils.prompt_budget import estimate_tokens
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("buy", "BUY"),
+    ("AVOID - high risk", "AVOID"),
+    ({"decision": "Hold"}, "HOLD"),
+    ({"recommendation": "buy now"}, "BUY"),
+    ("maybe", None),
+    (None, None),
+])
+def test_normalize_decision(raw, expected):
+    assert normalize_decision(raw) == expected
+
+
+def test_extracts_json_wrapped_in_fences_and_prose():
+    reply = 'Here you go:\n```json\n{"BTC": {"decision": "BUY"}, "ETH": "hold"}\n```\nGood luck.'
+    assert extract_decisions(reply, ["BTC", "ETH"]) == {"BTC": "BUY", "ETH": "HOLD"}
+
+
+def test_extracts_plain_lines_and_ignores_unknown_symbols():
+    reply = "BTC: AVOID\nDOGE: BUY\neth - Hold"
+    assert extract_decisions(reply, ["BTC", "ETH"]) == {"BTC": "AVOID", "ETH": "HOLD"}
+
+
+def test_partial_reply_keeps_the_decisions_it_has():
+    reply = '{"BTC": "BUY", "ETH": "HO'
+    assert extract_decisions(reply, ["BTC", "ETH"]) == {"BTC": "BUY"}
+
+
+@pytest.fixture
+def orchestrator_env(monkeypatch):
+    monkeypatch.setattr("src.db.mongo_client._client", FakeMongoClient())
+    monkeypatch.setattr(config, "CHANGE_GATE_ENABLED", False)
+    monkeypatch.setattr(config, "DECISION_REASK_ATTEMPTS", 1)
+    monkeypatch.setattr(config, "ORCHESTRATOR_COMPACT_INPUTS", False)
+
+
+def test_orchestrator_reasks_only_for_missing_tokens(orchestrator_env):
+    tokens = [
+        TokenRecord(symbol=symbol, chainId="0x1", tokenAddress=f"0x{index:040x}",
+                    analysis="a", taapi_analysis="t", news_summary="n")
+        for index, symbol in enumerate(("BTC", "ETH", "SOL"))
+    ]
+    agent = OrchestratorAgent(tokens)
+    prompts = []
+    keys = [f"0x1:0x{index:040x}" for index in range(3)]
+    replies = iter([f'{{"{keys[0]}": "BUY", "ETH": "AVOID"}}', '{"SOL": "HOLD"}'])  # Keys or unique symbols
+
+    async def run(prompt, context_variables=None):
+        prompts.append(prompt)
+        return next(replies)
+
+    agent.swarm.run = run
+    decisions = asyncio.run(agent.evaluate())
+
+    assert decisions == dict(zip(keys, ["BUY", "AVOID", "HOLD"]))
+    assert len(prompts) == 2
+    assert f"key: {keys[2]}" in prompts[1] and "Token: BTC" not in prompts[1]
+    assert [token.decision_source for token in tokens] == ["model"] * 3
+
+
+def test_orchestrator_defaults_to_hold_when_reask_fails(orchestrator_env):
+    token = TokenRecord(symbol="BTC", chainId="0x1", analysis="a", taapi_analysis="t", news_summary="n")
+    agent = OrchestratorAgent([token])
+
+    async def run(prompt, context_variables=None):
+        return "I cannot decide."
+
+    agent.swarm.run = run
+    assert asyncio.run(agent.evaluate()) == {}
+    assert token.final_decision == "HOLD"
+    assert token.decision_source == "default"
+
+
+def test_orchestrator_keeps_same_symbol_on_different_chains_apart(orchestrator_env):
+    tokens = [
+        TokenRecord(symbol="USDC", chainId=chain, tokenAddress="0x" + "a0" * 20,
+                    analysis="a", taapi_analysis="t", news_summary="n")
+        for chain in ("0x1", "0x38")
+    ]
+    agent = OrchestratorAgent(tokens)
+    prompts = []
+
+    async def run(prompt, context_variables=None):
+        prompts.append(prompt)
+        if len(prompts) == 1:
+            agent.record_decision("USDC", "buy", chain="0x38", address="0x" + "A0" * 20)
+        return '{"USDC": "AVOID"}'  # Ambiguous while both tokens are asked for, not in the re-ask
+
+    agent.swarm.run = run
+    assert asyncio.run(agent.evaluate()) == {"0x1:0x" + "a0" * 20: "AVOID", "0x38:0x" + "a0" * 20: "BUY"}
+    assert len(prompts) == 2 and "(0x38)" not in prompts[1]
+
+
+def make_tokens(count: int, analysis: str = "a") -> list:
+    return [
+        TokenRecord(symbol=f"T{index}", chainId="0x1", tokenAddress=f"0x{index:040x}",
+                    analysis=analysis, taapi_analysis="t", news_summary="n")
+        for index in range(count)
+    ]
+
+
+def test_shards_respect_the_size_limit_and_token_budget(orchestrator_env, monkeypatch):
+    monkeypatch.setattr(config, "ORCHESTRATOR_MAX_SHARD_SIZE", 3)
+    monkeypatch.setattr(config, "ORCHESTRATOR_SHARD_TOKEN_BUDGET", 10_000)
+    agent = OrchestratorAgent(make_tokens(7))
+    assert [len(shard) for shard in agent._shard(agent.token_results)] == [3, 3, 1]
+
+    verbose = make_tokens(4, analysis="word " * 200)
+    size = estimate_tokens(agent._format_token(verbose[0], compact=True))
+    monkeypatch.setattr(config, "ORCHESTRATOR_SHARD_TOKEN_BUDGET", size * 2)
+    assert [len(shard) for shard in agent._shard(verbose)] == [2, 2]
+
+
+def test_shards_are_requested_concurrently_and_merged(orchestrator_env, monkeypatch):
+    monkeypatch.setattr(config, "ORCHESTRATOR_MAX_SHARD_SIZE", 2)
+    tokens = make_tokens(5)
+    agent = OrchestratorAgent(tokens)
+    running, peak = 0, 0
+
+    async def run(prompt, context_variables=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        keys = [line.rsplit("key: ", 1)[1] for line in prompt.splitlines() if line.startswith("Token: ")]
+        return json.dumps({key: "BUY" for key in keys})
+
+    agent.swarm.run = run
+    decisions = asyncio.run(agent.evaluate())
+    assert decisions == {token_key(token): "BUY" for token in tokens}
+    assert peak == 3
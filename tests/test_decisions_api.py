@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.db.decision_store import DecisionStore
+from src.utils.rate_limiter import TokenBucket
+from tests.test_decision_store import ADDRESS, FakeDecisions, decision_document
+
+
+@pytest.fixture
+def client(monkeypatch):
+    scheduled = []
+
+    async def on_stale(keys):
+        scheduled.append(keys)
+        return f"job-{len(scheduled)}"
+
+    db = FakeDecisions({("0x1", ADDRESS): decision_document(7200)})
+    monkeypatch.setattr(api, "_decision_store", DecisionStore(db, on_stale=on_stale))
+    monkeypatch.setattr(api, "_miss_limiter", TokenBucket(rate=1, period=60))
+    test_client = TestClient(api.app)  # Not used as a context manager, so the lifespan (Mongo, workers) never runs
+    test_client.scheduled = scheduled
+    return test_client
+
+
+def test_stale_decision_is_returned_and_refreshed_after_the_response(client):
+    response = client.get(f"/decision/0x1/{ADDRESS}")
+    assert response.status_code == 200
+    assert response.json()["decision"] == "BUY" and response.json()["stale"]
+    assert client.scheduled == [[("0x1", ADDRESS)]]
+
+
+def test_unknown_tokens_are_queued_until_the_miss_limit(client):
+    first = client.get(f"/decision/0x1/0x{1:040x}")
+    assert first.status_code == 202 and first.json()["job_id"] == "job-1"
+    assert client.get(f"/decision/0x1/0x{1:040x}").status_code == 202  # Already queued, not another miss
+    assert client.get(f"/decision/0x1/0x{2:040x}").status_code == 429
+
+
+@pytest.mark.parametrize("chain, address", [("eth", ADDRESS), ("0x1", "0x1234"), ("0x1", "bitcoin")])
+def test_invalid_chain_or_address_is_rejected(client, chain, address):
+    assert client.get(f"/decision/{chain}/{address}").status_code == 422
+    assert client.post("/decisions", json={"tokens": [{"chain": chain, "address": address}]}).status_code == 422
+
+
+def test_bulk_read_queues_one_job_for_its_stale_tokens(client):
+    response = client.post("/decisions", json={"tokens": [
+        {"chain": "0x1", "address": ADDRESS}, {"chain": "0x1", "address": f"0x{3:040x}"},
+    ]})
+    assert response.status_code == 200
+    assert [result["address"] for result in response.json()["decisions"]] == [ADDRESS]
+    assert response.json()["missing"] == [{"chain": "0x1", "address": f"0x{3:040x}"}]
+    assert client.scheduled == [[("0x1", ADDRESS)]]
@@ -0,0 +1,37 @@
+import asyncio
+
+from src.utils.events import RunStream, create_stream, end_stream, format_sse, get_stream
+
+
+def test_subscribers_replay_history_then_follow_live_events():
+    stream = RunStream("run-1")
+    stream.publish("moralis", {"token": "0x1:btc"})
+
+    async def follow():
+        return [event["type"] async for event in stream.subscribe()]
+
+    async def scenario():
+        early = asyncio.ensure_future(follow())
+        await asyncio.sleep(0)
+        stream.publish("decision", {"token": "0x1:btc", "value": "BUY"})
+        stream.close()
+        late = await follow()  # Subscribing after the run ended replays everything and returns
+        return await early, late
+
+    early, late = asyncio.run(scenario())
+    assert early == late == ["moralis", "decision"]
+
+
+def test_end_stream_publishes_a_final_event_once():
+    stream = create_stream("run-2")
+    assert create_stream("run-2") is stream and get_stream("run-2") is stream
+
+    end_stream("run-2", "failed", {"error": "boom"})
+    end_stream("run-2", "failed", {"error": "again"})
+    assert [event["data"] for event in stream.history] == [{"error": "boom"}]
+    assert stream.closed
+    end_stream("unknown-run", "failed", {})  # Runs of other processes have no stream here
+
+
+def test_format_sse():
+    assert format_sse({"type": "done", "data": {"seconds": 1.5}}) == 'event: done\ndata: {"seconds": 1.5}\n\n'
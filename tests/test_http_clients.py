@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.clients.http_clients import HttpClientRegistry, UpstreamUnavailable
+from src.config import config
+from src.utils import resilience
+from src.utils.resilience import CircuitBreaker, get_breaker
+
+SETTINGS = {"timeout": 5.0, "connect_timeout": 1.0, "max_connections": 5, "keepalive": 5, "retries": 2}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A registry with one fake upstream whose responses come from `upstream.responses`, in order."""
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 3)
+    registry = HttpClientRegistry({"fake": SETTINGS})
+    registry.calls = []
+    registry.responses = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        registry.calls.append(request)
+        return registry.responses.pop(0)
+
+    registry.set_transport("fake", httpx.MockTransport(handler))
+    return registry
+
+
+def test_rate_limited_and_5xx_responses_are_retried_with_a_capped_retry_after(upstream, monkeypatch):
+    monkeypatch.setattr(config, "HTTP_MAX_RETRY_AFTER", 0.05)
+    upstream.responses = [
+        httpx.Response(429, headers={"Retry-After": "3600"}),
+        httpx.Response(503, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"ok": True}),
+    ]
+    acquired = []
+
+    async def acquire():
+        acquired.append(None)
+
+    upstream.set_limiter("fake", acquire)
+    start = time.perf_counter()
+    response = asyncio.run(upstream.request("fake", "GET", "https://fake.test/"))
+
+    assert response.json() == {"ok": True}
+    assert time.perf_counter() - start < 1
+    assert len(upstream.calls) == len(acquired) == 3  # Retries wait for the limiter like first attempts
+
+
+def test_last_retry_raises_the_status_error(upstream):
+    upstream.responses = [httpx.Response(500, headers={"Retry-After": "0"}) for _ in range(3)]
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.request("fake", "GET", "https://fake.test/"))
+    assert len(upstream.calls) == 3
+
+
+def test_open_circuit_fails_fast_without_a_request(upstream):
+    upstream.responses = [httpx.Response(502, headers={"Retry-After": "0"}) for _ in range(3)]
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.request("fake", "GET", "https://fake.test/"))
+    assert get_breaker("fake").state == CircuitBreaker.OPEN
+
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(upstream.request("fake", "GET", "https://fake.test/"))
+    assert len(upstream.calls) == 3
+
+
+def test_rate_limiting_is_not_a_provider_failure(upstream):
+    upstream.responses = [httpx.Response(429, headers={"Retry-After": "0"}) for _ in range(3)]
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.request("fake", "GET", "https://fake.test/"))
+    assert get_breaker("fake").state == CircuitBreaker.CLOSED
@@ -0,0 +1,69 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.models.models import OHLCData
+from src.utils.indicators import IndicatorEngine, compute_indicators, ema_series
+
+
+def make_candles(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    candles, price = [], 100.0
+    for i in range(count):
+        open_ = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        high = max(open_, price) * (1 + rng.random() * 0.01)
+        low = min(open_, price) * (1 - rng.random() * 0.01)
+        candles.append(OHLCData(timestamp=start + timedelta(hours=i), open=open_, high=high, low=low, close=price))
+    return candles
+
+
+def assert_indicators_close(actual, expected, rel=1e-9):
+    for field in ("sma", "ema", "rsi", "macd", "atr"):
+        assert getattr(actual, field) == pytest.approx(getattr(expected, field), rel=rel), field
+    assert actual.bollinger_bands == pytest.approx(expected.bollinger_bands, rel=rel)
+
+
+def test_ema_series_matches_recursive_definition():
+    values = np.random.default_rng(1).normal(100, 5, 1000)  # Longer than one block of the vectorized EMA
+    alpha, seed = 2 / 15, 100.0
+
+    expected, previous = [], seed
+    for value in values:
+        previous = alpha * value + (1 - alpha) * previous
+        expected.append(previous)
+
+    assert ema_series(values, alpha, seed) == pytest.approx(expected, rel=1e-9)
+
+
+def test_incremental_updates_match_full_recompute():
+    candles = make_candles(300)
+    engine = IndicatorEngine.from_candles(candles[:100])
+
+    for index in range(100, len(candles)):
+        incremental = engine.update(candles[index])
+        if index % 50 == 0 or index == len(candles) - 1:
+            assert_indicators_close(incremental, compute_indicators(candles[:index + 1]))
+
+    assert engine.last_timestamp == candles[-1].timestamp
+
+
+def test_seed_requires_enough_candles():
+    engine = IndicatorEngine()
+    with pytest.raises(ValueError):
+        engine.seed(make_candles(engine.min_candles - 1))
+
+
+def test_rsi_is_100_without_losses():
+    candles = [
+        OHLCData(timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=i),
+                 open=100 + i, high=101 + i, low=99 + i, close=100 + i)
+        for i in range(40)
+    ]
+    indicators = compute_indicators(candles)
+    assert indicators.rsi == 100.0
+    assert math.isfinite(indicators.macd)
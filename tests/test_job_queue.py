@@ -0,0 +1,90 @@
+import asyncio
+from datetime import timedelta
+
+from benchmarks.fakes import FakeCollection
+from src.jobs.queue import DONE, FAILED, QUEUED, RUNNING, InMemoryBroker, JobQueue, MongoBroker, _now
+
+
+async def wait_for_status(queue: JobQueue, job_id: str, statuses=(DONE, FAILED), timeout: float = 2.0):
+    async def poll():
+        while (await queue.get(job_id))["status"] not in statuses:
+            await asyncio.sleep(0.01)
+        return await queue.get(job_id)
+
+    return await asyncio.wait_for(poll(), timeout)
+
+
+def test_enqueue_reuses_active_job_with_same_dedup_key():
+    async def scenario():
+        queue = JobQueue(InMemoryBroker(max_size=10))
+        queue.register("analysis", lambda **payload: asyncio.sleep(0))
+
+        first = await queue.enqueue("analysis", {}, dedup_key="search:btc")
+        second = await queue.enqueue("analysis", {}, dedup_key="search:btc")
+        other = await queue.enqueue("analysis", {}, dedup_key="search:eth")
+        return first, second, other
+
+    first, second, other = asyncio.run(scenario())
+    assert first == second
+    assert other != first
+
+
+def test_failed_job_is_retried_until_it_succeeds():
+    calls = []
+
+    async def flaky(**payload):
+        calls.append(payload)
+        if len(calls) == 1:
+            raise RuntimeError("upstream hiccup")
+        return {"ok": True}
+
+    async def scenario():
+        queue = JobQueue(InMemoryBroker(max_size=10), workers=1, max_attempts=2, retry_delay=0)
+        queue.register("analysis", flaky)
+        await queue.start()
+        try:
+            job_id = await queue.enqueue("analysis", {"run_id": "r1"})
+            return await wait_for_status(queue, job_id)
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == DONE
+    assert job["attempts"] == 2
+    assert job["result"] == {"ok": True}
+    assert len(calls) == 2
+
+
+def test_job_fails_after_max_attempts():
+    async def broken(**payload):
+        raise RuntimeError("always down")
+
+    async def scenario():
+        queue = JobQueue(InMemoryBroker(max_size=10), workers=1, max_attempts=2, retry_delay=0)
+        queue.register("analysis", broken)
+        await queue.start()
+        try:
+            job_id = await queue.enqueue("analysis", {})
+            return await wait_for_status(queue, job_id)
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == FAILED
+    assert job["attempts"] == 2
+    assert "always down" in job["error"]
+
+
+def test_recover_requeues_only_jobs_with_expired_leases():
+    collection = FakeCollection()
+    broker = MongoBroker(collection, max_size=10, lease_seconds=60)
+    collection.documents = [
+        {"_id": "live", "status": RUNNING, "owner": "other", "heartbeat_at": _now()},
+        {"_id": "expired", "status": RUNNING, "owner": "dead", "heartbeat_at": _now() - timedelta(seconds=120)},
+        {"_id": "legacy", "status": RUNNING, "owner": None, "heartbeat_at": None},
+    ]
+
+    asyncio.run(broker.recover())
+
+    statuses = {job["_id"]: job["status"] for job in collection.documents}
+    assert statuses == {"live": RUNNING, "expired": QUEUED, "legacy": QUEUED}
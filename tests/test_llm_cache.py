@@ -0,0 +1,70 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeCollection
+from src.utils.llm_cache import DiskCacheBackend, LLMResponseCache, MongoCacheBackend, make_cache_key
+
+
+def test_cache_key_ignores_prompt_formatting():
+    key = make_cache_key("Agent", "instructions", None, "Token: BTC\n    Price:   1.0\n\n")
+    assert key == make_cache_key("Agent", "instructions", None, "Token: BTC\nPrice: 1.0")
+    assert key != make_cache_key("Agent", "instructions", "gpt-4o", "Token: BTC\nPrice: 1.0")
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda tmp_path: DiskCacheBackend(str(tmp_path)),
+    lambda tmp_path: MongoCacheBackend(FakeCollection()),
+])
+def test_backends_return_value_with_remaining_ttl(tmp_path, make_backend):
+    backend = make_backend(tmp_path)
+
+    async def scenario():
+        await backend.set("fresh", "answer", 60)
+        await backend.set("expired", "old", -1)
+        return await backend.get("fresh"), await backend.get("expired"), await backend.get("unknown")
+
+    (value, ttl_left), expired, unknown = asyncio.run(scenario())
+    assert value == "answer" and 59 < ttl_left <= 60
+    assert expired is None and unknown is None
+
+
+def test_memory_copy_expires_with_the_backend_entry(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path))
+    asyncio.run(backend.set("key", "answer", 0.05))
+    cache = LLMResponseCache(default_ttl=300, backend=backend)
+
+    assert asyncio.run(cache.get("key")) == "answer"
+    time.sleep(0.06)
+    assert asyncio.run(cache.get("key")) is None
+
+
+def test_backend_failures_are_misses_and_zero_ttl_is_not_cached():
+    class BrokenBackend:
+        async def get(self, key):
+            raise OSError("disk gone")
+
+        async def set(self, key, value, ttl):
+            raise OSError("disk gone")
+
+    cache = LLMResponseCache(backend=BrokenBackend())
+    asyncio.run(cache.set("key", "answer", 0))
+    assert asyncio.run(cache.get("key")) is None
+    asyncio.run(cache.set("key", "answer"))  # The write failure is logged; memory still has the entry
+    assert asyncio.run(cache.get("key")) == "answer"
+
+
+def test_disk_backend_prunes_expired_files_and_caps_entries(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path), max_entries=3, prune_every=2)
+    for index in range(4):
+        backend._write(f"expired{index}", "old", -1)  # Every second write prunes
+    assert os.listdir(tmp_path) == []
+
+    for index in range(5):
+        backend._write(f"live{index}", "new", 60 + index)
+    assert sorted(os.listdir(tmp_path)) == ["live1.json", "live2.json", "live3.json", "live4.json"]
+
+    DiskCacheBackend(str(tmp_path), max_entries=3)  # Pruned again on start-up
+    assert sorted(os.listdir(tmp_path)) == ["live2.json", "live3.json", "live4.json"]
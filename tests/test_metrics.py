@@ -0,0 +1,53 @@
+import pytest
+
+from src.utils.metrics import SPAN_ERRORS, SPANS_IN_FLIGHT, Counter, Gauge, Histogram, MetricsRegistry, span
+
+
+def test_registry_renders_prometheus_text_and_runs_collectors():
+    registry = MetricsRegistry()
+    calls = registry.register(Counter("app_calls_total", "Calls.", ("agent",)))
+    queue = registry.register(Gauge("app_queue_depth", "Queue depth."))
+    registry.add_collector(lambda: queue.set(3))
+    calls.inc(agent='say "hi"\\')
+    calls.inc(2, agent='say "hi"\\')
+
+    assert registry.render() == (
+        "# HELP app_calls_total Calls.\n"
+        "# TYPE app_calls_total counter\n"
+        'app_calls_total{agent="say \\"hi\\"\\\\"} 3\n'
+        "# HELP app_queue_depth Queue depth.\n"
+        "# TYPE app_queue_depth gauge\n"
+        "app_queue_depth 3\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram("latency_seconds", "Latency.", ("target",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, target="moralis")
+
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{target="moralis",le="0.1"} 2',
+        'latency_seconds_bucket{target="moralis",le="1.0"} 3',
+        'latency_seconds_bucket{target="moralis",le="+Inf"} 4',
+        'latency_seconds_sum{target="moralis"} 2.65',
+        'latency_seconds_count{target="moralis"} 4',
+    ]
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.add_collector(lambda: 1 / 0)
+    assert registry.render() == "\n"
+
+
+def test_span_counts_errors_and_leaves_no_span_in_flight():
+    key = ("test", "metrics")
+    errors_before = SPAN_ERRORS._values.get(key, 0)
+    with pytest.raises(ValueError):
+        with span("test", target="metrics"):
+            assert SPANS_IN_FLIGHT._values[key] == 1
+            raise ValueError("boom")
+
+    assert SPANS_IN_FLIGHT._values[key] == 0
+    assert SPAN_ERRORS._values[key] == errors_before + 1
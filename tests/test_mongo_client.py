@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo.errors import BulkWriteError
+
+from benchmarks.fakes import FakeMongoClient
+from src.db.mongo_client import COLLECTION_NAME, DB_NAME, DECISIONS_COLLECTION_NAME, MongoDB
+from src.models.token_record import TokenRecord
+
+
+def make_report(run_id: str, symbol: str) -> dict:
+    token = TokenRecord(symbol=symbol, chainId="0x1", tokenAddress="0x" + "A" * 40, final_decision="BUY",
+                        decision_source="model")
+    return {"run_id": run_id, "date": datetime.now(timezone.utc), "tokens": [token]}
+
+
+def test_save_reports_returns_the_saved_ids_after_a_partial_bulk_write_error(monkeypatch):
+    client = FakeMongoClient()
+    monkeypatch.setattr("src.db.mongo_client._client", client)
+    reports = client[DB_NAME][COLLECTION_NAME]
+
+    async def insert_many(documents, ordered=True):
+        for index, document in enumerate(documents):
+            document["_id"] = f"id-{index}"
+            if index != 1:
+                reports.documents.append(document)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}], "nInserted": 2})
+
+    monkeypatch.setattr(reports, "insert_many", insert_many)
+    saved = asyncio.run(MongoDB().save_reports([make_report(f"run-{index}", symbol)
+                                                for index, symbol in enumerate(("BTC", "ETH", "SOL"))]))
+
+    assert saved == ["id-0", "id-2"]
+    decisions = client[DB_NAME][DECISIONS_COLLECTION_NAME].documents
+    assert [(decision["report_id"], decision["symbol"]) for decision in decisions] == [("id-0", "BTC"), ("id-2", "SOL")]
+    assert decisions[0]["address"] == "0x" + "a" * 40 and decisions[0]["source"] == "model"
+
+
+def test_save_reports_returns_nothing_when_the_insert_fails(monkeypatch):
+    client = FakeMongoClient()
+    monkeypatch.setattr("src.db.mongo_client._client", client)
+
+    async def insert_many(documents, ordered=True):
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(client[DB_NAME][COLLECTION_NAME], "insert_many", insert_many)
+    assert asyncio.run(MongoDB().save_reports([make_report("run-0", "BTC")])) == []
+    assert client[DB_NAME][DECISIONS_COLLECTION_NAME].documents == []
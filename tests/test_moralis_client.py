@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.clients.http_clients import http_clients
+from src.clients.moralis_client import enrich_tokens
+
+
+@pytest.fixture
+def moralis_requests():
+    """Fake Moralis batch endpoints; metadata lookups for chain 0x38 are rejected."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        chain = request.url.params["chain"]
+        if request.url.path.endswith("/erc20/prices"):
+            addresses = [token["token_address"] for token in json.loads(request.content)["tokens"]]
+            requests.append(("prices", chain, len(addresses)))
+            return httpx.Response(200, json=[{"tokenAddress": address.upper(), "usdPrice": 1.5} for address in addresses])
+        addresses = request.url.params.get_list("addresses[]")
+        requests.append(("metadata", chain, len(addresses)))
+        if chain == "0x38":
+            return httpx.Response(400, json={"message": "bad request"})
+        return httpx.Response(200, json=[{"address": address, "decimals": "18"} for address in addresses])
+
+    http_clients.set_transport("moralis", httpx.MockTransport(handler))
+    yield requests
+    http_clients._transports.pop("moralis", None)
+    http_clients._clients.pop("moralis", None)
+
+
+def test_enrich_tokens_batches_per_chain_in_provider_sized_chunks(moralis_requests):
+    tokens = [{"chainId": "0x1", "tokenAddress": f"0x{index:040x}"} for index in range(30)]
+    tokens += [
+        {"chainId": "0x38", "tokenAddress": "0x" + "b" * 40},
+        {"chainId": "solana", "tokenAddress": "So11111111111111111111111111111111111111112"},
+    ]
+
+    assert asyncio.run(enrich_tokens(tokens)) is tokens
+    assert sorted(moralis_requests) == [
+        ("metadata", "0x1", 10), ("metadata", "0x1", 10), ("metadata", "0x1", 10), ("metadata", "0x38", 1),
+        ("prices", "0x1", 5), ("prices", "0x1", 25), ("prices", "0x38", 1),
+    ]
+    assert tokens[0]["usdPrice"] == 1.5 and tokens[0]["metadata"]["decimals"] == "18"
+    assert tokens[30]["usdPrice"] == 1.5 and "metadata" not in tokens[30]  # Failed batch leaves tokens unchanged
+    assert "usdPrice" not in tokens[31]
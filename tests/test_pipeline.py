@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from src.models.token_record import TokenRecord
+from src.utils.pipeline import PipelineContext, StageGraph, token_key
+from src.utils.resilience import DeadlineExceeded
+
+
+def test_stages_start_as_soon_as_their_dependencies_finish():
+    events = []
+
+    def stage(name, delay):
+        async def run():
+            events.append(f"start {name}")
+            await asyncio.sleep(delay)
+            events.append(f"end {name}")
+            return name
+        return run
+
+    graph = StageGraph()
+    graph.add("slow", stage("slow", 0.05))
+    graph.add("fast", stage("fast", 0.01))
+    graph.add("after_fast", stage("after_fast", 0), deps=["fast"])
+    graph.add("after_both", stage("after_both", 0), deps=["slow", "fast"])
+
+    results = asyncio.run(graph.run())
+    assert results == {"slow": "slow", "fast": "fast", "after_fast": "after_fast", "after_both": "after_both"}
+    assert events.index("start after_fast") < events.index("end slow")
+    assert events.index("start after_both") > events.index("end slow")
+
+
+def test_failed_and_timed_out_stages_store_their_error_and_dependents_still_run():
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def hang():
+        await asyncio.sleep(5)
+
+    async def dependent():
+        return "degraded"
+
+    graph = StageGraph()
+    graph.add("moralis:0", fail)
+    graph.add("taapi:0", hang, timeout=0.02)
+    graph.add("orchestrator", dependent, deps=["moralis:0", "taapi:0"])
+
+    start = time.perf_counter()
+    results = asyncio.run(graph.run())
+    assert time.perf_counter() - start < 1
+    assert isinstance(results["moralis:0"], RuntimeError)
+    assert isinstance(results["taapi:0"], DeadlineExceeded)
+    assert results["orchestrator"] == "degraded"
+    assert set(graph.timing_summary()) == {"moralis", "taapi", "orchestrator"}
+
+
+def test_stages_must_be_unique_and_depend_on_registered_stages():
+    graph = StageGraph()
+    graph.add("a", asyncio.sleep)
+    with pytest.raises(ValueError):
+        graph.add("a", asyncio.sleep)
+    with pytest.raises(ValueError):
+        graph.add("b", asyncio.sleep, deps=["missing"])
+
+
+class RecordingWriter:
+    def __init__(self, fail_first: bool = False):
+        self.reports = []
+        self.fail_first = fail_first
+
+    async def save_report(self, report):
+        await asyncio.sleep(0.01)
+        self.reports.append(report)
+        if self.fail_first and len(self.reports) == 1:
+            return None
+        return f"report-{len(self.reports)}"
+
+
+def test_context_saves_the_report_once_even_when_called_concurrently():
+    writer = RecordingWriter()
+    context = PipelineContext([TokenRecord(symbol="BTC")], run_id="run-1")
+
+    async def scenario():
+        return await asyncio.gather(*(context.save_report(writer) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == ["report-1"] * 3
+    assert len(writer.reports) == 1 and writer.reports[0]["run_id"] == "run-1"
+
+
+def test_context_retries_a_failed_save_and_prefers_its_report_writer():
+    buffer = RecordingWriter(fail_first=True)
+    context = PipelineContext([TokenRecord(symbol="BTC")], report_writer=buffer)
+
+    assert asyncio.run(context.save_report(db=None)) is None
+    assert asyncio.run(context.save_report(db=None, report={"tokens": []})) == "report-2"
+    assert asyncio.run(context.save_report(db=None)) == "report-2"
+    assert len(buffer.reports) == 2
+
+
+def test_marks_are_tracked_per_token_key():
+    usdc = [TokenRecord(symbol="USDC", chainId=chain, tokenAddress="0x" + "A0" * 20) for chain in ("0x1", "0x38")]
+    context = PipelineContext(usdc)
+    context.mark("news", usdc[0], "summary")
+
+    assert context.has("news", usdc[0]) and not context.has("news", usdc[1])
+    assert token_key(usdc[0]) == "0x1:0x" + "a0" * 20
+    assert token_key(TokenRecord(symbol="BTC", chainId="0x1")) == "0x1:BTC"
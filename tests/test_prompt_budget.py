@@ -0,0 +1,47 @@
+import pytest
+
+from src.utils.prompt_budget import estimate_tokens, fit_articles, format_number, format_value, truncate_to_tokens
+
+
+@pytest.mark.parametrize("value, expected", [
+    (1234567890.123, "1.235B"),
+    (0.000012345678, "0.00001235"),
+    (-2500, "-2.5K"),
+    (42, "42"),
+    (0, "0"),
+    ("12.5", "12.5"),
+    (None, "No data"),
+    ("n/a", "n/a"),
+    (float("nan"), "nan"),
+])
+def test_format_number(value, expected):
+    assert format_number(value, sig_figs=4) == expected
+
+
+def test_format_value_compacts_nested_numbers():
+    assert format_value({"valueMACD": 1.23456, "bands": [100.123, 99.5]}, sig_figs=3) == "valueMACD=1.23, bands=100, 99.5"
+
+
+def test_truncate_to_tokens_cuts_at_a_word_boundary():
+    text = truncate_to_tokens("alpha beta gamma delta epsilon", 3)
+    assert text == "alpha beta…"
+    assert truncate_to_tokens("  short\n text ", 10) == "short text"
+
+
+def test_fit_articles_drops_duplicates_and_repeated_titles():
+    articles = [
+        {"title": "U.S. SEC approves ETF", "description": "US SEC approves ETF - trading starts Monday", "url": "a"},
+        {"title": "U.S. SEC approves ETF", "description": "Syndicated copy", "url": "b"},
+        {"title": "Bitcoin rises", "description": "Bitcoin risesss further"},
+    ]
+    assert fit_articles(articles, budget_tokens=100, per_article_tokens=50) == [
+        "U.S. SEC approves ETF: trading starts Monday",
+        "Bitcoin rises: Bitcoin risesss further",  # Title ends mid-word in the description: kept as is
+    ]
+
+
+def test_fit_articles_stops_at_the_budget():
+    articles = [{"title": f"Story {index}", "description": "word " * 40} for index in range(10)]
+    entries = fit_articles(articles, budget_tokens=60, per_article_tokens=20)
+    assert len(entries) == 3
+    assert all(estimate_tokens(entry) <= 20 for entry in entries)
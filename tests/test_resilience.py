@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from src.utils.resilience import CircuitBreaker, DeadlineExceeded, deadline, hedged, remaining, timeout_for, within_deadline
+
+
+def test_circuit_opens_after_threshold_and_closes_after_successful_trial():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()  # One trial request once the reset timeout has passed
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    asyncio.run(asyncio.sleep(0.02))
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_hedged_returns_first_successful_attempt():
+    delays = [0.5, 0.01]
+    started = []
+
+    async def call():
+        started.append(len(started))
+        delay = delays[len(started) - 1]
+        await asyncio.sleep(delay)
+        return delay
+
+    result = asyncio.run(hedged(call, delay=0.02))
+    assert result == 0.01
+    assert len(started) == 2
+
+
+def test_hedged_keeps_waiting_when_one_attempt_fails():
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        if len(attempts) == 1:
+            await asyncio.sleep(0.03)
+            raise RuntimeError("first attempt failed")
+        await asyncio.sleep(0.05)
+        return "second"
+
+    assert asyncio.run(hedged(call, delay=0.01)) == "second"
+
+
+def test_hedged_skips_duplicate_when_not_allowed():
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        await asyncio.sleep(0.03)
+        return "only"
+
+    assert asyncio.run(hedged(call, delay=0.01, should_hedge=lambda: False)) == "only"
+    assert len(attempts) == 1
+
+
+def test_nested_deadline_only_shortens():
+    with deadline(10):
+        with deadline(60):
+            assert remaining() <= 10
+        with deadline(1):
+            assert remaining() <= 1
+        assert 1 < remaining() <= 10
+    assert remaining() is None
+
+
+def test_within_deadline_tells_deadline_and_own_timeout_apart():
+    async def scenario():
+        with deadline(0.02):
+            with pytest.raises(DeadlineExceeded):
+                await within_deadline(asyncio.sleep(1), timeout=5)
+        with deadline(5):
+            with pytest.raises(TimeoutError) as error:
+                await within_deadline(asyncio.sleep(1), timeout=0.02)
+            assert not isinstance(error.value, DeadlineExceeded)
+
+    asyncio.run(scenario())
+
+
+def test_timeout_for_raises_once_deadline_is_spent():
+    assert timeout_for(5) == 5
+    with deadline(1):
+        assert timeout_for(5) <= 1
+    with deadline(0.001):
+        asyncio.run(asyncio.sleep(0.01))
+        with pytest.raises(DeadlineExceeded):
+            timeout_for(5)
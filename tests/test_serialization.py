@@ -0,0 +1,48 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from src.models.token_record import TokenRecord
+from src.utils import serialization
+from src.utils.serialization import dumps, to_document
+
+RAW_TOKEN = {
+    "symbol": "BTC", "chainId": "0x1", "tokenAddress": "0x" + "a" * 40, "usdPrice": 65000.5,
+    "usdPricePercentChange": {"oneDay": 2.5}, "volumeUsd": {"oneDay": 1e9}, "metadata": {"decimals": 8},
+    "isVerifiedContract": True, "final_decision": "BUY",
+}
+
+
+def test_from_moralis_keeps_only_used_fields_and_round_trips():
+    token = TokenRecord.from_moralis(RAW_TOKEN)
+    assert (token.priceChange24h, token.volume24h, token.decimals) == (2.5, 1e9, 8)
+    assert "isVerifiedContract" not in token.to_dict()
+    assert TokenRecord.from_moralis(token.to_dict()) == token
+    assert TokenRecord.coerce(token) is token
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_encodes_records_datetimes_and_object_ids(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, "orjson", None)
+    elif serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+
+    object_id = ObjectId()
+    payload = {
+        "_id": object_id,
+        "date": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "tokens": [TokenRecord.from_moralis(RAW_TOKEN)],
+    }
+    decoded = json.loads(dumps(payload))
+    assert decoded["_id"] == str(object_id)
+    assert decoded["date"] == "2024-01-01T00:00:00+00:00"
+    assert TokenRecord.from_moralis(decoded["tokens"][0]) == payload["tokens"][0]
+
+
+def test_to_document_converts_nested_records_only():
+    date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    document = to_document({"date": date, "tokens": [TokenRecord(symbol="BTC")], "run_id": "r"})
+    assert document == {"date": date, "tokens": [{"symbol": "BTC"}], "run_id": "r"}
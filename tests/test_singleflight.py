@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from src.utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        flights = SingleFlight()
+        return await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_errors_reach_every_caller_and_are_not_memoized():
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return "recovered"
+
+    async def scenario():
+        flights = SingleFlight(memo_ttl=60)
+        results = await asyncio.gather(flights.do("key", fetch), flights.do("key", fetch), return_exceptions=True)
+        return results, await flights.do("key", fetch)
+
+    results, retried = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == "recovered"
+    assert len(calls) == 2
+
+
+def test_memoized_result_is_reused_until_forgotten():
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        return len(calls)
+
+    async def scenario():
+        flights = SingleFlight(memo_ttl=60)
+        first = await flights.do("key", fetch)
+        second = await flights.do("key", fetch)
+        flights.forget("key")
+        return first, second, await flights.do("key", fetch)
+
+    assert asyncio.run(scenario()) == (1, 1, 2)
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        flights = SingleFlight()
+        impatient = asyncio.ensure_future(flights.do("key", fetch))
+        patient = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0.005)
+        impatient.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(scenario()) == "done"
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.clients import taapi_client
+from src.clients.http_clients import http_clients
+from src.config import config
+from src.utils.resilience import deadline
+
+
+@pytest.fixture
+def bulk_requests(monkeypatch):
+    """Routes TAAPI through a fake /bulk endpoint that rejects every request carrying the symbol BAD."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        constructs = json.loads(request.content)["construct"]
+        symbols = [construct["symbol"].split("/")[0] for construct in constructs]
+        requests.append(symbols)
+        if "BAD" in symbols:
+            return httpx.Response(400, json={"error": "unknown symbol"})
+        data = [
+            {"id": indicator["id"], "result": {"value": 50.0, "valueMACD": 1.0}}
+            for construct in constructs for indicator in construct["indicators"]
+        ]
+        return httpx.Response(200, json={"data": data})
+
+    monkeypatch.setattr(config, "TAAPI_MAX_CONSTRUCTS", 2)
+    monkeypatch.setitem(http_clients._limiters, "taapi", None)
+    http_clients.set_transport("taapi", httpx.MockTransport(handler))
+    yield requests
+    http_clients._transports.pop("taapi", None)
+    http_clients._clients.pop("taapi", None)
+
+
+def test_fetch_bulk_indicators_packs_symbols_into_chunks(bulk_requests):
+    results = asyncio.run(taapi_client.fetch_bulk_indicators(["BTC", "ETH", "SOL", "BTC"]))
+    assert sorted(bulk_requests) == [["BTC", "ETH"], ["SOL"]]
+    assert results["SOL"] == {"rsi": 50.0, "sma": 50.0, "macd": 1.0}
+
+
+def test_batcher_fails_only_the_chunk_that_errored(bulk_requests):
+    batcher = taapi_client.BulkBatcher(window=0.01)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(batcher.fetch(symbol) for symbol in ("BTC", "ETH", "BAD", "SOL")), return_exceptions=True
+        )
+
+    btc, eth, bad, sol = asyncio.run(scenario())
+    assert btc["rsi"] == 50.0 and eth["macd"] == 1.0
+    assert isinstance(bad, httpx.HTTPStatusError) and isinstance(sol, httpx.HTTPStatusError)
+    assert len(bulk_requests) == 2
+
+
+def test_batcher_flush_does_not_inherit_the_first_callers_deadline(bulk_requests):
+    batcher = taapi_client.BulkBatcher(window=0.05)
+
+    async def impatient():
+        with deadline(0.01):
+            return await batcher.fetch("BTC")
+
+    async def scenario():
+        return await asyncio.gather(impatient(), batcher.fetch("ETH"))
+
+    btc, eth = asyncio.run(scenario())
+    assert btc["rsi"] == 50.0 and eth["rsi"] == 50.0